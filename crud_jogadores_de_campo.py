@@ -153,6 +153,14 @@ def validate_and_normalize_manual_path(user_input):
         return str(Path("players") / rel).replace("\\", "/")
     return None
 
+def _canonical_id(value):
+    """Converte qualquer forma de UUID (com/sem hífens, maiúsculas) para o hex de 32 chars usado pelo Django."""
+    v = str(value or "").strip()
+    try:
+        return uuid.UUID(v).hex
+    except ValueError:
+        return v
+
 def input_nonempty(prompt):
     while True:
         v = input(prompt).strip()
@@ -253,7 +261,7 @@ def create_player(conn):
             print("Overall inválido, usando cálculo automático.")
             overall = compute_overall_from_stats(attack, passing, defense, speed)
 
-    player_id = str(uuid.uuid4())
+    player_id = uuid.uuid4().hex
     sql = """
     INSERT INTO jogadores_campo
       (id, level, name, position, club, country, photo_path, overall, attack, passing, defense, speed)
@@ -277,7 +285,7 @@ def list_players(conn):
     print(f"Total: {len(rows)}")
 
 def show_player(conn):
-    pid = input("Digite o id do jogador: ").strip()
+    pid = _canonical_id(input("Digite o id do jogador: "))
     cur = conn.execute("SELECT * FROM jogadores_campo WHERE id = ?", (pid,))
     r = cur.fetchone()
     if not r:
@@ -289,7 +297,7 @@ def show_player(conn):
         print(f"{name}: {val}")
 
 def update_player(conn):
-    pid = input("Digite o id do jogador a atualizar: ").strip()
+    pid = _canonical_id(input("Digite o id do jogador a atualizar: "))
     cur = conn.execute("SELECT * FROM jogadores_campo WHERE id = ?", (pid,))
     row = cur.fetchone()
     if not row:
@@ -391,7 +399,7 @@ def update_player(conn):
     print("Atualizado.")
 
 def delete_player(conn):
-    pid = input("Digite o id do jogador a deletar: ").strip()
+    pid = _canonical_id(input("Digite o id do jogador a deletar: "))
     confirm = input(f"Confirma exclusão de {pid}? (s/N): ").strip().lower()
     if confirm != "s":
         print("Operação cancelada.")
@@ -139,6 +139,14 @@ def validate_and_normalize_manual_path(user_input):
         return str(Path("players") / rel).replace("\\", "/")
     return None
 
+def _canonical_id(value):
+    """Converte qualquer forma de UUID (com/sem hífens, maiúsculas) para o hex de 32 chars usado pelo Django."""
+    v = str(value or "").strip()
+    try:
+        return uuid.UUID(v).hex
+    except ValueError:
+        return v
+
 def input_nonempty(prompt):
     while True:
         v = input(prompt).strip()
@@ -222,7 +230,7 @@ def create_goleiro(conn):
         except:
             overall = compute_overall_gk(handling, positioning, reflex, speed)
 
-    gid = str(uuid.uuid4())
+    gid = uuid.uuid4().hex
     created_at = datetime.datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
     sql = """
     INSERT INTO jogadores_goleiros
@@ -247,7 +255,7 @@ def list_goleiros(conn):
     print(f"Total: {len(rows)}")
 
 def show_goleiro(conn):
-    gid = input("Digite o id do goleiro: ").strip()
+    gid = _canonical_id(input("Digite o id do goleiro: "))
     cur = conn.execute("SELECT * FROM jogadores_goleiros WHERE id = ?", (gid,))
     r = cur.fetchone()
     if not r:
@@ -259,7 +267,7 @@ def show_goleiro(conn):
         print(f"{name}: {val}")
 
 def update_goleiro(conn):
-    gid = input("Digite o id do goleiro a atualizar: ").strip()
+    gid = _canonical_id(input("Digite o id do goleiro a atualizar: "))
     cur = conn.execute("SELECT * FROM jogadores_goleiros WHERE id = ?", (gid,))
     row = cur.fetchone()
     if not row:
@@ -354,7 +362,7 @@ def update_goleiro(conn):
     print("Atualizado.")
 
 def delete_goleiro(conn):
-    gid = input("Digite o id do goleiro a deletar: ").strip()
+    gid = _canonical_id(input("Digite o id do goleiro a deletar: "))
     confirm = input(f"Confirma exclusão de {gid}? (s/N): ").strip().lower()
     if confirm != "s":
         print("Operação cancelada.")
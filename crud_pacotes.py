@@ -1,16 +1,18 @@
 #!/usr/bin/env python3
 """
-CRUD Packs atualizado: each pack stores full player objects in JSON lists.
-- field_players, gk_players: lists of dicts:
-  { "id": "<uuid>", "weight": 1, "note": "", "name": "...", "club":"...", "photo_path":"...", "overall": 0, ...attrs... }
-- Includes a migration helper to migrate from old sistemas_packentry -> new JSON full objects.
+CRUD Packs: cada jogador possível de um pack é uma linha em sistemas_packentry
+(pack_id, type, player_field_id | player_gk_id, weight, note).
+- Adicionar/remover jogador = INSERT/DELETE de uma linha (o pack não é reescrito).
+- Duplicatas barradas por lookup no índice único (pack_id, player_*_id).
+- IDs gravados no formato do Django (uuid hex, 32 chars, sem hífens).
+- Toda alteração nas entradas incrementa sistemas_packs.entries_version (invalida o cache do site).
+- Os antigos campos JSON (field_players/gk_players) são migrados pela migration 0004 do Django.
 """
 import sqlite3
 import uuid
 import random
 import datetime
 import sys
-import json
 from pathlib import Path
 
 ROOT = Path(__file__).resolve().parent
@@ -25,12 +27,25 @@ CREATE TABLE IF NOT EXISTS sistemas_packs (
     description TEXT,
     image_path TEXT,
     price INTEGER NOT NULL DEFAULT 0,
-    field_players TEXT DEFAULT '[]',
-    gk_players TEXT DEFAULT '[]',
+    entries_version INTEGER NOT NULL DEFAULT 0,
     created_at TEXT NOT NULL
 );
 """
 
+CREATE_PACKENTRY_SQL = """
+CREATE TABLE IF NOT EXISTS sistemas_packentry (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    type TEXT NOT NULL,
+    weight INTEGER NOT NULL DEFAULT 1,
+    note TEXT NOT NULL DEFAULT '',
+    pack_id TEXT NOT NULL REFERENCES sistemas_packs (id),
+    player_field_id TEXT NULL REFERENCES jogadores_campo (id),
+    player_gk_id TEXT NULL REFERENCES jogadores_goleiros (id),
+    UNIQUE (pack_id, player_field_id),
+    UNIQUE (pack_id, player_gk_id)
+);
+"""
+
 def ensure_db():
     BANCOS_DIR.mkdir(parents=True, exist_ok=True)
     IMAGES_ROOT.mkdir(parents=True, exist_ok=True)
@@ -38,6 +53,7 @@ def ensure_db():
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys = ON;")
     conn.execute(CREATE_PACKS_SQL)
+    conn.execute(CREATE_PACKENTRY_SQL)
     conn.commit()
     return conn
 
@@ -90,20 +106,14 @@ def choose_image_interactive():
                 return str(Path("webmedia/packs") / chosen).replace("\\","/")
         print("Opção inválida.")
 
-# JSON helpers
-def _load_json_list(text):
+# ID helpers
+def _canonical_id(value):
+    """Converte qualquer forma de UUID (com/sem hífens, maiúsculas) para o hex de 32 chars usado pelo Django."""
+    v = str(value or "").strip()
     try:
-        if text is None or text == "":
-            return []
-        return json.loads(text)
-    except Exception:
-        return []
-
-def _dump_json_list(lst):
-    try:
-        return json.dumps(lst, ensure_ascii=False)
-    except Exception:
-        return "[]"
+        return uuid.UUID(v).hex
+    except ValueError:
+        return v
 
 # --- Player lookup helpers (pega o objeto completo do jogador por id) ---
 def fetch_field_player_object(conn, player_id):
@@ -158,11 +168,11 @@ def create_pack(conn):
     print("Escolha imagem do pack (opcional):")
     image_path = choose_image_interactive()
     created_at = datetime.datetime.utcnow().isoformat() + "Z"
-    pid = str(uuid.uuid4())
+    pid = uuid.uuid4().hex
     try:
         conn.execute(
-            "INSERT INTO sistemas_packs (id, name, description, image_path, price, field_players, gk_players, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-            (pid, name, description, image_path, price, "[]", "[]", created_at)
+            "INSERT INTO sistemas_packs (id, name, description, image_path, price, entries_version, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (pid, name, description or "", image_path or "", price, 0, created_at)
         )
         conn.commit()
         print("Pack criado:", pid)
@@ -179,9 +189,35 @@ def list_packs(conn):
     for r in rows:
         print(f"{r['id']} | {r['name']} | {r['price']} coins | criado: {r['created_at']}")
 
+def load_pack_entries(conn, pack_id):
+    """Entradas do pack com dados básicos do jogador (uma query com LEFT JOIN)."""
+    rows = conn.execute(
+        """
+        SELECT e.type, e.weight, e.note,
+               COALESCE(e.player_field_id, e.player_gk_id) AS player_id,
+               COALESCE(f.name, g.name) AS name,
+               COALESCE(f.club, g.club) AS club,
+               COALESCE(f.overall, g.overall) AS overall
+        FROM sistemas_packentry e
+        LEFT JOIN jogadores_campo f ON f.id = e.player_field_id
+        LEFT JOIN jogadores_goleiros g ON g.id = e.player_gk_id
+        WHERE e.pack_id = ?
+        ORDER BY e.id
+        """,
+        (pack_id,)
+    ).fetchall()
+    return [
+        {"id": r["player_id"], "type": r["type"], "weight": r["weight"], "note": r["note"],
+         "name": r["name"], "club": r["club"], "overall": r["overall"]}
+        for r in rows
+    ]
+
+def bump_entries_version(conn, pack_id):
+    conn.execute("UPDATE sistemas_packs SET entries_version = entries_version + 1 WHERE id = ?", (pack_id,))
+
 def show_pack(conn):
-    pid = input_nonempty("Digite o id do pack: ")
-    cur = conn.execute("SELECT id, name, description, image_path, price, field_players, gk_players, created_at FROM sistemas_packs WHERE id = ?", (pid,))
+    pid = _canonical_id(input_nonempty("Digite o id do pack: "))
+    cur = conn.execute("SELECT id, name, description, image_path, price, created_at FROM sistemas_packs WHERE id = ?", (pid,))
     r = cur.fetchone()
     if not r:
         print("Pack não encontrado.")
@@ -194,18 +230,14 @@ def show_pack(conn):
     print("Preço:", r["price"])
     print("Criado:", r["created_at"])
 
-    field_entries = _load_json_list(r["field_players"])
-    gk_entries = _load_json_list(r["gk_players"])
-
-    if not field_entries and not gk_entries:
+    entries = load_pack_entries(conn, pid)
+    if not entries:
         print("\nNenhum jogador associado a esse pack.")
         return
 
-    print("\nJogadores possíveis no pack (objetos completos):")
-    for e in field_entries:
-        print_entry_object(e, "field")
-    for e in gk_entries:
-        print_entry_object(e, "gk")
+    print("\nJogadores possíveis no pack:")
+    for e in entries:
+        print_entry_object(e, e["type"])
 
 def print_entry_object(e, typ):
     pid_show = e.get("id")
@@ -217,17 +249,18 @@ def print_entry_object(e, typ):
     print(f"  type={typ} | player_id={pid_show} | weight={weight} -> {name} ({club}) overall={overall} | note: {note or '-'}")
 
 def delete_pack(conn):
-    pid = input_nonempty("Digite o id do pack a deletar: ")
+    pid = _canonical_id(input_nonempty("Digite o id do pack a deletar: "))
     confirm = input(f"Confirma exclusão de {pid}? (s/N): ").strip().lower()
     if confirm != "s":
         print("Cancelado.")
         return
+    conn.execute("DELETE FROM sistemas_packentry WHERE pack_id = ?", (pid,))
     conn.execute("DELETE FROM sistemas_packs WHERE id = ?", (pid,))
     conn.commit()
     print("Deletado (se existia).")
 
 def update_pack(conn):
-    pid = input_nonempty("Digite o id do pack a atualizar: ")
+    pid = _canonical_id(input_nonempty("Digite o id do pack a atualizar: "))
     cur = conn.execute("SELECT id, name, description, image_path, price FROM sistemas_packs WHERE id = ?", (pid,))
     r = cur.fetchone()
     if not r:
@@ -246,10 +279,11 @@ def update_pack(conn):
         "UPDATE sistemas_packs SET name=?, description=?, image_path=?, price=? WHERE id=?",
         (name, description, image_path, price, pid)
     )
+    bump_entries_version(conn, pid)  # invalida a listagem da loja em cache
     conn.commit()
     print("Atualizado.")
 
-# --- Add / Remove players storing full object ---
+# --- Add / Remove players (uma linha em sistemas_packentry) ---
 
 def add_player_to_pack(conn):
     """
@@ -258,9 +292,8 @@ def add_player_to_pack(conn):
     - Digite '2' para goleiro (gk)
     Aceita também 'field' ou 'gk' caso prefira.
     """
-    pid = input_nonempty("Digite o id do pack: ")
-    cur = conn.execute("SELECT id, field_players, gk_players FROM sistemas_packs WHERE id = ?", (pid,))
-    row = cur.fetchone()
+    pid = _canonical_id(input_nonempty("Digite o id do pack: "))
+    row = conn.execute("SELECT id FROM sistemas_packs WHERE id = ?", (pid,)).fetchone()
     if not row:
         print("Pack não encontrado.")
         return
@@ -297,86 +330,87 @@ def add_player_to_pack(conn):
             print("Escolha inválida.")
             return
         player_id = rows[int(sel)-1]["id"]
+    player_id = _canonical_id(player_id)
 
-    weight = input_int("Weight (probabilidade relativa, inteiro, default 1): ", default=1) or 1
-    note = input("Observação (opcional): ").strip() or ""
-
-    # buscar objeto completo do jogador nas tabelas
-    player_obj = None
+    # o jogador precisa existir (FK)
     if ptype == "field":
         player_obj = fetch_field_player_object(conn, player_id)
     else:
         player_obj = fetch_gk_player_object(conn, player_id)
-
     if player_obj is None:
-        print("Jogador não encontrado nas tabelas de jogadores; você ainda pode adicionar manualmente os campos.")
-        if input("Adicionar manualmente com apenas ID (s/N)? ").strip().lower() != "s":
-            print("Cancelado.")
-            return
-        player_obj = {"id": str(player_id), "name": str(player_id)}
-
-    # anexar weight & note (sem sobrescrever campos do jogador)
-    entry = dict(player_obj)
-    entry["weight"] = int(weight or 1)
-    entry["note"] = note or ""
-
-    field_entries = _load_json_list(row["field_players"])
-    gk_entries = _load_json_list(row["gk_players"])
-    target_list = field_entries if ptype == "field" else gk_entries
+        print("Jogador não encontrado nas tabelas de jogadores. Cadastre-o antes de adicioná-lo ao pack.")
+        return
 
-    # impedir duplicata por id
-    if any(str(x.get("id")) == str(entry["id"]) for x in target_list):
+    col = "player_field_id" if ptype == "field" else "player_gk_id"
+    # impedir duplicata (lookup no índice único)
+    if conn.execute(f"SELECT 1 FROM sistemas_packentry WHERE pack_id = ? AND {col} = ?", (pid, player_id)).fetchone():
         print("Este jogador já está associado a esse pack (entrada duplicada).")
         return
 
-    if ptype == "field":
-        field_entries.append(entry)
-    else:
-        gk_entries.append(entry)
+    weight = input_int("Weight (probabilidade relativa, inteiro, default 1): ", default=1) or 1
+    note = input("Observação (opcional): ").strip() or ""
 
     conn.execute(
-        "UPDATE sistemas_packs SET field_players = ?, gk_players = ? WHERE id = ?",
-        (_dump_json_list(field_entries), _dump_json_list(gk_entries), pid)
+        f"INSERT INTO sistemas_packentry (pack_id, type, {col}, weight, note) VALUES (?, ?, ?, ?, ?)",
+        (pid, ptype, player_id, int(weight or 1), note)
     )
+    bump_entries_version(conn, pid)
     conn.commit()
-    print("Adicionado (objeto completo salvo no JSON).")
+    print(f"Adicionado: {player_obj['name']} ({player_obj['club']}).")
 
 
 
 def remove_player_from_pack(conn):
-    pid = input_nonempty("Digite o id do pack: ")
-    cur = conn.execute("SELECT id, field_players, gk_players FROM sistemas_packs WHERE id = ?", (pid,))
-    row = cur.fetchone()
+    pid = _canonical_id(input_nonempty("Digite o id do pack: "))
+    row = conn.execute("SELECT id FROM sistemas_packs WHERE id = ?", (pid,)).fetchone()
     if not row:
         print("Pack não encontrado.")
         return
-    player_id = input_nonempty("Digite o player id (UUID) a remover: ")
-    field_entries = _load_json_list(row["field_players"])
-    gk_entries = _load_json_list(row["gk_players"])
-
-    fid = str(player_id)
-    new_field = [x for x in field_entries if str(x.get("id")) != fid]
-    new_gk = [x for x in gk_entries if str(x.get("id")) != fid]
+    player_id = _canonical_id(input_nonempty("Digite o player id (UUID) a remover: "))
 
-    if len(new_field) == len(field_entries) and len(new_gk) == len(gk_entries):
+    cur = conn.execute(
+        "DELETE FROM sistemas_packentry WHERE pack_id = ? AND (player_field_id = ? OR player_gk_id = ?)",
+        (pid, player_id, player_id)
+    )
+    if cur.rowcount == 0:
         print("Player id não encontrado neste pack.")
         return
+    bump_entries_version(conn, pid)
+    conn.commit()
+    print("Removido.")
 
+# --- Open pack for user ---
+def compact_user_coins(conn, user_id):
+    """
+    Dobra os créditos pendentes do livro-razão em sistemas_users.coins (mesmo CAS em coins_ledger_seq
+    de sistemas.coins.compact_user), para que coins seja o saldo real antes de checar/debitar.
+    """
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='sistemas_coin_transaction'").fetchone():
+        return
+    ur = conn.execute("SELECT coins_ledger_seq FROM sistemas_users WHERE id = ?", (user_id,)).fetchone()
+    if not ur:
+        return
+    seq = ur["coins_ledger_seq"]
+    pend = conn.execute(
+        "SELECT COALESCE(SUM(amount), 0) AS total, MAX(id) AS last FROM sistemas_coin_transaction "
+        "WHERE user_id = ? AND settled = 0 AND id > ?",
+        (user_id, seq),
+    ).fetchone()
+    if pend["last"] is None:
+        return
     conn.execute(
-        "UPDATE sistemas_packs SET field_players = ?, gk_players = ? WHERE id = ?",
-        (_dump_json_list(new_field), _dump_json_list(new_gk), pid)
+        "UPDATE sistemas_users SET coins = coins + ?, coins_ledger_seq = ? WHERE id = ? AND coins_ledger_seq = ?",
+        (pend["total"], pend["last"], user_id, seq),
     )
-    conn.commit()
-    print("Removido (se existia).")
 
-# --- Open pack for user (uses stored full object) ---
 def open_pack_for_user(conn):
-    user_id = input_nonempty("User id (UUID): ")
-    pack_id = input_nonempty("Pack id (UUID): ")
-    r = conn.execute("SELECT price, field_players, gk_players FROM sistemas_packs WHERE id = ?", (pack_id,)).fetchone()
+    user_id = _canonical_id(input_nonempty("User id (UUID): "))
+    pack_id = _canonical_id(input_nonempty("Pack id (UUID): "))
+    r = conn.execute("SELECT price FROM sistemas_packs WHERE id = ?", (pack_id,)).fetchone()
     if not r:
         print("Pack não encontrado."); return
     price = r["price"]
+    compact_user_coins(conn, user_id)
     ur = conn.execute("SELECT coins FROM sistemas_users WHERE id = ?", (user_id,)).fetchone()
     if not ur:
         print("User não encontrado."); return
@@ -384,13 +418,7 @@ def open_pack_for_user(conn):
     if coins < price:
         print("User não tem moedas suficientes:", coins, "<", price); return
 
-    field_entries = _load_json_list(r["field_players"])
-    gk_entries = _load_json_list(r["gk_players"])
-    entries = []
-    for e in field_entries:
-        item = dict(e); item["type"] = "field"; entries.append(item)
-    for e in gk_entries:
-        item = dict(e); item["type"] = "gk"; entries.append(item)
+    entries = load_pack_entries(conn, pack_id)
 
     if not entries:
         print("Pack vazio (nenhuma entry)."); return
@@ -403,8 +431,15 @@ def open_pack_for_user(conn):
     pid_used = chosen.get("id")
     ptype = chosen.get("type")
     player_name = chosen.get("name") or str(pid_used)
-    # debitar moedas
-    conn.execute("UPDATE sistemas_users SET coins = coins - ? WHERE id = ?", (price, user_id))
+    # debitar moedas (UPDATE condicional, mesmo critério do site) e lançar no livro-razão
+    cur = conn.execute("UPDATE sistemas_users SET coins = coins - ? WHERE id = ? AND coins >= ?", (price, user_id, price))
+    if cur.rowcount != 1:
+        print("User não tem moedas suficientes."); return
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='sistemas_coin_transaction'").fetchone():
+        conn.execute(
+            "INSERT INTO sistemas_coin_transaction (user_id, amount, kind, ref, settled, created_at) VALUES (?, ?, ?, ?, 1, ?)",
+            (user_id, -price, "pack_purchase", pack_id, datetime.datetime.utcnow().isoformat() + "Z"),
+        )
 
     # inserir no inventário: temos ID e tipo; o objeto completo também é armazenado
     inserted = False
@@ -444,83 +479,19 @@ def open_pack_for_user(conn):
     print(f"Pack aberto! Jogador recebido: {player_name} (type={ptype} id={pid_used})")
     print("Inserido no inventário do usuário." if inserted else "Não foi possível inserir automaticamente no inventário (verificar esquema).")
 
-# --- Migration helper from old sistemas_packentry to full objects ---
-def migrate_packentries_to_full_objects(conn, dry_run=False):
-    """
-    Se existir a tabela sistemas_packentry, converte os registros para os novos campos JSON.
-    - dry_run=True apenas mostra o que seria feito.
-    """
-    # verifica se tabela antiga existe
-    try:
-        cur = conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='sistemas_packentry'").fetchone()
-        if not cur:
-            print("Tabela sistemas_packentry não existe — nada a migrar.")
-            return
-    except Exception as exc:
-        print("Erro ao checar tabelas:", exc)
-        return
-
-    packs = conn.execute("SELECT id FROM sistemas_packs").fetchall()
-    if not packs:
-        print("Nenhum pack cadastrado para migrar.")
-        return
-
-    for p in packs:
-        pid = p["id"]
-        entries = conn.execute(
-            "SELECT id, weight, note, player_field_id, player_gk_id FROM sistemas_packentry WHERE pack_id = ? ORDER BY weight DESC, id",
-            (pid,)
-        ).fetchall()
-        if not entries:
-            continue
-        new_field = _load_json_list(conn.execute("SELECT field_players FROM sistemas_packs WHERE id = ?", (pid,)).fetchone()["field_players"])
-        new_gk = _load_json_list(conn.execute("SELECT gk_players FROM sistemas_packs WHERE id = ?", (pid,)).fetchone()["gk_players"])
-        changed = False
-        for e in entries:
-            pfid = e["player_field_id"]
-            pgid = e["player_gk_id"]
-            weight = int(e["weight"] or 1)
-            note = e["note"] or ""
-            if pfid:
-                obj = fetch_field_player_object(conn, pfid) or {"id": str(pfid)}
-                obj["weight"] = weight
-                obj["note"] = note
-                # prevent dup
-                if not any(str(x.get("id")) == str(obj["id"]) for x in new_field):
-                    new_field.append(obj)
-                    changed = True
-            elif pgid:
-                obj = fetch_gk_player_object(conn, pgid) or {"id": str(pgid)}
-                obj["weight"] = weight
-                obj["note"] = note
-                if not any(str(x.get("id")) == str(obj["id"]) for x in new_gk):
-                    new_gk.append(obj)
-                    changed = True
-        if changed:
-            print(f"Migrando pack {pid}: adicionando {len(new_field)} field + {len(new_gk)} gk entries (commit={not dry_run})")
-            if not dry_run:
-                conn.execute("UPDATE sistemas_packs SET field_players = ?, gk_players = ? WHERE id = ?",
-                             (_dump_json_list(new_field), _dump_json_list(new_gk), pid))
-    if not dry_run:
-        conn.commit()
-        print("Migração concluída e gravada.")
-    else:
-        print("Dry run concluído. Nenhuma alteração gravada.")
-
 def menu():
     conn = ensure_db()
     try:
         while True:
-            print("\n=== CRUD Packs (full object JSON) ===")
+            print("\n=== CRUD Packs ===")
             print("1) Listar packs")
             print("2) Ver pack (detalhes)")
             print("3) Criar pack")
             print("4) Atualizar pack")
             print("5) Deletar pack")
-            print("6) Adicionar jogador ao pack (guarda objeto completo)")
+            print("6) Adicionar jogador ao pack")
             print("7) Remover jogador do pack (por player id)")
             print("8) Abrir pack para user (simulação)")
-            print("9) Migrar sistemas_packentry -> JSON full objects (dry-run primeiro!)")
             print("0) Sair")
             opt = input("Escolha: ").strip()
             if opt == "1": list_packs(conn)
@@ -531,11 +502,6 @@ def menu():
             elif opt == "6": add_player_to_pack(conn)
             elif opt == "7": remove_player_from_pack(conn)
             elif opt == "8": open_pack_for_user(conn)
-            elif opt == "9":
-                if input("Dry run? (s/N): ").strip().lower() == "s":
-                    migrate_packentries_to_full_objects(conn, dry_run=True)
-                else:
-                    migrate_packentries_to_full_objects(conn, dry_run=False)
             elif opt == "0": break
             else: print("Inválido.")
     finally:
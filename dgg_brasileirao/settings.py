@@ -76,3 +76,14 @@ LOGOUT_REDIRECT_URL = "/login/"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Eventos de compra de packs (sistemas/events.py): JSON lines gravados em background
+PURCHASE_EVENTS_LOG = BASE_DIR / "logs" / "purchase_events.jsonl"
+# fração de eventos registrados por tipo (1.0 = todos); ausentes usam o padrão de sistemas/events.py
+PURCHASE_EVENT_SAMPLE_RATES = {
+    "purchase": 1.0,
+    "insufficient_coins": 0.1,
+}
+
+# Objetivo padrão do "auto escalar" do my_team (sistemas/lineup_solver.py):
+# "overall" = soma de overall; "sim" = forças que o simulador de partidas usa
+AUTO_LINEUP_OBJECTIVE = "overall"
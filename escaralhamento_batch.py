@@ -4,11 +4,14 @@ Batch deposit tool para packs (SQLite).
 - Interativo: cola muitos player IDs (um por linha) e adiciona ao pack.
 - Linhas podem ser: "<id>" ou "<id>,<weight>" ou "<id>,<weight>,<note>"
 - Tipo: 1 = jogador de campo (field); 2 = goleiro (gk). Aceita também 'field'/'gk'.
-- Evita duplicatas por player.id no pack.
+- Evita duplicatas por player.id no pack (ids já existentes carregados uma vez num set).
+- Cada jogador vira uma linha em sistemas_packentry (INSERT em lote); o pack não é reescrito,
+  apenas entries_version é incrementado uma vez no final.
+- IDs normalizados para o formato do Django (uuid hex, 32 chars).
 Comentários e explicações concentrados no topo (conforme pedido).
 """
 import sqlite3
-import json
+import uuid
 import datetime
 from pathlib import Path
 
@@ -16,20 +19,14 @@ from pathlib import Path
 ROOT = Path(__file__).resolve().parent.parent  # supondo scripts/.. ajuste se quiser
 DB_PATH = ROOT / "DGG-ultimate-soccer-2025" / "bancos" / "db.sqlite3"
 
-# ---------- helpers JSON ----------
-def _load_json_list(text):
+# ---------- helpers ID ----------
+def _canonical_id(value):
+    """Converte qualquer forma de UUID (com/sem hífens, maiúsculas) para o hex de 32 chars usado pelo Django."""
+    v = str(value or "").strip()
     try:
-        if text is None or text == "":
-            return []
-        return json.loads(text)
-    except Exception:
-        return []
-
-def _dump_json_list(lst):
-    try:
-        return json.dumps(lst, ensure_ascii=False)
-    except Exception:
-        return "[]"
+        return uuid.UUID(v).hex
+    except ValueError:
+        return v
 
 # ---------- fetch players ----------
 def fetch_field_player_object(conn, player_id):
@@ -82,13 +79,13 @@ def main():
     conn.row_factory = sqlite3.Row
 
     try:
-        pack_id = input("Pack id (UUID): ").strip()
+        pack_id = _canonical_id(input("Pack id (UUID): "))
         if not pack_id:
             print("Pack id obrigatório.")
             return
 
         # carregar pack
-        cur = conn.execute("SELECT id, field_players, gk_players FROM sistemas_packs WHERE id = ?", (pack_id,))
+        cur = conn.execute("SELECT id FROM sistemas_packs WHERE id = ?", (pack_id,))
         pack_row = cur.fetchone()
         if not pack_row:
             print("Pack não encontrado (id):", pack_id)
@@ -122,19 +119,20 @@ def main():
             print("Nenhum ID fornecido. Abortando.")
             return
 
-        field_list = _load_json_list(pack_row["field_players"])
-        gk_list = _load_json_list(pack_row["gk_players"])
-        target_list = field_list if ptype == "field" else gk_list
+        col = "player_field_id" if ptype == "field" else "player_gk_id"
+        existing_ids = {
+            r[0] for r in conn.execute(f"SELECT {col} FROM sistemas_packentry WHERE pack_id = ? AND {col} IS NOT NULL", (pack_id,))
+        }
 
+        to_insert = []
         added = []
         skipped_dup = []
-        missing_and_added_minimal = []
         failed = []
 
         for raw in lines:
             # parse
             parts = [p.strip() for p in raw.split(",", 2)]
-            player_id = parts[0] if parts else ""
+            player_id = _canonical_id(parts[0]) if parts else ""
             if not player_id:
                 failed.append((raw, "id vazio"))
                 continue
@@ -145,34 +143,27 @@ def main():
             note = parts[2] if len(parts) == 3 else default_note
 
             # check duplicate
-            if any(str(x.get("id")) == str(player_id) for x in target_list):
+            if player_id in existing_ids:
                 skipped_dup.append(player_id)
                 continue
 
-            # fetch object
+            # jogador precisa existir (FK)
             player_obj = fetch_field_player_object(conn, player_id) if ptype == "field" else fetch_gk_player_object(conn, player_id)
             if player_obj is None:
-                # perguntar se deve criar minimal
-                ans = input(f"Player {player_id} não encontrado no DB. Criar entrada minimal (id+name=id)? (s/N): ").strip().lower()
-                if ans != "s":
-                    failed.append((player_id, "não encontrado e não criado"))
-                    continue
-                player_obj = {"id": player_id, "name": player_id}
-
-            # montar entry e adicionar
-            entry = dict(player_obj)
-            entry["weight"] = int(weight or 1)
-            entry["note"] = note or ""
-            target_list.append(entry)
+                failed.append((player_id, "não encontrado no DB"))
+                continue
+
+            to_insert.append((pack_id, ptype, player_id, int(weight or 1), note or ""))
+            existing_ids.add(player_id)
             added.append(player_id)
-            if player_obj and (player_obj.get("name") == player_id):
-                missing_and_added_minimal.append(player_id)
 
         # salvar no DB
-        conn.execute(
-            "UPDATE sistemas_packs SET field_players = ?, gk_players = ? WHERE id = ?",
-            (_dump_json_list(field_list), _dump_json_list(gk_list), pack_id)
-        )
+        if to_insert:
+            conn.executemany(
+                f"INSERT INTO sistemas_packentry (pack_id, type, {col}, weight, note) VALUES (?, ?, ?, ?, ?)",
+                to_insert
+            )
+            conn.execute("UPDATE sistemas_packs SET entries_version = entries_version + 1 WHERE id = ?", (pack_id,))
         conn.commit()
 
         # resumo
@@ -185,10 +176,6 @@ def main():
             print("Duplicatas ignoradas (já existiam):", len(skipped_dup))
             for d in skipped_dup[:50]:
                 print("  -", d)
-        if missing_and_added_minimal:
-            print("Foram adicionados como minimal (não estavam no DB):", len(missing_and_added_minimal))
-            for m in missing_and_added_minimal[:50]:
-                print("  *", m)
         if failed:
             print("Falhas:", len(failed))
             for f in failed[:50]:
@@ -0,0 +1,211 @@
+# sistemas/ai_lineups.py
+"""
+Montagem de lineups 1-4-3-3 para AITeam a partir de snapshots do catálogo.
+Funções puras (sem ORM): recebem listas de snapshots e um random.Random, o que permite
+usá-las tanto nas views quanto em workers de um process pool (comando prewarm_ai_teams).
+"""
+
+import random
+
+# mesmas constantes de JogadorCampo.POSITION_* (sem importar models: workers com spawn/forkserver
+# importam este módulo sem o Django configurado)
+POSITION_OFF = "OffensiveZone"
+POSITION_NEU = "NeutralZone"
+POSITION_DEF = "DefensiveZone"
+
+
+def _name_key(snap):
+    return (snap.get("name") or "").strip().lower()
+
+
+def build_random_lineup(field_snaps, gk_snaps, rnd=None):
+    """
+    Slots AI aleatórios: dict com 'gk', 'def'(list4), 'mid'(list3), 'off'(list3).
+    Garante que não haja jogadores com o mesmo nome (checagem por nome em lowercase).
+    Lança RuntimeError se não houver jogadores distintos suficientes.
+    """
+    rnd = rnd or random.Random()
+    if not gk_snaps:
+        raise RuntimeError("Não há goleiros no banco de dados para gerar o time AI.")
+    if len(field_snaps) < 3:
+        raise RuntimeError("Não há jogadores de campo suficientes no banco para gerar o time AI.")
+
+    goalkeepers = list(gk_snaps)
+    field_players = list(field_snaps)
+    rnd.shuffle(goalkeepers)
+    rnd.shuffle(field_players)
+
+    defenders_pool = [p for p in field_players if p.get("position") == POSITION_DEF]
+    mids_pool = [p for p in field_players if p.get("position") == POSITION_NEU]
+    offs_pool = [p for p in field_players if p.get("position") == POSITION_OFF]
+
+    chosen_names = set()
+    chosen_ids = set()
+
+    def _take_unique(pool, needed, current=None):
+        chosen = current if current is not None else []
+        ppool = list(pool)
+        rnd.shuffle(ppool)
+        for p in ppool:
+            if len(chosen) >= needed:
+                break
+            name_norm = _name_key(p)
+            if not name_norm or name_norm in chosen_names or p["id"] in chosen_ids:
+                continue
+            chosen.append(p)
+            chosen_names.add(name_norm)
+            chosen_ids.add(p["id"])
+        return chosen
+
+    # goleiro (tentar garantir nome único)
+    gk_snap = None
+    for g in goalkeepers:
+        name_norm = _name_key(g)
+        if name_norm and name_norm not in chosen_names:
+            gk_snap = g
+            break
+    if not gk_snap:
+        gk_snap = goalkeepers[0]
+    chosen_names.add(_name_key(gk_snap))
+    chosen_ids.add(gk_snap["id"])
+
+    def_list = _take_unique(defenders_pool, 4)
+    mid_list = _take_unique(mids_pool, 3)
+    off_list = _take_unique(offs_pool, 3)
+
+    # completar a partir de todos os jogadores de campo
+    def_list = _take_unique(field_players, 4, def_list)
+    mid_list = _take_unique(field_players, 3, mid_list)
+    off_list = _take_unique(field_players, 3, off_list)
+
+    if len(def_list) < 4 or len(mid_list) < 3 or len(off_list) < 3:
+        raise RuntimeError("Não há jogadores distintos suficientes no banco para gerar um time AI sem repetições por nome.")
+
+    return {
+        "gk": dict(gk_snap),
+        "def": [dict(p) for p in def_list],
+        "mid": [dict(p) for p in mid_list],
+        "off": [dict(p) for p in off_list],
+    }
+
+
+def build_authentic_lineup(field_snaps, gk_snaps, rnd=None):
+    """
+    Slots AI usando apenas os snapshots recebidos (já filtrados por clube).
+    Retorna None se não houver 1 GK + 10 jogadores de campo.
+    """
+    rnd = rnd or random.Random()
+    if not gk_snaps or len(field_snaps) < 10:
+        return None
+
+    taken_ids = set()
+
+    def pick_unique_from_pool(pool, needed, current=None):
+        chosen = current if current is not None else []
+        candidates = list(pool)
+        rnd.shuffle(candidates)
+        for p in candidates:
+            if len(chosen) >= needed:
+                break
+            if p["id"] in taken_ids:
+                continue
+            chosen.append(p)
+            taken_ids.add(p["id"])
+        return chosen
+
+    goalkeepers = list(gk_snaps)
+    rnd.shuffle(goalkeepers)
+    gk_snap = goalkeepers[0]
+    taken_ids.add(gk_snap["id"])
+
+    def_list = pick_unique_from_pool([p for p in field_snaps if p.get("position") == POSITION_DEF], 4)
+    mid_list = pick_unique_from_pool([p for p in field_snaps if p.get("position") == POSITION_NEU], 3)
+    off_list = pick_unique_from_pool([p for p in field_snaps if p.get("position") == POSITION_OFF], 3)
+
+    # preencher a partir de todo o clube se alguma posição ficou faltando
+    def_list = pick_unique_from_pool(field_snaps, 4, def_list)
+    mid_list = pick_unique_from_pool(field_snaps, 3, mid_list)
+    off_list = pick_unique_from_pool(field_snaps, 3, off_list)
+
+    if len(def_list) < 4 or len(mid_list) < 3 or len(off_list) < 3:
+        return None
+
+    return {
+        "gk": dict(gk_snap),
+        "def": [dict(p) for p in def_list[:4]],
+        "mid": [dict(p) for p in mid_list[:3]],
+        "off": [dict(p) for p in off_list[:3]],
+    }
+
+
+def iter_lineup_players(slots):
+    """Itera os snapshots (dict) preenchidos de um dict de slots."""
+    gk = (slots or {}).get("gk")
+    if isinstance(gk, dict) and gk:
+        yield gk
+    for sec in ("def", "mid", "off"):
+        for p in (slots or {}).get(sec) or []:
+            if isinstance(p, dict) and p:
+                yield p
+
+
+def lineup_strength(slots):
+    """Força do lineup: média de overall dos jogadores (0 se vazio)."""
+    overalls = [int(p.get("overall") or 0) for p in iter_lineup_players(slots)]
+    if not overalls:
+        return 0.0
+    return round(sum(overalls) / len(overalls), 2)
+
+
+def clubs_with_enough_players(field_snaps, gk_snaps, min_field_players=10, min_goalkeepers=1):
+    """Agrupa snapshots por clube (case-insensitive) e retorna {club_key: (field, gk)} elegíveis."""
+    by_club = {}
+    for p in field_snaps:
+        key = (p.get("club") or "").strip().lower()
+        if key:
+            by_club.setdefault(key, ([], []))[0].append(p)
+    for g in gk_snaps:
+        key = (g.get("club") or "").strip().lower()
+        if key:
+            by_club.setdefault(key, ([], []))[1].append(g)
+    return {
+        key: pools for key, pools in by_club.items()
+        if len(pools[0]) >= min_field_players and len(pools[1]) >= min_goalkeepers
+    }
+
+
+# ---------- process pool (comando prewarm_ai_teams) ----------
+
+_WORKER_CATALOG = None
+
+
+def init_worker(field_snaps, gk_snaps):
+    """Initializer do ProcessPoolExecutor: guarda o catálogo no processo filho."""
+    global _WORKER_CATALOG
+    _WORKER_CATALOG = (field_snaps, gk_snaps, clubs_with_enough_players(field_snaps, gk_snaps))
+
+
+def generate_chunk(kind, count, seed):
+    """
+    Gera `count` lineups do tipo 'random' ou 'authentic' no processo atual.
+    Retorna lista de dicts {kind, club, slots, strength}.
+    """
+    field_snaps, gk_snaps, clubs = _WORKER_CATALOG
+    rnd = random.Random(seed)
+    out = []
+    club_keys = sorted(clubs)
+    for _ in range(count):
+        if kind == "authentic":
+            if not club_keys:
+                break
+            club_key = rnd.choice(club_keys)
+            club_field, club_gk = clubs[club_key]
+            slots = build_authentic_lineup(club_field, club_gk, rnd)
+            if not slots:
+                continue
+            club = (slots["gk"].get("club") or club_key).strip()
+        else:
+            slots = build_random_lineup(field_snaps, gk_snaps, rnd)
+            club = ""
+        out.append({"kind": kind, "club": club, "slots": slots, "strength": lineup_strength(slots)})
+    return out
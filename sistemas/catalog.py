@@ -0,0 +1,152 @@
+# sistemas/catalog.py
+"""
+Helpers do catálogo de jogadores (JogadorCampo / JogadorGoleiro).
+- snapshot_from_field / snapshot_from_gk (definidos em models): formato de snapshot do inventário e dos slots.
+- load_catalog_snapshots: carrega o catálogo inteiro como snapshots (dicts simples, sem ORM).
+- catalog_version: hash curto do conteúdo do catálogo. Os scripts CRUD escrevem direto no sqlite
+  (sem signals), então a versão é derivada dos próprios dados e guardada no cache por pouco tempo.
+- get_player_snapshots: snapshots de vários ids do catálogo de uma vez (cache por id + catalog_version,
+  faltantes em duas queries id__in), para resolver slots guardados como id.
+- get_packs_listing / get_pack_contents: loja de packs já resolvida, em cache versionado
+  (packs_version + entries_version + catalog_version); tráfego normal não consulta o catálogo.
+"""
+
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Count, Max, Sum
+
+from .ids import canonical_ids
+from .models import JogadorCampo, JogadorGoleiro, Pack, PackEntry, snapshot_from_field, snapshot_from_gk
+from .snapshots import normalize_snapshot
+
+CATALOG_VERSION_CACHE_KEY = "sistemas:catalog_version"
+CATALOG_VERSION_TTL = 60  # segundos
+
+PACKS_VERSION_CACHE_KEY = "sistemas:packs_version"
+PACKS_VERSION_TTL = 30  # segundos
+PACKS_LISTING_TTL = 60 * 60
+PLAYER_SNAPSHOT_TTL = 60 * 60
+
+FIELD_SNAPSHOT_FIELDS = ("id", "name", "club", "country", "photo_path", "overall",
+                         "attack", "passing", "defense", "speed", "position")
+GK_SNAPSHOT_FIELDS = ("id", "name", "club", "country", "photo_path", "overall",
+                      "handling", "positioning", "reflex", "speed")
+
+
+def load_catalog_snapshots(club=None):
+    """
+    Retorna (field_snaps, gk_snaps) com o catálogo inteiro (ou apenas um clube, case-insensitive).
+    Duas queries com .values(): nada de instanciar modelos.
+    """
+    field_qs = JogadorCampo.objects.values(*FIELD_SNAPSHOT_FIELDS)
+    gk_qs = JogadorGoleiro.objects.values(*GK_SNAPSHOT_FIELDS)
+    if club:
+        field_qs = field_qs.filter(club__iexact=club)
+        gk_qs = gk_qs.filter(club__iexact=club)
+    field_snaps = [snapshot_from_field(r) for r in field_qs]
+    gk_snaps = [snapshot_from_gk(r) for r in gk_qs]
+    return field_snaps, gk_snaps
+
+
+def compute_catalog_version():
+    """Hash (12 hex) sobre todos os atributos que afetam lineups/simulação."""
+    h = hashlib.sha1()
+    for row in JogadorCampo.objects.order_by("id").values_list(*FIELD_SNAPSHOT_FIELDS):
+        h.update(repr(row).encode("utf-8"))
+    h.update(b"|gk|")
+    for row in JogadorGoleiro.objects.order_by("id").values_list(*GK_SNAPSHOT_FIELDS):
+        h.update(repr(row).encode("utf-8"))
+    return h.hexdigest()[:12]
+
+
+def catalog_version(use_cache=True):
+    version = cache.get(CATALOG_VERSION_CACHE_KEY) if use_cache else None
+    if version is None:
+        version = compute_catalog_version()
+        cache.set(CATALOG_VERSION_CACHE_KEY, version, CATALOG_VERSION_TTL)
+    return version
+
+
+def get_player_snapshots(ids):
+    """
+    {id canônico: snapshot normalizado} para os ids do catálogo (campo ou goleiro); ids inválidos ou
+    inexistentes ficam de fora. Cache por id + catalog_version; faltantes em no máximo duas queries.
+    """
+    keys = {str(u): u for u in canonical_ids(ids)}
+    if not keys:
+        return {}
+    version = catalog_version()
+    cache_keys = {f"sistemas:player:{version}:{pid}": pid for pid in keys}
+    found = {cache_keys[k]: snap for k, snap in cache.get_many(list(cache_keys)).items()}
+
+    missing = [keys[pid] for pid in keys if pid not in found]
+    if missing:
+        fetched = {}
+        for row in JogadorGoleiro.objects.filter(id__in=missing).values(*GK_SNAPSHOT_FIELDS):
+            fetched[str(row["id"])] = normalize_snapshot(snapshot_from_gk(row))
+        rest = [u for u in missing if str(u) not in fetched]
+        if rest:
+            for row in JogadorCampo.objects.filter(id__in=rest).values(*FIELD_SNAPSHOT_FIELDS):
+                fetched[str(row["id"])] = normalize_snapshot(snapshot_from_field(row))
+        cache.set_many({f"sistemas:player:{version}:{pid}": snap for pid, snap in fetched.items()}, PLAYER_SNAPSHOT_TTL)
+        found.update(fetched)
+    return found
+
+
+def compute_packs_version():
+    """Versão da listagem: nº de packs, soma de entries_version e último created_at (uma query agregada)."""
+    agg = Pack.objects.aggregate(n=Count("id"), v=Sum("entries_version"), last=Max("created_at"))
+    last = agg["last"].isoformat() if agg["last"] else ""
+    return f"{agg['n']}-{agg['v'] or 0}-{last}"
+
+
+def packs_version(use_cache=True):
+    version = cache.get(PACKS_VERSION_CACHE_KEY) if use_cache else None
+    if version is None:
+        version = compute_packs_version()
+        cache.set(PACKS_VERSION_CACHE_KEY, version, PACKS_VERSION_TTL)
+    return version
+
+
+def get_packs_listing():
+    """Lista de dicts dos packs (sem conteúdo), na ordem da loja. Em cache por packs_version."""
+    key = f"sistemas:packs_listing:{packs_version()}"
+    listing = cache.get(key)
+    if listing is None:
+        listing = [
+            {
+                "id": str(p["id"]),
+                "name": p["name"],
+                "price": p["price"],
+                "description": p["description"],
+                "image_path": p["image_path"],
+                "entries_version": p["entries_version"],
+            }
+            for p in Pack.objects.order_by("-created_at").values(
+                "id", "name", "price", "description", "image_path", "entries_version"
+            )
+        ]
+        cache.set(key, listing, PACKS_LISTING_TTL)
+    return listing
+
+
+def get_pack_contents(pack_dict):
+    """
+    Conteúdo resolvido de um pack da listagem: {"field_players": [...], "gk_players": [...]},
+    itens {id, name, photo_path}. Chave inclui entries_version e catalog_version (nomes/fotos atuais).
+    """
+    key = f"sistemas:pack_contents:{pack_dict['id']}:{pack_dict['entries_version']}:{catalog_version()}"
+    contents = cache.get(key)
+    if contents is None:
+        contents = {"field_players": [], "gk_players": []}
+        entries = PackEntry.objects.filter(pack_id=pack_dict["id"]).select_related("player_field", "player_gk")
+        for e in entries:
+            player = e.player
+            item = {"id": str(player.id), "name": player.name or str(player.id), "photo_path": player.photo_path or ""}
+            if e.type == PackEntry.TYPE_GK:
+                contents["gk_players"].append(item)
+            else:
+                contents["field_players"].append(item)
+        cache.set(key, contents, PACKS_LISTING_TTL)
+    return contents
@@ -0,0 +1,128 @@
+# sistemas/coins.py
+"""
+Movimentação de moedas: livro-razão (CoinTransaction) + saldo compactado em SistemasUser.coins.
+- Débitos: um único UPDATE condicional (coins = coins - n WHERE coins >= n), sem lock de linha;
+  o sucesso vem do nº de linhas afetadas. A linha do débito entra no razão já liquidada.
+- Créditos: só um INSERT pendente no razão (nenhuma escrita na linha do usuário), então várias
+  partidas simultâneas do mesmo usuário não disputam a mesma linha.
+- Saldo real = coins + créditos pendentes com id > coins_ledger_seq (reconciliado na leitura).
+- compact_user dobra os pendentes em coins com um UPDATE condicional em coins_ledger_seq (CAS);
+  roda quando um débito falta saldo, quando há muitos pendentes na leitura e no comando
+  `manage.py compact_coin_ledger`.
+Como pendentes são sempre créditos, coins nunca passa do saldo real: checar débito só contra
+coins é seguro (no pior caso compacta e tenta de novo).
+"""
+
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Max, Sum
+from django.utils import timezone
+
+from .models import CoinTransaction, SistemasUser
+
+COMPACT_PENDING_THRESHOLD = 50   # pendentes que disparam compactação numa leitura
+# No postgres ids são reservados antes do commit: só compacta linhas com alguns segundos de idade
+# para não pular um crédito de transação ainda aberta. No sqlite as escritas são serializadas.
+COMPACT_GRACE_SECONDS = 5
+
+
+def _pending_qs(user_id, seq):
+    return CoinTransaction.objects.filter(user_id=user_id, settled=False, id__gt=seq)
+
+
+def record_transaction(user_id, amount, kind, ref="", settled=False):
+    return CoinTransaction.objects.create(
+        user_id=user_id, amount=amount, kind=kind, ref=str(ref or "")[:64], settled=settled,
+    )
+
+
+def record_transactions(rows):
+    """Grava vários lançamentos de uma vez (bulk_create). rows: dicts com user_id, amount, kind, [ref, settled]."""
+    objs = [
+        CoinTransaction(
+            user_id=r["user_id"], amount=r["amount"], kind=r["kind"],
+            ref=str(r.get("ref") or "")[:64], settled=bool(r.get("settled", False)),
+        )
+        for r in rows
+    ]
+    return CoinTransaction.objects.bulk_create(objs)
+
+
+def debit_coins(user_id, amount, kind=CoinTransaction.KIND_PACK_PURCHASE, ref=""):
+    """Debita `amount` se houver saldo. Retorna True se debitou, False se saldo insuficiente."""
+    if amount < 0:
+        raise ValueError("amount deve ser >= 0.")
+
+    def _try():
+        return SistemasUser.objects.filter(pk=user_id, coins__gte=amount).update(coins=F("coins") - amount) == 1
+
+    with transaction.atomic():
+        ok = _try()
+        if not ok and compact_user(user_id):
+            ok = _try()
+        if ok and amount:
+            record_transaction(user_id, -amount, kind, ref, settled=True)
+    return ok
+
+
+def credit_coins(user_id, amount, kind=CoinTransaction.KIND_ADJUSTMENT, ref=""):
+    """Credita `amount` (lançamento pendente no razão). Retorna True se lançou."""
+    if amount < 0:
+        raise ValueError("amount deve ser >= 0.")
+    if amount:
+        record_transaction(user_id, amount, kind, ref, settled=False)
+    return True
+
+
+def compact_user(user_id, grace_seconds=None):
+    """
+    Dobra os créditos pendentes em SistemasUser.coins. Retorna o total dobrado (0 se nada mudou
+    ou se outra compactação venceu o CAS em coins_ledger_seq).
+    """
+    if grace_seconds is None:
+        grace_seconds = 0 if connection.vendor == "sqlite" else COMPACT_GRACE_SECONDS
+    seq = SistemasUser.objects.filter(pk=user_id).values_list("coins_ledger_seq", flat=True).first()
+    if seq is None:
+        return 0
+    pending = _pending_qs(user_id, seq)
+    if grace_seconds:
+        pending = pending.filter(created_at__lte=timezone.now() - timedelta(seconds=grace_seconds))
+    last = pending.aggregate(last=Max("id"))["last"]
+    if last is None:
+        return 0
+    total = _pending_qs(user_id, seq).filter(id__lte=last).aggregate(total=Sum("amount"))["total"] or 0
+    with transaction.atomic():
+        updated = SistemasUser.objects.filter(pk=user_id, coins_ledger_seq=seq).update(
+            coins=F("coins") + total, coins_ledger_seq=last,
+        )
+    return total if updated else 0
+
+
+def compact_all(grace_seconds=None):
+    """Compacta todos os usuários com créditos pendentes. Retorna (usuários, moedas dobradas)."""
+    users = 0
+    folded = 0
+    user_ids = list(
+        CoinTransaction.objects.filter(settled=False, id__gt=F("user__coins_ledger_seq"))
+        .values_list("user_id", flat=True).distinct()
+    )
+    for uid in user_ids:
+        total = compact_user(uid, grace_seconds=grace_seconds)
+        if total:
+            users += 1
+            folded += total
+    return users, folded
+
+
+def get_balance(user_or_id):
+    """Saldo real (coins + pendentes). Compacta na leitura se houver muitos pendentes."""
+    user_id = getattr(user_or_id, "pk", user_or_id)
+    row = SistemasUser.objects.filter(pk=user_id).values_list("coins", "coins_ledger_seq").first()
+    if row is None:
+        return None
+    coins, seq = row
+    agg = _pending_qs(user_id, seq).aggregate(total=Sum("amount"), n=Count("id"))
+    if agg["n"] >= COMPACT_PENDING_THRESHOLD:
+        compact_user(user_id)
+    return coins + (agg["total"] or 0)
@@ -0,0 +1,141 @@
+# sistemas/events.py
+"""
+Eventos estruturados de compra de packs (analytics da economia).
+- emit_purchase_event(event, **fields): decide a amostragem na hora (barato) e só enfileira.
+- Um QueueListener (thread em background) serializa em JSON e grava em lote num arquivo
+  JSON lines; nada de I/O no caminho da requisição.
+- Amostragem por tipo de evento (settings.PURCHASE_EVENT_SAMPLE_RATES); cada linha leva
+  "sample_rate" para permitir reponderar nas análises.
+
+Configuração (settings, opcionais):
+    PURCHASE_EVENTS_LOG = BASE_DIR / "logs" / "purchase_events.jsonl"
+    PURCHASE_EVENT_SAMPLE_RATES = {"purchase": 1.0, "insufficient_coins": 0.1}
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+import time
+
+from django.conf import settings
+
+LOGGER_NAME = "sistemas.purchase_events"
+BUFFER_CAPACITY = 200      # linhas acumuladas antes de gravar
+FLUSH_INTERVAL = 2.0       # segundos: no próximo evento, grava mesmo com o buffer incompleto
+QUEUE_MAXSIZE = 10000      # fila cheia -> evento descartado (nunca bloqueia a requisição)
+
+DEFAULT_SAMPLE_RATES = {
+    "purchase": 1.0,
+    "pack_not_found": 1.0,
+    "empty_pack": 1.0,
+    "invalid_entry": 1.0,
+    "insufficient_coins": 0.1,
+    "invalid_count": 0.1,
+}
+
+_logger = logging.getLogger(LOGGER_NAME)
+_logger.propagate = False
+_listener = None
+_start_lock = threading.Lock()
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """record.msg é o dict do evento; vira uma linha JSON."""
+
+    def format(self, record):
+        return json.dumps(record.msg, ensure_ascii=False, default=str, separators=(",", ":"))
+
+
+class _EventQueueHandler(logging.handlers.QueueHandler):
+    """Não formata na thread da requisição: o dict vai como está para a fila."""
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+class _TimedMemoryHandler(logging.handlers.MemoryHandler):
+    """MemoryHandler que também grava se o buffer está parado há FLUSH_INTERVAL segundos."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._last_flush = time.monotonic()
+
+    def shouldFlush(self, record):
+        return super().shouldFlush(record) or (time.monotonic() - self._last_flush) >= FLUSH_INTERVAL
+
+    def flush(self):
+        super().flush()
+        self._last_flush = time.monotonic()
+
+
+def _log_path():
+    path = getattr(settings, "PURCHASE_EVENTS_LOG", None)
+    return path or os.path.join(settings.BASE_DIR, "logs", "purchase_events.jsonl")
+
+
+def _ensure_started():
+    global _listener
+    if _listener is not None:
+        return
+    with _start_lock:
+        if _listener is not None:
+            return
+        path = _log_path()
+        os.makedirs(os.path.dirname(os.fspath(path)), exist_ok=True)
+        file_handler = logging.FileHandler(path, encoding="utf-8", delay=True)
+        file_handler.setFormatter(JsonLinesFormatter())
+        buffered = _TimedMemoryHandler(BUFFER_CAPACITY, flushLevel=logging.CRITICAL + 1, target=file_handler)
+
+        q = queue.Queue(QUEUE_MAXSIZE)
+        _logger.addHandler(_EventQueueHandler(q))
+        _logger.setLevel(logging.INFO)
+        _listener = logging.handlers.QueueListener(q, buffered)
+        _listener.start()
+        atexit.register(stop_event_sink)
+
+
+def stop_event_sink():
+    """Para a thread e grava o que estiver no buffer (chamado no atexit)."""
+    global _listener
+    with _start_lock:
+        listener, _listener = _listener, None
+    if listener is None:
+        return
+    listener.stop()
+    for h in listener.handlers:
+        target = getattr(h, "target", None)
+        h.close()  # MemoryHandler.close grava o buffer no target
+        if target is not None:
+            target.close()
+    for h in list(_logger.handlers):
+        _logger.removeHandler(h)
+
+
+def sample_rate(event):
+    rates = getattr(settings, "PURCHASE_EVENT_SAMPLE_RATES", None) or {}
+    return float(rates.get(event, DEFAULT_SAMPLE_RATES.get(event, 1.0)))
+
+
+def emit_purchase_event(event, **fields):
+    """Registra um evento de compra (amostrado). Nunca lança exceção nem faz I/O."""
+    rate = sample_rate(event)
+    if rate <= 0 or (rate < 1 and random.random() >= rate):
+        return
+    try:
+        _ensure_started()
+        payload = {"ts": round(time.time(), 3), "event": event, "sample_rate": rate}
+        payload.update(fields)
+        _logger.info(payload)
+    except Exception:
+        logging.getLogger(__name__).exception("Falha ao registrar evento de compra")
@@ -0,0 +1,40 @@
+# sistemas/ids.py
+"""
+Canonicalização de ids (UUID).
+- No banco (UUIDField no sqlite) os ids ficam como hex de 32 chars; o Django converte nos lookups.
+- Em JSON (snapshots, slots, InventoryItem.object_id) a forma canônica é str(UUID), com hífens.
+Qualquer entrada (com/sem hífens, maiúsculas, UUID) passa por aqui antes de virar lookup:
+id inválido retorna None e não gera query nenhuma.
+"""
+
+import uuid
+
+
+def parse_uuid(value):
+    """uuid.UUID a partir de qualquer forma aceita, ou None se inválido."""
+    if isinstance(value, uuid.UUID):
+        return value
+    if value is None:
+        return None
+    try:
+        return uuid.UUID(str(value).strip())
+    except (ValueError, AttributeError, TypeError):
+        return None
+
+
+def canonical_id(value):
+    """Forma canônica para JSON/object_id (str com hífens), ou None se inválido."""
+    u = parse_uuid(value)
+    return str(u) if u is not None else None
+
+
+def canonical_ids(values):
+    """Lista de UUIDs válidos e sem repetição (mantém a ordem); inválidos são descartados."""
+    out = []
+    seen = set()
+    for v in values:
+        u = parse_uuid(v)
+        if u is not None and u not in seen:
+            seen.add(u)
+            out.append(u)
+    return out
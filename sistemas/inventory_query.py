@@ -0,0 +1,178 @@
+# sistemas/inventory_query.py
+"""
+Consulta paginada do inventário (API JSON /inventory/api/) e diário de mudanças (/inventory/changes/).
+- Filtros (type, position, club, overall) nas colunas copiadas do snapshot em InventoryItem,
+  cobertas pelos índices (user, ...).
+- Paginação keyset: o cursor guarda (valor da chave de ordenação, id) do último item da página e a
+  próxima página é um seek `(chave, id) < cursor` no índice, sem OFFSET. O custo de uma página não
+  cresce com o tamanho do inventário nem com o número da página.
+- Sincronização incremental: InventoryChange.id é a sequência; o cliente guarda o `seq` da última
+  resposta e pede só as mudanças com id maior (custo proporcional às mudanças, não ao inventário).
+"""
+
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+
+from .models import InventoryChange, InventoryItem
+from .snapshots import TYPE_FIELD, TYPE_GK, normalize_position
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+MAX_CHANGES_PAGE = 1000
+
+# sort aceito -> campo de ordenação; prefixo "-" = decrescente
+SORTS = {
+    "overall": "overall",
+    "-overall": "overall",
+    "obtained_at": "obtained_at",
+    "-obtained_at": "obtained_at",
+}
+DEFAULT_SORT = "-obtained_at"
+
+
+class InventoryQueryError(ValueError):
+    """Parâmetro inválido na consulta (vira HTTP 400)."""
+
+
+def encode_cursor(sort, value, pk):
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([sort, value, pk], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor, sort):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        c_sort, value, pk = json.loads(raw)
+        pk = int(pk)
+        if SORTS[sort] == "obtained_at":
+            value = datetime.fromisoformat(value)
+        else:
+            value = int(value)
+    except (ValueError, TypeError, KeyError, json.JSONDecodeError):
+        raise InventoryQueryError("Cursor inválido.")
+    if c_sort != sort:
+        raise InventoryQueryError("Cursor de outra ordenação.")
+    return value, pk
+
+
+def _int_param(params, name, default=None):
+    raw = params.get(name)
+    if raw in (None, ""):
+        return default
+    try:
+        return int(raw)
+    except (TypeError, ValueError):
+        raise InventoryQueryError(f"Parâmetro inválido: {name}.")
+
+
+def filtered_inventory(user, params):
+    """QuerySet do inventário do usuário com os filtros de `params` (type, position, club, min/max_overall)."""
+    qs = InventoryItem.objects.filter(user=user).exclude(player_type="")
+
+    p_type = (params.get("type") or "").strip().lower()
+    if p_type:
+        if p_type not in (TYPE_FIELD, TYPE_GK):
+            raise InventoryQueryError("Parâmetro inválido: type.")
+        qs = qs.filter(player_type=p_type)
+
+    position = (params.get("position") or "").strip()
+    if position:
+        pos = normalize_position(position)
+        if pos is None:
+            raise InventoryQueryError("Parâmetro inválido: position.")
+        qs = qs.filter(player_type=TYPE_FIELD, position=pos)
+
+    club = (params.get("club") or "").strip()
+    if club:
+        qs = qs.filter(club=club)
+
+    min_overall = _int_param(params, "min_overall")
+    max_overall = _int_param(params, "max_overall")
+    if min_overall is not None:
+        qs = qs.filter(overall__gte=min_overall)
+    if max_overall is not None:
+        qs = qs.filter(overall__lte=max_overall)
+    return qs
+
+
+def inventory_page(user, params):
+    """
+    Uma página do inventário. params: type, position, club, min_overall, max_overall,
+    sort (overall|-overall|obtained_at|-obtained_at), limit, cursor.
+    Retorna dict com items, next_cursor (None na última página), sort, limit e seq (diário).
+    """
+    sort = (params.get("sort") or DEFAULT_SORT).strip()
+    if sort not in SORTS:
+        raise InventoryQueryError("Parâmetro inválido: sort.")
+    field = SORTS[sort]
+    desc = sort.startswith("-")
+    limit = max(1, min(_int_param(params, "limit", DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE))
+
+    # lida antes da página: mudanças concorrentes ficam com id > seq e chegam pelo diário
+    seq = current_seq(user)
+    qs = filtered_inventory(user, params)
+    cursor = params.get("cursor")
+    if cursor:
+        value, pk = decode_cursor(cursor, sort)
+        op = "lt" if desc else "gt"
+        qs = qs.filter(Q(**{f"{field}__{op}": value}) | Q(**{field: value, f"id__{op}": pk}))
+
+    prefix = "-" if desc else ""
+    rows = list(
+        qs.order_by(f"{prefix}{field}", f"{prefix}id")
+        .values_list("id", "player_data", "qty", "obtained_at", "overall")[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    items = [
+        dict(snap, qty=qty, obtained_at=obtained_at.isoformat())
+        for (_, snap, qty, obtained_at, _) in rows
+    ]
+    next_cursor = None
+    if has_more:
+        pk, _, _, obtained_at, overall = rows[-1]
+        next_cursor = encode_cursor(sort, obtained_at if field == "obtained_at" else overall, pk)
+    return {"items": items, "next_cursor": next_cursor, "sort": sort, "limit": limit, "seq": seq}
+
+
+def current_seq(user):
+    """Última sequência do diário de inventário do usuário (0 se vazio); serve de versão para cache."""
+    return (
+        InventoryChange.objects.filter(user=user).order_by("-id").values_list("id", flat=True).first() or 0
+    )
+
+
+def changes_since(user, params):
+    """
+    Mudanças do inventário com id > since, uma entrada por jogador (a mais recente da página).
+    params: since (default 0), limit. Itens added/updated trazem o snapshot atual do item.
+    Retorna dict com changes, seq (próximo since) e has_more.
+    """
+    since = max(0, _int_param(params, "since", 0))
+    limit = max(1, min(_int_param(params, "limit", MAX_CHANGES_PAGE), MAX_CHANGES_PAGE))
+    rows = list(
+        InventoryChange.objects.filter(user=user, id__gt=since).order_by("id")
+        .values_list("id", "player_id", "op", "qty")[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if not rows:
+        return {"changes": [], "seq": since, "has_more": False}
+
+    latest = {}
+    for seq, pid, op, qty in rows:
+        latest.pop(pid, None)  # reinsere no fim: ordem final = ordem da última mudança
+        latest[pid] = {"seq": seq, "player_id": pid, "op": op, "qty": qty}
+    live = [pid for pid, ch in latest.items() if ch["op"] != InventoryChange.OP_REMOVED]
+    snapshots = dict(
+        InventoryItem.objects.filter(user=user, player_id__in=live).values_list("player_id", "player_data")
+    ) if live else {}
+    for pid in live:
+        latest[pid]["player"] = snapshots.get(pid)
+    return {"changes": list(latest.values()), "seq": rows[-1][0], "has_more": has_more}
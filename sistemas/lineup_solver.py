@@ -0,0 +1,173 @@
+# sistemas/lineup_solver.py
+"""
+Melhor 1-4-3-3 possível a partir das cartas do usuário (ação "auto escalar" do my_team).
+Funções puras (sem ORM), como ai_lineups.
+
+Modelo: problema de atribuição entre os 11 slots e os NOMES de jogador (regra do set-slot: nome
+repetido não entra no time). O peso de (slot, nome) é a melhor carta daquele nome elegível para a
+seção do slot (gk / DefensiveZone / NeutralZone / OffensiveZone). Resolvido pelo algoritmo húngaro
+(caminhos aumentantes mais curtos, O(n² m) com n = 11 slots).
+
+Poda: numa seção com k slots, nomes fora do top 11 daquela seção nunca são necessários (no máximo
+11 - k nomes do top podem ir para outras seções), então a matriz tem no máximo 11 x 44 colunas
+reais, qualquer que seja o tamanho do inventário.
+"""
+
+from .snapshots import POSITION_DEF, POSITION_NEU, POSITION_OFF, TYPE_FIELD, TYPE_GK
+
+SECTIONS = (("gk", 1), ("def", 4), ("mid", 3), ("off", 3))
+SLOT_KEYS = tuple("gk" if sec == "gk" else f"{sec}_{i}" for sec, n in SECTIONS for i in range(n))
+LINEUP_SIZE = len(SLOT_KEYS)
+SECTION_POSITION = {"def": POSITION_DEF, "mid": POSITION_NEU, "off": POSITION_OFF}
+
+OBJECTIVE_OVERALL = "overall"
+OBJECTIVE_SIM = "sim"
+
+
+def _num(snap, key):
+    try:
+        return float(snap.get(key) or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _score_overall(snap):
+    return _num(snap, "overall")
+
+
+def _score_sim(snap):
+    """
+    Contribuição da carta para as forças que _simulate_match usa: posse e chute crescem com a soma de
+    attack, a marcação com a soma de defense, o meio com passing (peso 0.5 no chute) e o goleiro
+    pesa handling * 1.8 contra a finalização. A formação não entra na conta do simulador.
+    """
+    if snap.get("type") == TYPE_GK:
+        return 1.8 * _num(snap, "handling")
+    return _num(snap, "attack") + _num(snap, "defense") + 0.5 * _num(snap, "passing")
+
+
+OBJECTIVES = {
+    OBJECTIVE_OVERALL: _score_overall,
+    OBJECTIVE_SIM: _score_sim,
+}
+
+
+def card_section(snap):
+    """Seção ('gk', 'def', 'mid', 'off') em que a carta pode jogar, ou None."""
+    if snap.get("type") == TYPE_GK:
+        return "gk"
+    if snap.get("type") == TYPE_FIELD:
+        for sec, pos in SECTION_POSITION.items():
+            if snap.get("position") == pos:
+                return sec
+    return None
+
+
+def _name_key(snap):
+    return (snap.get("name") or snap.get("id") or "").strip().lower()
+
+
+def _hungarian(cost):
+    """
+    Atribuição de custo mínimo para matriz n x m (n <= m): cada linha recebe uma coluna distinta.
+    Retorna lista col_da_linha. Potenciais + caminho aumentante mais curto (Kuhn-Munkres).
+    """
+    n = len(cost)
+    m = len(cost[0]) if n else 0
+    inf = float("inf")
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    p = [0] * (m + 1)      # p[j] = linha (1-based) atribuída à coluna j
+    way = [0] * (m + 1)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = [inf] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            delta = inf
+            j1 = 0
+            row = cost[i0 - 1]
+            ui0 = u[i0]
+            for j in range(1, m + 1):
+                if not used[j]:
+                    cur = row[j - 1] - ui0 - v[j]
+                    if cur < minv[j]:
+                        minv[j] = cur
+                        way[j] = j0
+                    if minv[j] < delta:
+                        delta = minv[j]
+                        j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while True:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+            if j0 == 0:
+                break
+    col_of_row = [0] * n
+    for j in range(1, m + 1):
+        if p[j]:
+            col_of_row[p[j] - 1] = j - 1
+    return col_of_row
+
+
+def best_lineup(cards, objective=OBJECTIVE_OVERALL):
+    """
+    cards: snapshots (dict) disponíveis. Retorna (lineup, total) com lineup = {slot_key: snapshot ou None}
+    maximizando a soma do objetivo, sem nomes repetidos. Slots sem carta elegível ficam None.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Objetivo desconhecido: {objective}")
+    score = OBJECTIVES[objective]
+
+    # melhor carta de cada nome em cada seção
+    best = {}  # (sec, name) -> (score, snap)
+    for snap in cards:
+        if not isinstance(snap, dict):
+            continue
+        sec = card_section(snap)
+        if sec is None:
+            continue
+        key = (sec, _name_key(snap))
+        s = score(snap)
+        if key not in best or s > best[key][0]:
+            best[key] = (s, snap)
+
+    # poda: top LINEUP_SIZE nomes por seção
+    candidates = {}  # name -> {sec: (score, snap)}
+    for sec, _ in SECTIONS:
+        ranked = sorted(((v, name) for (s, name), v in best.items() if s == sec), key=lambda t: -t[0][0])
+        for v, name in ranked[:LINEUP_SIZE]:
+            candidates.setdefault(name, {})[sec] = v
+    names = list(candidates)
+
+    # custo = -score; coluna proibida = custo alto; LINEUP_SIZE colunas "vazio" com custo ~0
+    big = 1e12
+    cost = []
+    for slot in SLOT_KEYS:
+        sec = slot.split("_")[0]
+        row = [-candidates[name][sec][0] if sec in candidates[name] else big for name in names]
+        row.extend([1e-6] * LINEUP_SIZE)  # vazio só quando não há carta elegível
+        cost.append(row)
+
+    lineup = {slot: None for slot in SLOT_KEYS}
+    total = 0.0
+    for r, c in enumerate(_hungarian(cost)):
+        if c < len(names):
+            sec = SLOT_KEYS[r].split("_")[0]
+            entry = candidates[names[c]].get(sec)
+            if entry is not None:
+                lineup[SLOT_KEYS[r]] = entry[1]
+                total += entry[0]
+    return lineup, round(total, 2)
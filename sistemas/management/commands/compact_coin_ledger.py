@@ -0,0 +1,32 @@
+# sistemas/management/commands/compact_coin_ledger.py
+"""
+Dobra os créditos pendentes do livro-razão (CoinTransaction) em SistemasUser.coins.
+Rode periodicamente (cron), p.ex. a cada minuto:
+    python manage.py compact_coin_ledger
+    python manage.py compact_coin_ledger --user <uuid> --grace 0
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sistemas.coins import compact_all, compact_user
+from sistemas.ids import parse_uuid
+
+
+class Command(BaseCommand):
+    help = "Compacta o livro-razão de moedas (créditos pendentes -> SistemasUser.coins)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", default=None, help="Compacta apenas este usuário (id).")
+        parser.add_argument("--grace", type=int, default=None,
+                            help="Idade mínima (s) dos lançamentos compactados (default: 0 no sqlite, 5 nos demais).")
+
+    def handle(self, *args, **opts):
+        if opts["user"]:
+            user_id = parse_uuid(opts["user"])
+            if user_id is None:
+                raise CommandError(f"Id inválido: {opts['user']}")
+            folded = compact_user(user_id, grace_seconds=opts["grace"])
+            self.stdout.write(self.style.SUCCESS(f"Usuário {user_id}: {folded} moedas compactadas."))
+            return
+        users, folded = compact_all(grace_seconds=opts["grace"])
+        self.stdout.write(self.style.SUCCESS(f"{users} usuário(s), {folded} moedas compactadas."))
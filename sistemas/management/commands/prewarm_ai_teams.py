@@ -0,0 +1,126 @@
+# sistemas/management/commands/prewarm_ai_teams.py
+"""
+Pré-gera um pool de AITeam (random e/ou authentic) para as partidas consumirem.
+- Geração em paralelo num ProcessPoolExecutor (funções puras de sistemas.ai_lineups).
+- Gravação com bulk_create em lotes (--batch-size).
+- Cada time é marcado com a versão do catálogo e a força (média de overall);
+  as views só consomem times da versão atual do catálogo.
+
+Exemplos:
+    python manage.py prewarm_ai_teams --count 5000
+    python manage.py prewarm_ai_teams --count 2000 --kind authentic --workers 4 --purge-stale
+"""
+
+import random
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from sistemas.ai_lineups import (
+    build_random_lineup, clubs_with_enough_players, generate_chunk, init_worker,
+)
+from sistemas.catalog import catalog_version, load_catalog_snapshots
+from sistemas.models import AITeam
+
+CHUNK_SIZE = 250  # lineups por tarefa enviada ao pool
+
+
+class Command(BaseCommand):
+    help = "Pré-gera times AI (random/authentic) em lote para o pool de adversários."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=1000,
+                            help="Quantidade de times por tipo (default: 1000).")
+        parser.add_argument("--kind", choices=["random", "authentic", "both"], default="both",
+                            help="Tipo de time a gerar (default: both).")
+        parser.add_argument("--batch-size", type=int, default=500,
+                            help="Tamanho do lote do bulk_create (default: 500).")
+        parser.add_argument("--workers", type=int, default=None,
+                            help="Processos no pool (default: os.cpu_count()). Use 1 para rodar sem pool.")
+        parser.add_argument("--seed", type=int, default=None,
+                            help="Seed base para reprodutibilidade.")
+        parser.add_argument("--purge-stale", action="store_true",
+                            help="Remove times do pool gerados com outra versão do catálogo.")
+
+    def handle(self, *args, **opts):
+        count = opts["count"]
+        if count <= 0:
+            raise CommandError("--count deve ser > 0.")
+        batch_size = max(1, opts["batch_size"])
+        kinds = [AITeam.KIND_RANDOM, AITeam.KIND_AUTHENTIC] if opts["kind"] == "both" else [opts["kind"]]
+
+        field_snaps, gk_snaps = load_catalog_snapshots()
+        version = catalog_version(use_cache=False)
+        self.stdout.write(f"Catálogo {version}: {len(field_snaps)} jogadores de campo, {len(gk_snaps)} goleiros.")
+
+        # validar antes de abrir o pool (erros claros em vez de exceções nos workers)
+        try:
+            build_random_lineup(field_snaps, gk_snaps)
+        except RuntimeError as exc:
+            raise CommandError(str(exc))
+        if AITeam.KIND_AUTHENTIC in kinds and not clubs_with_enough_players(field_snaps, gk_snaps):
+            self.stderr.write("Nenhum clube com 1 GK + 10 jogadores de campo: pulando 'authentic'.")
+            kinds.remove(AITeam.KIND_AUTHENTIC)
+
+        if opts["purge_stale"]:
+            deleted, _ = AITeam.objects.filter(pooled=True).exclude(catalog_version=version).delete()
+            self.stdout.write(f"Removidos {deleted} times de versões antigas do catálogo.")
+
+        base_seed = opts["seed"] if opts["seed"] is not None else random.randrange(1 << 30)
+        tasks = []
+        for kind in kinds:
+            remaining = count
+            while remaining > 0:
+                n = min(CHUNK_SIZE, remaining)
+                tasks.append((kind, n, base_seed + len(tasks)))
+                remaining -= n
+
+        workers = opts["workers"]
+        if workers == 1:
+            init_worker(field_snaps, gk_snaps)
+            results = (generate_chunk(*t) for t in tasks)
+            self._store(results, version, batch_size)
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                     initargs=(field_snaps, gk_snaps)) as executor:
+                results = executor.map(generate_chunk, *zip(*tasks))
+                self._store(results, version, batch_size)
+
+    def _store(self, chunks, version, batch_size):
+        created = {AITeam.KIND_RANDOM: 0, AITeam.KIND_AUTHENTIC: 0}
+        pending = []
+
+        def flush():
+            if not pending:
+                return
+            with transaction.atomic():
+                AITeam.objects.bulk_create(pending, batch_size=batch_size)
+            pending.clear()
+
+        for chunk in chunks:
+            for item in chunk:
+                suffix = uuid.uuid4().hex[:6]
+                if item["kind"] == AITeam.KIND_AUTHENTIC:
+                    name = f"AUTH {item['club'][:12]} {suffix}"
+                else:
+                    name = f"AI Team {suffix}"
+                pending.append(AITeam(
+                    name=name,
+                    slots=item["slots"],
+                    kind=item["kind"],
+                    club=item["club"],
+                    catalog_version=version,
+                    strength=item["strength"],
+                    pooled=True,
+                ))
+                created[item["kind"]] += 1
+                if len(pending) >= batch_size:
+                    flush()
+        flush()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Pool atualizado: {created[AITeam.KIND_RANDOM]} random, "
+            f"{created[AITeam.KIND_AUTHENTIC]} authentic (catálogo {version})."
+        ))
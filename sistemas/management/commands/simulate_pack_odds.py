@@ -0,0 +1,76 @@
+# sistemas/management/commands/simulate_pack_odds.py
+"""
+Simula a abertura de packs pelo sampler de produção e reporta odds e valor esperado.
+Packs com economia ruim (arbitragem de revenda, entrada dominante, pack dominado,
+sampler divergente, pack vazio) aparecem com flags.
+
+Exemplos:
+    python manage.py simulate_pack_odds
+    python manage.py simulate_pack_odds --pack <uuid> --samples 5000000 --seed 42 --json
+"""
+
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sistemas.ids import parse_uuid
+from sistemas.models import InventoryItem, Pack
+from sistemas.pack_odds import DEFAULT_SAMPLES, simulate_packs
+
+
+class Command(BaseCommand):
+    help = "Simula odds/valor esperado dos packs e marca packs com economia ruim."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pack", default=None, help="Id de um pack (default: todos).")
+        parser.add_argument("--samples", type=int, default=DEFAULT_SAMPLES,
+                            help=f"Sorteios por pack (default: {DEFAULT_SAMPLES}).")
+        parser.add_argument("--seed", type=int, default=None, help="Seed para reprodutibilidade.")
+        parser.add_argument("--top", type=int, default=10, help="Entradas listadas por pack (0 = todas).")
+        parser.add_argument("--json", action="store_true", help="Saída em JSON.")
+
+    def handle(self, *args, **opts):
+        if opts["samples"] <= 0:
+            raise CommandError("--samples deve ser > 0.")
+        packs = Pack.objects.order_by("-created_at")
+        if opts["pack"]:
+            pack_uuid = parse_uuid(opts["pack"])
+            packs = packs.filter(pk=pack_uuid) if pack_uuid else packs.none()
+            if not packs.exists():
+                raise CommandError(f"Pack não encontrado: {opts['pack']}")
+
+        started = time.perf_counter()
+        reports = simulate_packs(list(packs), samples=opts["samples"], seed=opts["seed"], top=opts["top"])
+        elapsed = time.perf_counter() - started
+
+        if opts["json"]:
+            self.stdout.write(json.dumps(
+                {"samples": opts["samples"], "sale_price": InventoryItem.SALE_PRICE, "packs": reports},
+                ensure_ascii=False, indent=2,
+            ))
+            return
+
+        for r in reports:
+            self.stdout.write(f"\n=== {r['name']} ({r['pack_id']}) — {r['price']} coins ===")
+            if not r["entries"]:
+                self.stdout.write(self.style.WARNING("  sem entradas com peso > 0"))
+                continue
+            self.stdout.write(
+                f"  entradas: {r['entries']}  sorteios: {r['samples']}\n"
+                f"  overall esperado: {r['expected_overall']} (exato {r['expected_overall_exact']}), "
+                f"desvio-padrão {r['overall_stddev']}, variância {r['overall_variance']}\n"
+                f"  P(overall >= {r['elite_overall']}): {r['p_elite']:.4%}\n"
+                f"  revenda esperada: {r['expected_resale']} coins (margem {r['resale_margin']:+d}, "
+                f"razão {r['resale_ratio']})\n"
+                f"  maior odd: {r['max_entry_p']:.4%}  desvio máx. do sampler: {r['sampler_max_z']} dp"
+            )
+            for o in r["top_odds"]:
+                self.stdout.write(
+                    f"    {o['p_empirical']:8.4%} (exato {o['p_exact']:8.4%})  "
+                    f"{o['name']} [{o['type']}] OVR {o['overall']} peso {o['weight']}"
+                )
+            if r["flags"]:
+                self.stdout.write(self.style.ERROR("  FLAGS: " + ", ".join(r["flags"])))
+
+        self.stdout.write(f"\n{len(reports)} pack(s) em {elapsed:.2f}s.")
@@ -0,0 +1,117 @@
+# sistemas/match_history.py
+"""
+Histórico de partidas em formato compacto.
+- Match guarda seed, placar, resumo (stats) e as duas escalações (snapshots) num blob zlib; os
+  eventos não são gravados: a simulação é determinística dadas a seed e as escalações, então o replay
+  os regenera sob demanda. Partidas antigas (sem seed) continuam lendo Match.events.
+- Listagem paginada por keyset em (created_at, id), coberta pelo índice (user_team, created_at), lendo
+  só as colunas pequenas (sem events/lineups).
+"""
+
+import base64
+import json
+import uuid
+import zlib
+from datetime import datetime
+
+from django.db.models import Q
+
+from .models import Match
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+SHOT_EVENTS = ("goal", "keeper_save", "miss")
+HISTORY_FIELDS = (
+    "id", "created_at", "home_is_user", "score_home", "score_away",
+    "opponent_name", "coins_awarded", "stats",
+)
+
+
+class MatchHistoryError(ValueError):
+    """Parâmetro inválido na listagem do histórico."""
+
+
+def pack_lineups(user_slots, ai_slots):
+    raw = json.dumps({"user": user_slots, "ai": ai_slots}, separators=(",", ":"), ensure_ascii=False)
+    return zlib.compress(raw.encode("utf-8"), 9)
+
+
+def unpack_lineups(blob):
+    """(user_slots, ai_slots) do blob; (None, None) se a partida não tiver escalações gravadas."""
+    if not blob:
+        return None, None
+    data = json.loads(zlib.decompress(bytes(blob)).decode("utf-8"))
+    return data.get("user"), data.get("ai")
+
+
+def summarize(events):
+    """Resumo da partida para o histórico: posse (% mandante) e finalizações por lado."""
+    possession = [e.get("possession_home") for e in events if e.get("possession_home") is not None]
+    shots = {"home": 0, "away": 0}
+    for e in events:
+        if e.get("event_type") in SHOT_EVENTS:
+            shots["home" if e.get("possession_home") else "away"] += 1
+    return {
+        "possession_home": round(100 * sum(1 for p in possession if p) / len(possession)) if possession else 50,
+        "shots_home": shots["home"],
+        "shots_away": shots["away"],
+    }
+
+
+def encode_cursor(created_at, pk):
+    raw = json.dumps([created_at.isoformat(), str(pk)], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, pk = json.loads(raw)
+        return datetime.fromisoformat(created_at), uuid.UUID(pk)
+    except (ValueError, TypeError, json.JSONDecodeError):
+        raise MatchHistoryError("Cursor inválido.")
+
+
+def _row(row):
+    """Linha do histórico do ponto de vista do usuário."""
+    if row["home_is_user"]:
+        goals_for, goals_against = row["score_home"], row["score_away"]
+    else:
+        goals_for, goals_against = row["score_away"], row["score_home"]
+    stats = row["stats"] or {}
+    possession = stats.get("possession_home")
+    if possession is not None and not row["home_is_user"]:
+        possession = 100 - possession
+    return {
+        "id": str(row["id"]),
+        "created_at": row["created_at"],
+        "opponent": row["opponent_name"] or "Adversário",
+        "goals_for": goals_for,
+        "goals_against": goals_against,
+        "result": "V" if goals_for > goals_against else ("E" if goals_for == goals_against else "D"),
+        "coins_awarded": row["coins_awarded"],
+        "possession": possession,
+    }
+
+
+def history_page(team, params):
+    """
+    Uma página do histórico do time, mais recente primeiro. params: limit, cursor.
+    Retorna dict com items e next_cursor (None na última página).
+    """
+    try:
+        limit = int(params.get("limit") or DEFAULT_PAGE_SIZE)
+    except (TypeError, ValueError):
+        raise MatchHistoryError("Parâmetro inválido: limit.")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    qs = Match.objects.filter(user_team=team)
+    cursor = params.get("cursor")
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        qs = qs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+    rows = list(qs.order_by("-created_at", "-id").values(*HISTORY_FIELDS)[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"]) if has_more else None
+    return {"items": [_row(r) for r in rows], "next_cursor": next_cursor}
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sistemas', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aiteam',
+            name='catalog_version',
+            field=models.CharField(blank=True, default='', max_length=40),
+        ),
+        migrations.AddField(
+            model_name='aiteam',
+            name='club',
+            field=models.CharField(blank=True, default='', max_length=150),
+        ),
+        migrations.AddField(
+            model_name='aiteam',
+            name='kind',
+            field=models.CharField(choices=[('random', 'Random'), ('authentic', 'Authentic')], default='random', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='aiteam',
+            name='pooled',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='aiteam',
+            name='strength',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='aiteam',
+            index=models.Index(fields=['pooled', 'kind', 'catalog_version'], name='ai_team_pool_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sistemas', '0002_ai_team_pool'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pack',
+            name='entries_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
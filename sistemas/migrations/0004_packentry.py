@@ -0,0 +1,133 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:01
+
+import logging
+import uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Tabelas cujas PKs UUID foram gravadas pelos scripts CRUD com hífens (str(uuid4())).
+# O Django grava/consulta UUIDField como 32 hex sem hífens em bancos sem tipo uuid nativo;
+# as FKs de PackEntry exigem o mesmo formato dos dois lados.
+UUID_PK_TABLES = ("jogadores_campo", "jogadores_goleiros", "sistemas_packs")
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_uuid_pks(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.features.has_native_uuid_field:
+        return
+    with connection.cursor() as cursor:
+        for table in UUID_PK_TABLES:
+            cursor.execute(
+                f"UPDATE {connection.ops.quote_name(table)} SET id = lower(replace(id, '-', '')) WHERE id LIKE '%-%'"
+            )
+
+
+def _canonical_uuid(value):
+    try:
+        return uuid.UUID(str(value).strip())
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def json_to_packentries(apps, schema_editor):
+    Pack = apps.get_model("sistemas", "Pack")
+    PackEntry = apps.get_model("sistemas", "PackEntry")
+    JogadorCampo = apps.get_model("sistemas", "JogadorCampo")
+    JogadorGoleiro = apps.get_model("sistemas", "JogadorGoleiro")
+
+    field_ids = set(JogadorCampo.objects.values_list("id", flat=True))
+    gk_ids = set(JogadorGoleiro.objects.values_list("id", flat=True))
+
+    to_create = []
+    skipped = 0
+    for pack in Pack.objects.all():
+        seen = set()
+        for ptype, raw_list, valid_ids in (("field", pack.field_players, field_ids), ("gk", pack.gk_players, gk_ids)):
+            for e in raw_list or []:
+                if not isinstance(e, dict):
+                    skipped += 1
+                    continue
+                pid = _canonical_uuid(e.get("id"))
+                if pid is None or pid not in valid_ids or (ptype, pid) in seen:
+                    skipped += 1
+                    continue
+                seen.add((ptype, pid))
+                try:
+                    weight = max(0, int(e.get("weight", 1) or 0))
+                except (TypeError, ValueError):
+                    weight = 1
+                to_create.append(PackEntry(
+                    pack_id=pack.pk,
+                    type=ptype,
+                    player_field_id=pid if ptype == "field" else None,
+                    player_gk_id=pid if ptype == "gk" else None,
+                    weight=weight,
+                    note=str(e.get("note") or "")[:255],
+                ))
+        pack.entries_version = (pack.entries_version or 0) + 1
+        pack.save(update_fields=["entries_version"])
+    PackEntry.objects.bulk_create(to_create, batch_size=500)
+    if skipped:
+        logger.warning("PackEntry: %d entradas JSON ignoradas (jogador inexistente, id inválido ou duplicado).", skipped)
+
+
+def packentries_to_json(apps, schema_editor):
+    Pack = apps.get_model("sistemas", "Pack")
+    PackEntry = apps.get_model("sistemas", "PackEntry")
+    for pack in Pack.objects.all():
+        field_list, gk_list = [], []
+        for e in PackEntry.objects.filter(pack_id=pack.pk).select_related("player_field", "player_gk").order_by("id"):
+            player = e.player_field if e.type == "field" else e.player_gk
+            item = {"id": str(player.id), "name": player.name, "club": player.club,
+                    "country": player.country, "photo_path": player.photo_path, "overall": player.overall,
+                    "weight": e.weight, "note": e.note}
+            if e.type == "field":
+                item.update(attack=player.attack, passing=player.passing, defense=player.defense, speed=player.speed)
+                field_list.append(item)
+            else:
+                item.update(handling=player.handling, positioning=player.positioning, reflex=player.reflex, speed=player.speed)
+                gk_list.append(item)
+        pack.field_players = field_list
+        pack.gk_players = gk_list
+        pack.save(update_fields=["field_players", "gk_players"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sistemas', '0003_pack_entries_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_uuid_pks, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='PackEntry',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('type', models.CharField(choices=[('field', 'Jogador de campo'), ('gk', 'Goleiro')], max_length=5)),
+                ('weight', models.PositiveIntegerField(default=1)),
+                ('note', models.CharField(blank=True, default='', max_length=255)),
+                ('pack', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='sistemas.pack')),
+                ('player_field', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='pack_entries', to='sistemas.jogadorcampo')),
+                ('player_gk', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='pack_entries', to='sistemas.jogadorgoleiro')),
+            ],
+            options={
+                'db_table': 'sistemas_packentry',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['pack', 'type'], name='packentry_pack_type_idx')],
+                'constraints': [models.UniqueConstraint(fields=('pack', 'player_field'), name='packentry_unique_field'), models.UniqueConstraint(fields=('pack', 'player_gk'), name='packentry_unique_gk'), models.CheckConstraint(condition=models.Q(models.Q(('player_field__isnull', False), ('player_gk__isnull', True), ('type', 'field')), models.Q(('player_field__isnull', True), ('player_gk__isnull', False), ('type', 'gk')), _connector='OR'), name='packentry_one_player')],
+            },
+        ),
+        migrations.RunPython(json_to_packentries, packentries_to_json),
+        migrations.RemoveField(
+            model_name='pack',
+            name='field_players',
+        ),
+        migrations.RemoveField(
+            model_name='pack',
+            name='gk_players',
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:14
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def opening_balances(apps, schema_editor):
+    """Um lançamento 'opening' (liquidado) por usuário com o saldo atual: o razão começa completo."""
+    SistemasUser = apps.get_model("sistemas", "SistemasUser")
+    CoinTransaction = apps.get_model("sistemas", "CoinTransaction")
+    CoinTransaction.objects.bulk_create(
+        [
+            CoinTransaction(user_id=uid, amount=coins or 0, kind="opening", settled=True)
+            for uid, coins in SistemasUser.objects.values_list("id", "coins")
+        ],
+        batch_size=500,
+    )
+
+
+def remove_opening_balances(apps, schema_editor):
+    CoinTransaction = apps.get_model("sistemas", "CoinTransaction")
+    CoinTransaction.objects.filter(kind="opening").delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sistemas', '0004_packentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sistemasuser',
+            name='coins_ledger_seq',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='CoinTransaction',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('amount', models.IntegerField()),
+                ('kind', models.CharField(choices=[('opening', 'Saldo inicial'), ('pack_purchase', 'Compra de pack'), ('card_sale', 'Venda de carta'), ('match_reward', 'Prêmio de partida'), ('adjustment', 'Ajuste')], max_length=20)),
+                ('ref', models.CharField(blank=True, default='', max_length=64)),
+                ('settled', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='coin_transactions', to='sistemas.sistemasuser')),
+            ],
+            options={
+                'db_table': 'sistemas_coin_transaction',
+                'indexes': [models.Index(fields=['user', 'created_at'], name='coin_tx_user_time_idx'), models.Index(fields=['user', 'settled', 'id'], name='coin_tx_pending_idx'), models.Index(fields=['created_at'], name='coin_tx_time_idx')],
+            },
+        ),
+        migrations.RunPython(opening_balances, remove_opening_balances),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:15
+
+import uuid
+
+from django.db import migrations, models
+
+
+def _player_id(object_id, player_data):
+    # mesma regra de InventoryItem.compute_player_id (modelos históricos não têm os métodos)
+    pd_id = player_data.get("id") if isinstance(player_data, dict) else None
+    for candidate in (object_id, pd_id):
+        if candidate:
+            try:
+                return str(uuid.UUID(str(candidate).strip()))
+            except (TypeError, ValueError, AttributeError):
+                return str(candidate).strip()[:36]
+    return ""
+
+
+def backfill_player_id(apps, schema_editor):
+    InventoryItem = apps.get_model("sistemas", "InventoryItem")
+    batch = []
+    # lista materializada: no sqlite não dá para escrever na tabela enquanto um cursor a percorre
+    for item in list(InventoryItem.objects.only("id", "object_id", "player_data")):
+        item.player_id = _player_id(item.object_id, item.player_data)
+        batch.append(item)
+        if len(batch) >= 1000:
+            InventoryItem.objects.bulk_update(batch, ["player_id"])
+            batch = []
+    if batch:
+        InventoryItem.objects.bulk_update(batch, ["player_id"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('sistemas', '0005_coin_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventoryitem',
+            name='player_id',
+            field=models.CharField(blank=True, default='', max_length=36),
+        ),
+        migrations.AddIndex(
+            model_name='inventoryitem',
+            index=models.Index(fields=['user', 'player_id'], name='inventory_user_player_idx'),
+        ),
+        migrations.RunPython(backfill_player_id, migrations.RunPython.noop),
+    ]
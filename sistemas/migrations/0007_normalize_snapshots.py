@@ -0,0 +1,95 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:18
+
+import uuid
+
+from django.db import migrations
+
+from sistemas.snapshots import normalize_snapshot
+
+BATCH_SIZE = 1000
+
+FIELD_KEYS = ("id", "name", "club", "country", "photo_path", "overall",
+              "attack", "passing", "defense", "speed", "position")
+GK_KEYS = ("id", "name", "club", "country", "photo_path", "overall",
+           "handling", "positioning", "reflex", "speed")
+
+
+def _canonical(value):
+    try:
+        return str(uuid.UUID(str(value).strip()))
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def normalize_inventory_snapshots(apps, schema_editor):
+    """
+    Normaliza player_data de todo o inventário (type/position/id canônicos) e preenche snapshots
+    ausentes a partir do catálogo; os slots dos times passam pela mesma normalização.
+    """
+    InventoryItem = apps.get_model("sistemas", "InventoryItem")
+    Team = apps.get_model("sistemas", "Team")
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    JogadorCampo = apps.get_model("sistemas", "JogadorCampo")
+    JogadorGoleiro = apps.get_model("sistemas", "JogadorGoleiro")
+
+    hints = {
+        ct.pk: {"jogadorcampo": "field", "jogadorgoleiro": "gk"}.get(ct.model)
+        for ct in ContentType.objects.filter(app_label="sistemas")
+    }
+
+    # snapshots ausentes: buscar os jogadores referenciados em lote
+    missing = {"field": set(), "gk": set()}
+    items = list(InventoryItem.objects.only("id", "content_type_id", "object_id", "player_data", "player_id"))
+    for item in items:
+        hint = hints.get(item.content_type_id)
+        oid = _canonical(item.object_id)
+        if not item.player_data and hint and oid:
+            missing[hint].add(oid)
+    catalog = {}
+    for row in JogadorCampo.objects.filter(id__in=missing["field"]).values(*FIELD_KEYS):
+        catalog[str(row["id"])] = dict(row, id=str(row["id"]), type="field")
+    for row in JogadorGoleiro.objects.filter(id__in=missing["gk"]).values(*GK_KEYS):
+        catalog[str(row["id"])] = dict(row, id=str(row["id"]), type="gk")
+
+    changed = []
+    for item in items:
+        hint = hints.get(item.content_type_id)
+        data = item.player_data or catalog.get(_canonical(item.object_id) or "")
+        norm = normalize_snapshot(data, hint)
+        if norm != item.player_data:
+            item.player_data = norm
+            if not item.player_id and norm and norm.get("id"):
+                item.player_id = norm["id"][:36]
+            changed.append(item)
+    for i in range(0, len(changed), BATCH_SIZE):
+        InventoryItem.objects.bulk_update(changed[i:i + BATCH_SIZE], ["player_data", "player_id"])
+
+    teams = []
+    for team in Team.objects.only("id", "slots"):
+        slots = team.slots or {}
+        new_slots = dict(slots)
+        if isinstance(slots.get("gk"), dict):
+            new_slots["gk"] = normalize_snapshot(slots["gk"], "gk") or ""
+        for sec in ("def", "mid", "off"):
+            lst = slots.get(sec)
+            if isinstance(lst, list):
+                new_slots[sec] = [
+                    (normalize_snapshot(v, "field") or "") if isinstance(v, dict) else v for v in lst
+                ]
+        if new_slots != slots:
+            team.slots = new_slots
+            teams.append(team)
+    if teams:
+        Team.objects.bulk_update(teams, ["slots"], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('sistemas', '0006_inventory_player_id'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_inventory_snapshots, migrations.RunPython.noop),
+    ]
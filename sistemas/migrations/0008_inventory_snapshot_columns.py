@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:20
+
+from django.db import migrations, models
+
+
+def backfill_snapshot_columns(apps, schema_editor):
+    # mesma regra de InventoryItem.sync_snapshot_columns (modelos históricos não têm os métodos)
+    InventoryItem = apps.get_model("sistemas", "InventoryItem")
+    batch = []
+    fields = ["player_type", "position", "club", "overall"]
+    for item in list(InventoryItem.objects.only("id", "player_data")):
+        snap = item.player_data if isinstance(item.player_data, dict) else {}
+        item.player_type = str(snap.get("type") or "")[:5]
+        item.position = str(snap.get("position") or "")[:20] if item.player_type == "field" else ""
+        item.club = str(snap.get("club") or "")
+        try:
+            item.overall = int(snap.get("overall") or 0)
+        except (TypeError, ValueError):
+            item.overall = 0
+        batch.append(item)
+        if len(batch) >= 1000:
+            InventoryItem.objects.bulk_update(batch, fields)
+            batch = []
+    if batch:
+        InventoryItem.objects.bulk_update(batch, fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('sistemas', '0007_normalize_snapshots'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventoryitem',
+            name='club',
+            field=models.CharField(blank=True, default='', max_length=150),
+        ),
+        migrations.AddField(
+            model_name='inventoryitem',
+            name='overall',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='inventoryitem',
+            name='player_type',
+            field=models.CharField(blank=True, default='', max_length=5),
+        ),
+        migrations.AddField(
+            model_name='inventoryitem',
+            name='position',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+        migrations.RunPython(backfill_snapshot_columns, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='inventoryitem',
+            index=models.Index(fields=['user', 'overall', 'id'], name='inventory_user_overall_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventoryitem',
+            index=models.Index(fields=['user', 'obtained_at', 'id'], name='inventory_user_obtained_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventoryitem',
+            index=models.Index(fields=['user', 'player_type', 'position', 'overall'], name='inventory_user_type_pos_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventoryitem',
+            index=models.Index(fields=['user', 'club', 'overall'], name='inventory_user_club_idx'),
+        ),
+    ]
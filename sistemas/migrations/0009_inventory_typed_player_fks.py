@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:23
+
+import uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_player_fks(apps, schema_editor):
+    # mesma regra de InventoryItem.sync_snapshot_columns: FK do tipo do content_type, alvo = object_id
+    InventoryItem = apps.get_model("sistemas", "InventoryItem")
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    hints = {
+        ct.pk: ct.model
+        for ct in ContentType.objects.filter(app_label="sistemas", model__in=["jogadorcampo", "jogadorgoleiro"])
+    }
+    batch = []
+    for item in list(InventoryItem.objects.filter(content_type_id__in=list(hints)).only("id", "content_type_id", "object_id")):
+        try:
+            target = uuid.UUID(str(item.object_id).strip())
+        except (TypeError, ValueError, AttributeError):
+            continue
+        if hints[item.content_type_id] == "jogadorcampo":
+            item.field_player_id = target
+        else:
+            item.goalkeeper_id = target
+        batch.append(item)
+        if len(batch) >= 1000:
+            InventoryItem.objects.bulk_update(batch, ["field_player", "goalkeeper"])
+            batch = []
+    if batch:
+        InventoryItem.objects.bulk_update(batch, ["field_player", "goalkeeper"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('sistemas', '0008_inventory_snapshot_columns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventoryitem',
+            name='field_player',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='inventory_items', to='sistemas.jogadorcampo'),
+        ),
+        migrations.AddField(
+            model_name='inventoryitem',
+            name='goalkeeper',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='inventory_items', to='sistemas.jogadorgoleiro'),
+        ),
+        migrations.RunPython(backfill_player_fks, migrations.RunPython.noop),
+    ]
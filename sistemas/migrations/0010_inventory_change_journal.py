@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:24
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sistemas', '0009_inventory_typed_player_fks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('player_id', models.CharField(max_length=36)),
+                ('op', models.CharField(choices=[('added', 'Adicionado'), ('updated', 'Alterado'), ('removed', 'Removido')], max_length=8)),
+                ('qty', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventory_changes', to='sistemas.sistemasuser')),
+            ],
+            options={
+                'db_table': 'sistemas_inventory_change',
+                'indexes': [models.Index(fields=['user', 'id'], name='inventory_change_user_seq_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:30
+
+from django.db import migrations, models
+
+from sistemas.team_profile import compute_profile
+
+
+def backfill_team_profiles(apps, schema_editor):
+    Team = apps.get_model("sistemas", "Team")
+    teams = list(Team.objects.only("id", "slots"))
+    for team in teams:
+        team.profile = compute_profile(team.slots)
+    Team.objects.bulk_update(teams, ["profile"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sistemas', '0010_inventory_change_journal'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='team',
+            name='profile',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(backfill_team_profiles, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sistemas', '0011_team_profile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='match',
+            name='coins_awarded',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='lineups',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='opponent_name',
+            field=models.CharField(blank=True, default='', max_length=200),
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='rewarded',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='seed',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='stats',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['user_team', 'created_at'], name='match_user_team_time_idx'),
+        ),
+    ]
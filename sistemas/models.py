@@ -3,11 +3,12 @@ Modelos do app 'sistemas'.
 Comentários e helpers top-of-file.
 Novos modelos:
 - AITeam: times gerados pelo site (não pertencem a usuários humanos)
-- Match: armazena partida (home_team, away_team, events JSON, resultado)
+- Match: histórico de partidas (seed + escalações comprimidas, placar, resumo)
 """
 
 import uuid
 from django.db import models
+from django.core.cache import cache
 from django.utils import timezone
 from django.contrib.contenttypes.models import ContentType
 from django.db.models import JSONField
@@ -15,6 +16,11 @@ from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.forms import ValidationError
 
+from .ids import canonical_id
+from .snapshots import normalize_snapshot
+from .team_profile import compute_profile, profile_is_current
+from .sampling import get_pack_sampler
+
 # --- existentes (SistemasUser, JogadorCampo, JogadorGoleiro, InventoryItem, Pack, Team) ---
 # Copie aqui todo o conteúdo dos seus modelos existentes (os que você já tinha).
 # Abaixo incluo apenas os novos modelos e a parte relevante do Team (assegure que não haja duplicação).
@@ -26,7 +32,10 @@ class SistemasUser(models.Model):
     email = models.EmailField(unique=True)
     password = models.CharField(max_length=128)
     created_at = models.DateTimeField(auto_now_add=True)
+    # saldo compactado: inclui todas as CoinTransaction liquidadas e as pendentes com id <= coins_ledger_seq
+    # (saldo real = coins + pendentes com id > coins_ledger_seq; ver sistemas/coins.py)
     coins = models.IntegerField(default=0)
+    coins_ledger_seq = models.BigIntegerField(default=0)
 
     class Meta:
         db_table = "sistemas_users"
@@ -98,19 +107,84 @@ class JogadorCampo(models.Model):
             return "DEF"
         return "N/A"
 
+def snapshot_from_field(p):
+    """Snapshot de jogador de campo. Aceita instância do modelo ou dict de .values()."""
+    get = p.get if isinstance(p, dict) else (lambda k: getattr(p, k))
+    return {
+        "id": str(get("id")),
+        "type": "field",
+        "name": get("name"),
+        "club": get("club"),
+        "country": get("country"),
+        "photo_path": get("photo_path"),
+        "overall": get("overall"),
+        "attack": get("attack"),
+        "passing": get("passing"),
+        "defense": get("defense"),
+        "speed": get("speed"),
+        "position": get("position"),
+    }
+
+def snapshot_from_gk(g):
+    """Snapshot de goleiro. Aceita instância do modelo ou dict de .values()."""
+    get = g.get if isinstance(g, dict) else (lambda k: getattr(g, k))
+    return {
+        "id": str(get("id")),
+        "type": "gk",
+        "name": get("name"),
+        "club": get("club"),
+        "country": get("country"),
+        "photo_path": get("photo_path"),
+        "overall": get("overall"),
+        "handling": get("handling"),
+        "positioning": get("positioning"),
+        "reflex": get("reflex"),
+        "speed": get("speed"),
+    }
+
 class InventoryItem(models.Model):
     id = models.BigAutoField(primary_key=True)
     user = models.ForeignKey(SistemasUser, on_delete=models.CASCADE, related_name="inventory_items")
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, null=True, blank=True)
     object_id = models.CharField(max_length=36, blank=True, null=True)
     content_object = GenericForeignKey("content_type", "object_id")
+    # FKs tipadas para o mesmo alvo de content_type/object_id (preenchidas no save()): permitem JOIN e
+    # select_related em vez de uma busca genérica por linha. Sem constraint no banco: o item continua
+    # válido (pelo snapshot) mesmo se o jogador sair do catálogo.
+    field_player = models.ForeignKey(
+        JogadorCampo, on_delete=models.SET_NULL, null=True, blank=True,
+        db_constraint=False, related_name="inventory_items",
+    )
+    goalkeeper = models.ForeignKey(
+        JogadorGoleiro, on_delete=models.SET_NULL, null=True, blank=True,
+        db_constraint=False, related_name="inventory_items",
+    )
     player_data = JSONField(null=True, blank=True, default=None)
+    # id canônico do jogador (object_id ou player_data["id"]), preenchido no save(); lookup por índice
+    player_id = models.CharField(max_length=36, blank=True, default="")
+    # colunas copiadas do snapshot no save() para filtrar/ordenar por índice (API de inventário)
+    player_type = models.CharField(max_length=5, blank=True, default="")
+    position = models.CharField(max_length=20, blank=True, default="")
+    club = models.CharField(max_length=150, blank=True, default="")
+    overall = models.IntegerField(default=0)
     qty = models.IntegerField(default=1, validators=[MinValueValidator(1)])
     obtained_at = models.DateTimeField(auto_now_add=True)
 
+    SALE_PRICE = 100  # moedas por carta vendida (preço fixo)
+    # campos derivados de object_id/player_data (bulk_create/bulk_update devem incluí-los)
+    SNAPSHOT_COLUMNS = ("player_id", "player_type", "position", "club", "overall", "field_player", "goalkeeper")
+
     class Meta:
         db_table = "sistemas_inventory"
         unique_together = ("user", "content_type", "object_id")
+        indexes = [
+            models.Index(fields=["user", "player_id"], name="inventory_user_player_idx"),
+            # keyset da API de inventário: (user, chave de ordenação, id)
+            models.Index(fields=["user", "overall", "id"], name="inventory_user_overall_idx"),
+            models.Index(fields=["user", "obtained_at", "id"], name="inventory_user_obtained_idx"),
+            models.Index(fields=["user", "player_type", "position", "overall"], name="inventory_user_type_pos_idx"),
+            models.Index(fields=["user", "club", "overall"], name="inventory_user_club_idx"),
+        ]
         ordering = ["-obtained_at"]
 
     def __str__(self):
@@ -132,73 +206,97 @@ class InventoryItem(models.Model):
                 raise ValidationError("InventoryItem só aceita JogadorCampo ou JogadorGoleiro como alvo.")
 
     def save(self, *args, **kwargs):
-        if hasattr(self.object_id, "hex"):
-            self.object_id = str(self.object_id)
-        if self.player_data == {}:
-            self.player_data = None
+        # ids sempre na forma canônica (str com hífens) em object_id e no snapshot
+        if self.object_id:
+            self.object_id = canonical_id(self.object_id) or str(self.object_id)
+        # snapshot canônico na escrita (type/position/id); leitura usa player_data como está
+        if not self.player_data and self.content_type_id and self.object_id:
+            self.player_data = self._snapshot_from_target()
+        self.player_data = normalize_snapshot(self.player_data, self._type_hint())
+        self.sync_snapshot_columns()
+        if kwargs.get("update_fields") is not None:
+            extra = [f for f in self.SNAPSHOT_COLUMNS if f not in kwargs["update_fields"]]
+            kwargs["update_fields"] = list(kwargs["update_fields"]) + extra
+        adding = self._state.adding
         super().save(*args, **kwargs)
+        InventoryChange.record([(self, InventoryChange.OP_ADDED if adding else InventoryChange.OP_UPDATED)])
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        InventoryChange.record([(self, InventoryChange.OP_REMOVED)])
+        return result
+
+    def sync_snapshot_columns(self):
+        """Preenche player_id, as FKs tipadas e as colunas filtráveis a partir de object_id/player_data."""
+        self.player_id = self.compute_player_id(self.object_id, self.player_data)
+        target = canonical_id(self.object_id)
+        hint = self._type_hint()
+        self.field_player_id = target if target and hint == "field" else None
+        self.goalkeeper_id = target if target and hint == "gk" else None
+        snap = self.player_data if isinstance(self.player_data, dict) else {}
+        self.player_type = str(snap.get("type") or "")[:5]
+        self.position = str(snap.get("position") or "")[:20] if self.player_type == "field" else ""
+        self.club = str(snap.get("club") or "")
+        try:
+            self.overall = int(snap.get("overall") or 0)
+        except (TypeError, ValueError):
+            self.overall = 0
+
+    def _type_hint(self):
+        if not self.content_type_id:
+            return None
+        model = ContentType.objects.get_for_id(self.content_type_id).model
+        return {"jogadorcampo": "field", "jogadorgoleiro": "gk"}.get(model)
+
+    def _snapshot_from_target(self):
+        hint = self._type_hint()
+        model = {"field": JogadorCampo, "gk": JogadorGoleiro}.get(hint)
+        obj = model.objects.filter(pk=self.object_id).first() if model and canonical_id(self.object_id) else None
+        if obj is None:
+            return None
+        return snapshot_from_field(obj) if hint == "field" else snapshot_from_gk(obj)
+
+    @staticmethod
+    def compute_player_id(object_id, player_data):
+        """Id canônico do jogador do item (object_id tem prioridade sobre o snapshot)."""
+        pd_id = player_data.get("id") if isinstance(player_data, dict) else None
+        for candidate in (object_id, pd_id):
+            if candidate:
+                return canonical_id(candidate) or str(candidate).strip()[:36]
+        return ""
 
     def get_player(self):
+        """Jogador do catálogo pelas FKs tipadas (use select_related("field_player", "goalkeeper"))."""
         try:
-            if self.content_object:
-                return self.content_object
-        except Exception:
-            pass
-        return None
+            return self.field_player or self.goalkeeper
+        except (JogadorCampo.DoesNotExist, JogadorGoleiro.DoesNotExist):
+            return None
 
     def get_player_snapshot(self):
         if self.player_data:
             return self.player_data
-        try:
-            player = self.get_player()
-            if not player:
-                if self.content_type and self.object_id:
-                    model = self.content_type.model_class()
-                    p = model.objects.filter(pk=self.object_id).values().first()
-                    if p:
-                        return dict(p)
-                return None
-            if isinstance(player, JogadorCampo):
-                return {
-                    "id": str(player.id),
-                    "type": "field",
-                    "name": player.name,
-                    "club": player.club,
-                    "country": player.country,
-                    "photo_path": player.photo_path,
-                    "overall": player.overall,
-                    "attack": player.attack,
-                    "passing": player.passing,
-                    "defense": player.defense,
-                    "speed": player.speed,
-                    "position": player.position,
-                }
-            else:
-                return {
-                    "id": str(player.id),
-                    "type": "gk",
-                    "name": player.name,
-                    "club": player.club,
-                    "country": player.country,
-                    "photo_path": player.photo_path,
-                    "overall": player.overall,
-                    "handling": player.handling,
-                    "positioning": player.positioning,
-                    "reflex": player.reflex,
-                    "speed": player.speed,
-                }
-        except Exception:
-            return None
+        player = self.get_player()
+        if isinstance(player, JogadorCampo):
+            return snapshot_from_field(player)
+        if isinstance(player, JogadorGoleiro):
+            return snapshot_from_gk(player)
+        return None
 
 class Pack(models.Model):
+    """
+    Pack da loja. As entradas (jogadores possíveis + peso) ficam em PackEntry;
+    get_all_entries() devolve a visão serializada (lista de dicts) em cache, chaveada por entries_version.
+    """
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=140)
     price = models.IntegerField(default=0)
     description = models.TextField(blank=True)
     image_path = models.CharField(max_length=255, blank=True)
     created_at = models.DateTimeField(default=timezone.now)
-    field_players = JSONField(default=list, blank=True)
-    gk_players = JSONField(default=list, blank=True)
+    # incrementado a cada alteração das entradas (ORM ou scripts CRUD); invalida sampler e cache
+    entries_version = models.PositiveIntegerField(default=0)
+
+    ENTRIES_CACHE_TTL = 60 * 60
 
     class Meta:
         db_table = "sistemas_packs"
@@ -207,44 +305,109 @@ class Pack(models.Model):
     def __str__(self):
         return f"{self.name} — {self.price} coins"
 
+    def bump_entries_version(self):
+        """UPDATE atômico de entries_version (só a coluna, sem reescrever o pack)."""
+        Pack.objects.filter(pk=self.pk).update(entries_version=models.F("entries_version") + 1)
+        self.refresh_from_db(fields=["entries_version"])
+
+    def _entries_cache_key(self):
+        return f"sistemas:pack_entries:{self.pk}:{self.entries_version}"
+
     def get_all_entries(self):
-        entries = []
-        for e in (self.field_players or []):
-            item = dict(e)
-            item.setdefault("weight", 1)
-            item.setdefault("note", "")
-            item["type"] = "field"
-            entries.append(item)
-        for e in (self.gk_players or []):
-            item = dict(e)
-            item.setdefault("weight", 1)
-            item.setdefault("note", "")
-            item["type"] = "gk"
-            entries.append(item)
+        """
+        Lista de dicts {id, type, name, club, ..., weight, note} (mesmo formato das antigas listas JSON).
+        Uma query com select_related na primeira leitura de cada versão; depois vem do cache.
+        """
+        key = self._entries_cache_key()
+        entries = cache.get(key)
+        if entries is None:
+            entries = [e.as_entry_dict() for e in self.entries.select_related("player_field", "player_gk")]
+            cache.set(key, entries, self.ENTRIES_CACHE_TTL)
         return entries
 
     def pick_random_entry(self):
-        entries = self.get_all_entries()
-        weighted = []
-        total = 0
-        for e in entries:
-            w = int(e.get("weight", 0) or 0)
-            if w <= 0:
-                continue
-            total += w
-            weighted.append((e, total))
-        if total == 0:
+        """Sorteia uma entrada ponderada (cópia do dict) ou None se não houver pesos > 0."""
+        sampler = get_pack_sampler(self)
+        if sampler is None:
             return None
-        import random
-        r = random.randint(1, total)
-        for e, cum in weighted:
-            if r <= cum:
-                return e
-        return None
+        return dict(sampler.draw())
+
+    def pick_random_entries(self, count):
+        """Sorteia `count` entradas de uma vez ("abrir N packs"). Lista vazia se não houver pesos > 0."""
+        sampler = get_pack_sampler(self)
+        if sampler is None or count <= 0:
+            return []
+        return [dict(e) for e in sampler.draw_many(count)]
+
+class PackEntry(models.Model):
+    """
+    Entrada de um pack: um jogador (campo OU goleiro) com peso relativo e observação.
+    Unicidade (pack, jogador) garantida por constraint — checagem de duplicata é um lookup de índice.
+    save()/delete() incrementam Pack.entries_version; bulk_create/update/delete não (chame
+    pack.bump_entries_version() depois de operações em lote).
+    """
+    TYPE_FIELD = "field"
+    TYPE_GK = "gk"
+    TYPE_CHOICES = [
+        (TYPE_FIELD, "Jogador de campo"),
+        (TYPE_GK, "Goleiro"),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    pack = models.ForeignKey(Pack, on_delete=models.CASCADE, related_name="entries")
+    type = models.CharField(max_length=5, choices=TYPE_CHOICES)
+    player_field = models.ForeignKey(JogadorCampo, on_delete=models.CASCADE, null=True, blank=True, related_name="pack_entries")
+    player_gk = models.ForeignKey(JogadorGoleiro, on_delete=models.CASCADE, null=True, blank=True, related_name="pack_entries")
+    weight = models.PositiveIntegerField(default=1)
+    note = models.CharField(max_length=255, blank=True, default="")
+
+    class Meta:
+        db_table = "sistemas_packentry"
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["pack", "type"], name="packentry_pack_type_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["pack", "player_field"], name="packentry_unique_field"),
+            models.UniqueConstraint(fields=["pack", "player_gk"], name="packentry_unique_gk"),
+            models.CheckConstraint(
+                condition=(models.Q(type="field", player_field__isnull=False, player_gk__isnull=True)
+                           | models.Q(type="gk", player_gk__isnull=False, player_field__isnull=True)),
+                name="packentry_one_player",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.pack_id} - {self.player} (w={self.weight})"
+
+    @property
+    def player(self):
+        return self.player_field if self.type == self.TYPE_FIELD else self.player_gk
+
+    def as_entry_dict(self):
+        if self.type == self.TYPE_FIELD:
+            item = snapshot_from_field(self.player_field)
+        else:
+            item = snapshot_from_gk(self.player_gk)
+        item["weight"] = self.weight
+        item["note"] = self.note or ""
+        return item
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        Pack.objects.filter(pk=self.pack_id).update(entries_version=models.F("entries_version") + 1)
+
+    def delete(self, *args, **kwargs):
+        pack_id = self.pack_id
+        result = super().delete(*args, **kwargs)
+        Pack.objects.filter(pk=pack_id).update(entries_version=models.F("entries_version") + 1)
+        return result
 
 class Team(models.Model):
     user = models.OneToOneField("SistemasUser", on_delete=models.CASCADE, related_name="team")
     slots = JSONField(default=dict, blank=True)
+    # perfil de força derivado de slots (sistemas/team_profile.py), recalculado no save()
+    profile = JSONField(default=dict, blank=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
@@ -253,6 +416,35 @@ class Team(models.Model):
     def __str__(self):
         return f"Team of {self.user.username}"
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "slots" in update_fields:
+            self.profile = compute_profile(self.slots)
+            if update_fields is not None and "profile" not in update_fields:
+                kwargs["update_fields"] = list(update_fields) + ["profile"]
+        super().save(*args, **kwargs)
+
+    def current_profile(self):
+        """Perfil de força atualizado (recalcula em memória se slots mudou sem passar pelo save)."""
+        if profile_is_current(self.profile, self.slots):
+            return self.profile
+        return compute_profile(self.slots)
+
+    def lineup_slots(self):
+        """
+        Slots como snapshots para o simulador ({"gk", "def", "mid", "off"}) sem consultas, se todos os
+        slots preenchidos já forem snapshots (perfil 'resolved'); None se há slot legado só com id.
+        """
+        if not self.current_profile().get("resolved"):
+            return None
+        slots = self.slots or {}
+        return {
+            "gk": slots.get("gk") or "",
+            "def": list(slots.get("def") or []),
+            "mid": list(slots.get("mid") or []),
+            "off": list(slots.get("off") or []),
+        }
+
     def ensure_structure(self):
         s = self.slots or {}
         if "gk" not in s:
@@ -272,32 +464,24 @@ class Team(models.Model):
         if isinstance(player_snapshot_or_id, dict):
             snap = player_snapshot_or_id
         else:
-            pid = str(player_snapshot_or_id)
-            inv = InventoryItem.objects.filter(user=self.user).filter(
-                models.Q(object_id=pid) | models.Q(player_data__id=pid)
+            valid_id = canonical_id(player_snapshot_or_id)
+            pid = valid_id or str(player_snapshot_or_id)
+            inv = InventoryItem.objects.filter(
+                user=self.user, player_id=InventoryItem.compute_player_id(pid, None)
             ).first()
             if inv and getattr(inv, "player_data", None):
                 snap = dict(inv.player_data)
-            else:
+            elif valid_id:
                 f = JogadorCampo.objects.filter(pk=pid).first()
                 if f:
-                    snap = {
-                        "id": str(f.id), "type": "field", "name": f.name, "club": f.club,
-                        "country": f.country, "photo_path": f.photo_path, "overall": f.overall,
-                        "attack": f.attack, "passing": f.passing, "defense": f.defense,
-                        "speed": f.speed, "position": f.position,
-                    }
+                    snap = snapshot_from_field(f)
                 else:
                     g = JogadorGoleiro.objects.filter(pk=pid).first()
                     if g:
-                        snap = {
-                            "id": str(g.id), "type": "gk", "name": g.name, "club": g.club,
-                            "country": g.country, "photo_path": g.photo_path, "overall": g.overall,
-                            "handling": g.handling, "positioning": g.positioning,
-                            "reflex": g.reflex, "speed": g.speed,
-                        }
+                        snap = snapshot_from_gk(g)
         if not snap:
             raise ValueError("Não foi possível obter snapshot do jogador para salvar no slot.")
+        snap = normalize_snapshot(snap)
         if slot_key == "gk":
             self.slots["gk"] = snap
         else:
@@ -324,14 +508,33 @@ class AITeam(models.Model):
     Time criado automaticamente pelo sistema (IA).
     slots: JSON -> formato id's ou snapshots, preferencialmente snapshots.
     name: nome amigável (ex: "AI Team #123")
+    kind/club: modo de geração ('random' ou 'authentic' + clube).
+    catalog_version/strength: versão do catálogo usada e força (média de overall).
+    pooled: True enquanto o time está no pool pré-gerado (manage.py prewarm_ai_teams),
+            aguardando ser consumido por uma partida.
     """
+    KIND_RANDOM = "random"
+    KIND_AUTHENTIC = "authentic"
+    KIND_CHOICES = [
+        (KIND_RANDOM, "Random"),
+        (KIND_AUTHENTIC, "Authentic"),
+    ]
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=200, default="AI Team")
     slots = JSONField(default=dict, blank=True)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default=KIND_RANDOM)
+    club = models.CharField(max_length=150, blank=True, default="")
+    catalog_version = models.CharField(max_length=40, blank=True, default="")
+    strength = models.FloatField(default=0)
+    pooled = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         db_table = "sistemas_ai_team"
+        indexes = [
+            models.Index(fields=["pooled", "kind", "catalog_version"], name="ai_team_pool_idx"),
+        ]
 
     def __str__(self):
         return f"{self.name}"
@@ -353,10 +556,12 @@ class AITeam(models.Model):
 
 class Match(models.Model):
     """
-    Partida entre um Team (usuario) e um AITeam (ou outro Team no futuro).
+    Partida entre um Team (usuario) e um AITeam (ou outro Team no futuro). Fica no histórico.
     - home_is_user: bool para saber quem é casa
-    - events: lista de eventos (cada evento = dict { minute, text, team_in_possession, ... })
-    - score: {"home": int, "away": int}
+    - seed + lineups (escalações comprimidas, ver match_history): os eventos são regenerados no replay
+    - events: lista de eventos, só em partidas antigas (sem seed)
+    - score: {"home": int, "away": int}; stats: resumo (posse, finalizações)
+    - rewarded/coins_awarded: prêmio já creditado (claim por UPDATE condicional)
     - meta: info extra (seed, duration, etc)
     """
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -368,10 +573,108 @@ class Match(models.Model):
     score_home = models.IntegerField(default=0)
     score_away = models.IntegerField(default=0)
     meta = JSONField(default=dict, blank=True)
+    seed = models.CharField(max_length=32, blank=True, default="")
+    lineups = models.BinaryField(null=True, blank=True)
+    opponent_name = models.CharField(max_length=200, blank=True, default="")
+    stats = JSONField(default=dict, blank=True)
+    rewarded = models.BooleanField(default=False)
+    coins_awarded = models.IntegerField(default=0)
 
     class Meta:
         db_table = "sistemas_match"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["user_team", "created_at"], name="match_user_team_time_idx"),
+        ]
+
+    def __str__(self):
+        return f"Match {self.id} ({'user home' if self.home_is_user else 'user away'})"
+
+
+class CoinTransaction(models.Model):
+    """
+    Livro-razão de moedas (append-only: linhas nunca são alteradas nem apagadas).
+    - amount: positivo = crédito, negativo = débito.
+    - settled=True: já refletida em SistemasUser.coins no momento da escrita (débitos, saldo inicial).
+    - settled=False: crédito pendente (prêmios, vendas), somado ao saldo na leitura e dobrado em
+      SistemasUser.coins pela compactação — o caminho quente não escreve na linha do usuário.
+    """
+    KIND_OPENING = "opening"
+    KIND_PACK_PURCHASE = "pack_purchase"
+    KIND_CARD_SALE = "card_sale"
+    KIND_MATCH_REWARD = "match_reward"
+    KIND_ADJUSTMENT = "adjustment"
+    KIND_CHOICES = [
+        (KIND_OPENING, "Saldo inicial"),
+        (KIND_PACK_PURCHASE, "Compra de pack"),
+        (KIND_CARD_SALE, "Venda de carta"),
+        (KIND_MATCH_REWARD, "Prêmio de partida"),
+        (KIND_ADJUSTMENT, "Ajuste"),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(SistemasUser, on_delete=models.CASCADE, related_name="coin_transactions")
+    amount = models.IntegerField()
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    ref = models.CharField(max_length=64, blank=True, default="")
+    settled = models.BooleanField(default=False)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = "sistemas_coin_transaction"
+        indexes = [
+            models.Index(fields=["user", "created_at"], name="coin_tx_user_time_idx"),
+            models.Index(fields=["user", "settled", "id"], name="coin_tx_pending_idx"),
+            models.Index(fields=["created_at"], name="coin_tx_time_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.amount:+d} ({self.kind})"
+
+
+class InventoryChange(models.Model):
+    """
+    Diário de mudanças do inventário (append-only), para sincronização incremental.
+    O id é a sequência: monotônico, e por usuário basta `id > último visto` no índice (user, id).
+    qty é a quantidade do item DEPOIS da mudança (0 em removed), então reaplicar é idempotente.
+    InventoryItem.save()/delete() registram sozinhos; escritas em lote (bulk_*, update()/delete()
+    em QuerySet) devem chamar InventoryChange.record.
+    """
+    OP_ADDED = "added"
+    OP_UPDATED = "updated"
+    OP_REMOVED = "removed"
+    OP_CHOICES = [
+        (OP_ADDED, "Adicionado"),
+        (OP_UPDATED, "Alterado"),
+        (OP_REMOVED, "Removido"),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(SistemasUser, on_delete=models.CASCADE, related_name="inventory_changes")
+    player_id = models.CharField(max_length=36)
+    op = models.CharField(max_length=8, choices=OP_CHOICES)
+    qty = models.IntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = "sistemas_inventory_change"
+        indexes = [
+            models.Index(fields=["user", "id"], name="inventory_change_user_seq_idx"),
+        ]
 
     def __str__(self):
-        return f"Match {self.id} ({'user home' if self.home_is_user else 'user away'})"
\ No newline at end of file
+        return f"#{self.id} {self.user_id} {self.op} {self.player_id} x{self.qty}"
+
+    @classmethod
+    def record(cls, items_ops):
+        """Grava (InventoryItem, op) em um bulk_create. Retorna as linhas criadas."""
+        rows = [
+            cls(
+                user_id=item.user_id,
+                player_id=item.player_id or "",
+                op=op,
+                qty=0 if op == cls.OP_REMOVED else int(item.qty or 0),
+            )
+            for item, op in items_ops
+        ]
+        return cls.objects.bulk_create(rows) if rows else []
@@ -0,0 +1,127 @@
+# sistemas/sampling.py
+"""
+Sorteio ponderado de entradas de pack (método alias de Walker/Vose).
+- AliasSampler: construção O(n) uma única vez, cada sorteio O(1).
+- get_pack_sampler: cache por processo, chaveado por (pack.id, pack.entries_version);
+  qualquer edição do pack incrementa entries_version e invalida a tabela.
+Não importa models (models.py importa este módulo).
+"""
+
+import random
+import threading
+
+SAMPLER_CACHE_MAX = 256
+
+_sampler_cache = {}
+_sampler_lock = threading.Lock()
+
+
+class AliasSampler:
+    """Tabela alias para sorteio ponderado. `weights` devem ser > 0."""
+
+    __slots__ = ("items", "prob", "alias", "total_weight")
+
+    def __init__(self, items, weights):
+        n = len(items)
+        if n == 0 or n != len(weights):
+            raise ValueError("AliasSampler precisa de itens e pesos (mesmo tamanho, não vazio).")
+        total = float(sum(weights))
+        if total <= 0:
+            raise ValueError("Soma dos pesos deve ser > 0.")
+
+        scaled = [w * n / total for w in weights]
+        prob = [0.0] * n
+        alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s = small.pop()
+            g = large.pop()
+            prob[s] = scaled[s]
+            alias[s] = g
+            scaled[g] = (scaled[g] + scaled[s]) - 1.0
+            if scaled[g] < 1.0:
+                small.append(g)
+            else:
+                large.append(g)
+        # sobras (erro de arredondamento) ficam com probabilidade 1
+        for i in large + small:
+            prob[i] = 1.0
+
+        self.items = list(items)
+        self.prob = prob
+        self.alias = alias
+        self.total_weight = total
+
+    def __len__(self):
+        return len(self.items)
+
+    def draw_index(self, rnd=random):
+        i = int(rnd.random() * len(self.prob))
+        return i if rnd.random() < self.prob[i] else self.alias[i]
+
+    def draw(self, rnd=random):
+        return self.items[self.draw_index(rnd)]
+
+    def draw_many(self, k, rnd=random):
+        prob, alias, items, n = self.prob, self.alias, self.items, len(self.prob)
+        rand = rnd.random
+        out = []
+        for _ in range(k):
+            i = int(rand() * n)
+            out.append(items[i] if rand() < prob[i] else items[alias[i]])
+        return out
+
+    def probabilities(self):
+        """Probabilidade exata de cada item (pela tabela), útil para relatórios."""
+        n = len(self.prob)
+        p = [0.0] * n
+        for i in range(n):
+            p[i] += self.prob[i] / n
+            p[self.alias[i]] += (1.0 - self.prob[i]) / n
+        return p
+
+
+def build_pack_sampler(entries):
+    """Monta AliasSampler a partir das entradas (dicts com 'weight'); ignora pesos <= 0."""
+    items = []
+    weights = []
+    for e in entries:
+        try:
+            w = int(e.get("weight", 0) or 0)
+        except (TypeError, ValueError):
+            continue
+        if w <= 0:
+            continue
+        items.append(e)
+        weights.append(w)
+    if not items:
+        return None
+    return AliasSampler(items, weights)
+
+
+def get_pack_sampler(pack):
+    """
+    Sampler em cache para o pack. Só lê as entradas do pack (campos JSON / PackEntry)
+    quando a versão mudou ou o processo ainda não tem a tabela.
+    """
+    key = str(pack.pk)
+    version = getattr(pack, "entries_version", 0)
+    cached = _sampler_cache.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    sampler = build_pack_sampler(pack.get_all_entries())
+    with _sampler_lock:
+        if len(_sampler_cache) >= SAMPLER_CACHE_MAX and key not in _sampler_cache:
+            _sampler_cache.pop(next(iter(_sampler_cache)))
+        _sampler_cache[key] = (version, sampler)
+    return sampler
+
+
+def invalidate_pack_sampler(pack_id=None):
+    with _sampler_lock:
+        if pack_id is None:
+            _sampler_cache.clear()
+        else:
+            _sampler_cache.pop(str(pack_id), None)
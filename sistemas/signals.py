@@ -9,11 +9,10 @@ from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.contrib.contenttypes.models import ContentType
 from django.db import transaction
-from django.db.models import Q
 import random
 import logging
 
-from .models import SistemasUser, JogadorCampo, JogadorGoleiro, InventoryItem
+from .models import SistemasUser, JogadorCampo, JogadorGoleiro, InventoryItem, CoinTransaction
 
 logger = logging.getLogger(__name__)
 
@@ -169,8 +168,8 @@ def grant_starter_pack_and_coins(sender, instance, created, **kwargs):
                         ct = ContentType.objects.get_for_model(model_cls)
                         pid = str(obj.id)
 
-                        inv = InventoryItem.objects.filter(user=user).filter(
-                            Q(content_type=ct, object_id=pid) | Q(player_data__id=pid)
+                        inv = InventoryItem.objects.filter(
+                            user=user, player_id=InventoryItem.compute_player_id(pid, None)
                         ).first()
                         if inv:
                             inv.qty = (inv.qty or 0) + 1
@@ -205,5 +204,10 @@ def grant_starter_pack_and_coins(sender, instance, created, **kwargs):
                 user.save(update_fields=["coins"])
                 logger.info("Usuário %s recebeu 100 moedas iniciais", user.pk)
 
+            # saldo inicial no livro-razão (já refletido em coins)
+            CoinTransaction.objects.create(
+                user=user, amount=user.coins, kind=CoinTransaction.KIND_OPENING, settled=True,
+            )
+
     except Exception as exc:
         logger.exception("Erro ao atribuir starter pack/coins para usuário %s: %s", getattr(instance, "pk", "?"), exc)
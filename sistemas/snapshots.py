@@ -0,0 +1,104 @@
+# sistemas/snapshots.py
+"""
+Normalização de snapshots de jogador (InventoryItem.player_data, slots do Team).
+Aplicada na escrita (InventoryItem.save, Team.set_slot, compra de packs e migração 0007):
+quem lê (my_team, API de inventário) usa o snapshot como está, sem transformar linha a linha.
+Sem imports de models (usado por models.py e pela migração).
+"""
+
+import uuid
+
+# mesmas constantes de JogadorCampo.POSITION_*
+POSITION_OFF = "OffensiveZone"
+POSITION_NEU = "NeutralZone"
+POSITION_DEF = "DefensiveZone"
+
+TYPE_FIELD = "field"
+TYPE_GK = "gk"
+
+GK_KEYS = ("handling", "reflex", "positioning")
+
+_OFFS = {"offensivezone", "offensive", "off", "ata", "ataque", "ata_zone", "ataquezone", "ataque_zone", "offensive_zone"}
+_NEUTS = {"neutralzone", "neutral", "mid", "midfield", "meio", "medio", "mid_zone", "meiozone", "neutral_zone"}
+_DEFS = {"defensivezone", "defensive", "def", "defesa", "zdef", "def_zone", "defensive_zone"}
+
+
+def normalize_position(pos):
+    """
+    Normaliza várias formas de posição para as constantes do modelo JogadorCampo.
+    Retorna uma das constantes JogadorCampo.POSITION_* ou None.
+    """
+    if not pos:
+        return None
+    p = str(pos).strip().lower()
+
+    # se já é a constante (em lowercase)
+    if p == POSITION_OFF.lower():
+        return POSITION_OFF
+    if p == POSITION_NEU.lower():
+        return POSITION_NEU
+    if p == POSITION_DEF.lower():
+        return POSITION_DEF
+
+    if p in _OFFS:
+        return POSITION_OFF
+    if p in _NEUTS:
+        return POSITION_NEU
+    if p in _DEFS:
+        return POSITION_DEF
+
+    # heurística simples por substring
+    if "off" in p and "def" not in p:
+        return POSITION_OFF
+    if "def" in p:
+        return POSITION_DEF
+    if "mid" in p or "neu" in p or "meio" in p:
+        return POSITION_NEU
+
+    return None
+
+
+def infer_position_from_snapshot(snapshot):
+    """
+    Heurística simples para inferir posição se snapshot vier sem 'position'.
+    Usa diferença entre ataque e defesa.
+    """
+    try:
+        atk = int(snapshot.get("attack") or 0)
+        df = int(snapshot.get("defense") or 0)
+        if atk >= df + 5:
+            return POSITION_OFF
+        if df >= atk + 5:
+            return POSITION_DEF
+    except Exception:
+        pass
+    return POSITION_NEU
+
+
+def infer_type(snapshot, type_hint=None):
+    t = snapshot.get("type")
+    if t in (TYPE_FIELD, TYPE_GK):
+        return t
+    if type_hint in (TYPE_FIELD, TYPE_GK):
+        return type_hint
+    return TYPE_GK if any(k in snapshot for k in GK_KEYS) else TYPE_FIELD
+
+
+def normalize_snapshot(snapshot, type_hint=None):
+    """
+    Cópia canônica do snapshot: id como str(UUID) com hífens, 'type' explícito e, para jogador de
+    campo, 'position' em uma das constantes POSITION_*. Idempotente; None/{} -> None.
+    """
+    if not isinstance(snapshot, dict) or not snapshot:
+        return None
+    snap = dict(snapshot)
+    if snap.get("id"):
+        try:
+            snap["id"] = str(uuid.UUID(str(snap["id"]).strip()))
+        except (TypeError, ValueError, AttributeError):
+            snap["id"] = str(snap["id"])
+    snap["type"] = infer_type(snap, type_hint)
+    if snap["type"] == TYPE_FIELD:
+        pos = normalize_position(snap.get("position") or snap.get("pos"))
+        snap["position"] = pos or infer_position_from_snapshot(snap)
+    return snap
@@ -0,0 +1,250 @@
+# sistemas/team_lineup.py
+"""
+Escalação do time do usuário (Team.slots) em uma única operação.
+- A escalação inteira (ou parte dela) é validada em memória: tipo/posição de cada slot e nomes
+  repetidos no time.
+- O inventário é ajustado pelo saldo líquido por jogador (cartas devolvidas - cartas colocadas):
+  jogador que fica no time, mesmo trocando de slot, não gera escrita. Os ajustes vão num
+  bulk_update, um único DELETE e um bulk_create (devoluções sem item no inventário).
+- Team.slots é gravado uma vez.
+- swap_slots troca/move jogadores entre dois slots do mesmo time: só reorganiza Team.slots
+  (uma escrita), sem tocar no inventário.
+Chame dentro de transaction.atomic com a linha do usuário travada (como as views de slot).
+"""
+
+from collections import Counter
+
+from django.contrib.contenttypes.models import ContentType
+
+from .catalog import get_player_snapshots
+from .ids import canonical_id
+from .models import InventoryChange, InventoryItem, JogadorCampo, JogadorGoleiro
+from .snapshots import POSITION_DEF, POSITION_NEU, POSITION_OFF, TYPE_FIELD, TYPE_GK, normalize_snapshot
+
+SECTIONS = (("def", 4), ("mid", 3), ("off", 3))
+SLOT_KEYS = ("gk",) + tuple(f"{sec}_{i}" for sec, n in SECTIONS for i in range(n))
+SECTION_POSITION = {"def": POSITION_DEF, "mid": POSITION_NEU, "off": POSITION_OFF}
+SECTION_LABEL = {"def": "defensor", "mid": "meio-campista", "off": "atacante"}
+
+
+class LineupError(ValueError):
+    """Escalação inválida (mensagem para o usuário)."""
+
+
+def slot_value(slots, key):
+    slots = slots or {}
+    if key == "gk":
+        return slots.get("gk") or ""
+    sec, idx = key.split("_")
+    lst = slots.get(sec) or []
+    idx = int(idx)
+    return (lst[idx] if idx < len(lst) else "") or ""
+
+
+def slot_pid(value):
+    """Id canônico do jogador de um valor de slot (snapshot ou id); "" se vazio."""
+    if not value:
+        return ""
+    raw = value.get("id") if isinstance(value, dict) else value
+    return InventoryItem.compute_player_id(raw, None)
+
+
+def parse_lineup(data):
+    """
+    {slot_key: player_id canônico ou ""} a partir de um dict no formato de Team.slots
+    ({"gk": id, "def": [4], "mid": [3], "off": [3]}) ou com chaves planas (gk, def_0, ... off_2).
+    Slots ausentes ficam de fora (mantêm o valor atual); "" / null esvazia o slot.
+    """
+    if not isinstance(data, dict):
+        raise LineupError("Escalação inválida.")
+    target = {}
+    for key in SLOT_KEYS:
+        if key in data:
+            raw = data[key]
+        elif key != "gk" and isinstance(data.get(key.split("_")[0]), list):
+            sec, idx = key.split("_")
+            lst = data[sec]
+            idx = int(idx)
+            if idx >= len(lst):
+                continue
+            raw = lst[idx]
+        else:
+            continue
+        if isinstance(raw, dict):
+            raw = raw.get("id")
+        raw = str(raw or "").strip()
+        if raw and not canonical_id(raw):
+            raise LineupError(f"Jogador inválido no slot {key}.")
+        target[key] = canonical_id(raw) or ""
+    if not target:
+        raise LineupError("Nenhum slot informado.")
+    return target
+
+
+def _validate_slot(key, snap):
+    if key == "gk":
+        if snap.get("type") != TYPE_GK:
+            raise LineupError("Somente goleiros podem ser colocados no slot gk.")
+        return
+    sec = key.split("_")[0]
+    if snap.get("type") != TYPE_FIELD:
+        raise LineupError(f"Apenas jogadores de linha podem ocupar o slot {key}.")
+    if snap.get("position") != SECTION_POSITION[sec]:
+        raise LineupError(f"{snap.get('name') or 'Jogador'} não é {SECTION_LABEL[sec]} (slot {key}).")
+
+
+def apply_lineup(user, team, target):
+    """
+    Aplica {slot_key: player_id | ""} ao time do usuário. Lança LineupError sem escrever nada se a
+    escalação for inválida ou faltarem cartas. Retorna o nº de slots alterados.
+    """
+    team.ensure_structure()
+    current = {key: slot_value(team.slots, key) for key in SLOT_KEYS}
+    final = {key: (target[key] if key in target else slot_pid(current[key])) for key in SLOT_KEYS}
+    changed = [key for key in SLOT_KEYS if final[key] != slot_pid(current[key])]
+    if not changed:
+        return 0
+
+    # saldo por jogador: + devolvido ao inventário, - colocado no time
+    delta = Counter()
+    for key in changed:
+        if current[key]:
+            delta[slot_pid(current[key])] += 1
+        if final[key]:
+            delta[final[key]] -= 1
+    delta = {pid: d for pid, d in delta.items() if pid and d}
+
+    items = {
+        inv.player_id: inv
+        for inv in InventoryItem.objects.select_for_update().filter(user=user, player_id__in=list(delta))
+    }
+
+    # snapshot de cada jogador do time final: slot atual > inventário > catálogo
+    snaps = {}
+    for key in SLOT_KEYS:
+        if isinstance(current[key], dict) and slot_pid(current[key]):
+            snaps.setdefault(slot_pid(current[key]), current[key])
+    for pid, inv in items.items():
+        if pid not in snaps and isinstance(inv.player_data, dict) and inv.player_data:
+            snaps[pid] = inv.player_data
+    needed = [pid for pid in set(final.values()) | set(delta) if pid and pid not in snaps]
+    if needed:
+        snaps.update(get_player_snapshots(needed))
+
+    # validação em memória
+    # (slots não alterados só entram na checagem de nomes: dados legados não bloqueiam a escalação)
+    names = {}
+    for key in SLOT_KEYS:
+        pid = final[key]
+        if not pid:
+            continue
+        snap = snaps.get(pid)
+        if not snap:
+            if key not in changed:
+                continue
+            raise LineupError(f"Não foi possível obter os dados do jogador do slot {key}.")
+        snap = snaps[pid] = normalize_snapshot(snap)
+        if key in changed:
+            _validate_slot(key, snap)
+        name = (snap.get("name") or "").strip().lower()
+        if name in names:
+            raise LineupError(f"Já existe este jogador no time! ({snap.get('name')})")
+        names[name] = key
+    short = [pid for pid, d in delta.items() if d < 0 and (pid not in items or items[pid].qty < -d)]
+    if short:
+        raise LineupError("Você não possui esse jogador no inventário." if len(short) == 1
+                          else f"Você não possui {len(short)} desses jogadores no inventário.")
+
+    # inventário: um bulk_update, um DELETE e um bulk_create
+    to_update, to_delete, to_create = [], [], []
+    models_by_type = {TYPE_FIELD: JogadorCampo, TYPE_GK: JogadorGoleiro}
+    for pid, d in delta.items():
+        inv = items.get(pid)
+        if inv is not None:
+            inv.qty += d
+            (to_update if inv.qty > 0 else to_delete).append(inv)
+            continue
+        # devolução de jogador sem item no inventário (só d > 0 chega aqui)
+        snap = normalize_snapshot(snaps.get(pid))
+        if not snap:
+            continue
+        model = models_by_type.get(snap.get("type"))
+        inv = InventoryItem(
+            user=user,
+            content_type=ContentType.objects.get_for_model(model) if model else None,
+            object_id=pid if model else None,
+            player_data=snap,
+            qty=d,
+        )
+        inv.sync_snapshot_columns()
+        to_create.append(inv)
+    if to_update:
+        InventoryItem.objects.bulk_update(to_update, ["qty"])
+    if to_delete:
+        InventoryItem.objects.filter(pk__in=[inv.pk for inv in to_delete]).delete()
+    if to_create:
+        InventoryItem.objects.bulk_create(to_create)
+    InventoryChange.record(
+        [(inv, InventoryChange.OP_UPDATED) for inv in to_update]
+        + [(inv, InventoryChange.OP_REMOVED) for inv in to_delete]
+        + [(inv, InventoryChange.OP_ADDED) for inv in to_create]
+    )
+
+    # Team.slots gravado uma vez
+    slots = {"gk": "", "def": [], "mid": [], "off": []}
+    for key in SLOT_KEYS:
+        value = snaps.get(final[key], current[key]) if final[key] else ""
+        if key == "gk":
+            slots["gk"] = value
+        else:
+            slots[key.split("_")[0]].append(value)
+    team.slots = slots
+    team.save(update_fields=["slots", "updated_at"])
+    return len(changed)
+
+
+def _set_slot_value(slots, key, value):
+    if key == "gk":
+        slots["gk"] = value
+        return
+    sec, idx = key.split("_")
+    idx = int(idx)
+    lst = slots.setdefault(sec, [])
+    while len(lst) <= idx:
+        lst.append("")
+    lst[idx] = value
+
+
+def swap_slots(team, from_key, to_key):
+    """
+    Troca o conteúdo de dois slots do time (ou move, se o destino estiver vazio) com uma única
+    gravação de Team.slots. Valida tipo/posição dos jogadores nos slots novos; lança LineupError.
+    """
+    if from_key not in SLOT_KEYS or to_key not in SLOT_KEYS:
+        raise LineupError("Slot inválido.")
+    if from_key == to_key:
+        raise LineupError("Escolha dois slots diferentes.")
+    team.ensure_structure()
+    values = {key: slot_value(team.slots, key) for key in (from_key, to_key)}
+    if not values[from_key]:
+        raise LineupError("O slot de origem está vazio.")
+
+    # slots legados guardados como id viram snapshot (necessário para validar a posição)
+    ids = [v for v in values.values() if v and not isinstance(v, dict)]
+    by_id = get_player_snapshots(ids) if ids else {}
+    for key, value in values.items():
+        if value and not isinstance(value, dict):
+            snap = by_id.get(slot_pid(value))
+            if not snap:
+                raise LineupError(f"Não foi possível obter os dados do jogador do slot {key}.")
+            values[key] = snap
+        elif value:
+            values[key] = normalize_snapshot(value)
+
+    moved = {to_key: values[from_key], from_key: values[to_key]}
+    for key, snap in moved.items():
+        if snap:
+            _validate_slot(key, snap)
+    for key, snap in moved.items():
+        _set_slot_value(team.slots, key, snap or "")
+    team.save(update_fields=["slots", "updated_at"])
@@ -0,0 +1,80 @@
+# sistemas/team_profile.py
+"""
+Perfil de força do time do usuário, materializado em Team.profile sempre que Team.slots muda
+(Team.save). Início de partida e /my-team/profile/ leem o perfil direto, sem consultas extras.
+Sem imports de models (usado por models.py e pela migração).
+
+Formato:
+    {"hash": sha1 curto dos slots, "resolved": todos os slots preenchidos são snapshots,
+     "filled": nº de jogadores, "overall_avg": média de overall (= lineup_strength),
+     "attack"/"defense"/"passing"/"speed": somas dos jogadores de linha,
+     "gk": {"handling", "positioning", "reflex", "speed"} (zeros sem goleiro),
+     "zones": {"def"|"mid"|"off": {"overall": [...por slot, 0 = vazio], "attack", "defense", "passing"}}}
+"""
+
+import hashlib
+import json
+
+ZONES = (("def", 4), ("mid", 3), ("off", 3))
+GK_STATS = ("handling", "positioning", "reflex", "speed")
+FIELD_STATS = ("attack", "defense", "passing", "speed")
+
+
+def _num(snap, key):
+    try:
+        return int(float(snap.get(key) or 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def lineup_hash(slots):
+    raw = json.dumps(slots or {}, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+
+def compute_profile(slots):
+    slots = slots or {}
+    resolved = True
+    overalls = []
+
+    gk = slots.get("gk")
+    gk_stats = dict.fromkeys(GK_STATS, 0)
+    if isinstance(gk, dict) and gk:
+        gk_stats = {k: _num(gk, k) for k in GK_STATS}
+        overalls.append(_num(gk, "overall"))
+    elif gk:
+        resolved = False
+
+    totals = dict.fromkeys(FIELD_STATS, 0)
+    zones = {}
+    for sec, size in ZONES:
+        lst = list(slots.get(sec) or [])
+        lst += [""] * (size - len(lst))
+        zone = {"overall": [], "attack": 0, "defense": 0, "passing": 0}
+        for p in lst:
+            if isinstance(p, dict) and p:
+                zone["overall"].append(_num(p, "overall"))
+                overalls.append(_num(p, "overall"))
+                for k in ("attack", "defense", "passing"):
+                    zone[k] += _num(p, k)
+                for k in FIELD_STATS:
+                    totals[k] += _num(p, k)
+            else:
+                if p:
+                    resolved = False
+                zone["overall"].append(0)
+        zones[sec] = zone
+
+    return {
+        "hash": lineup_hash(slots),
+        "resolved": resolved,
+        "filled": len(overalls),
+        "overall_avg": round(sum(overalls) / len(overalls), 2) if overalls else 0.0,
+        **totals,
+        "gk": gk_stats,
+        "zones": zones,
+    }
+
+
+def profile_is_current(profile, slots):
+    return bool(profile) and profile.get("hash") == lineup_hash(slots)
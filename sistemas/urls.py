@@ -12,18 +12,27 @@ urlpatterns = [
     path('my-team/', views.my_team_view, name='my_team'),
     path('my-team/set-slot/', views.set_team_slot_view, name='set_team_slot'),
     path('my-team/clear-slot/', views.clear_team_slot_view, name='clear_team_slot'),
+    path('my-team/lineup/', views.submit_lineup_view, name='submit_lineup'),
+    path('my-team/swap-slots/', views.swap_team_slots_view, name='swap_team_slots'),
+    path('my-team/auto-lineup/', views.auto_lineup_view, name='auto_lineup'),
+    path('my-team/profile/', views.team_profile_view, name='team_profile'),
     
 
     #outros
     path("store/", views.store_view, name="store"),
     path("matches/", views.jogos_view, name="matches"),    # maps to jogos_view
     path('inventory/sell/', views.sell_inventory_item_view, name='sell_inventory'),
+    path('inventory/sell-batch/', views.sell_inventory_batch_view, name='sell_inventory_batch'),
+    path('inventory/api/', views.inventory_api_view, name='inventory_api'),
+    path('inventory/changes/', views.inventory_changes_view, name='inventory_changes'),
 
     path("store-players/", views.store_players_view, name="store_players"),
 
     #packs
     path("packs/", views.packs_list_view, name="packs_list"),
     path('packs/<uuid:pack_id>/buy/', views.buy_pack_view, name='buy_pack'),
+    path('packs/odds/', views.pack_odds_view, name='pack_odds'),
+    path('packs/<uuid:pack_id>/odds/', views.pack_odds_view, name='pack_odds_detail'),
 
     # modos de jogo
     path("game/", views.game_view, name="game"),
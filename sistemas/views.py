@@ -1,18 +1,25 @@
 # ===== Standard Library =====
 import random
 import json
+import hashlib
+import time
 import uuid
 import logging
 logger = logging.getLogger(__name__)
 
 # ===== Django Core =====
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
 from django.db import transaction
-from django.db.models import Q
+from django.db.models import Case, F, OuterRef, Q, Subquery, When
 from django.contrib import messages
 from django.views.decorators.http import require_POST, require_http_methods
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404, JsonResponse
 from django.contrib.auth.hashers import make_password, check_password
 from django.utils.text import slugify
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 
 # ===== Django ContentTypes =====
 from django.contrib.contenttypes.models import ContentType
@@ -20,9 +27,25 @@ from django.contrib.contenttypes.models import ContentType
 # ===== Local Models =====
 from .models import (
     SistemasUser, JogadorCampo, JogadorGoleiro,
-    InventoryItem, Pack, Team, AITeam, Match
+    InventoryItem, InventoryChange, Pack, Team, AITeam, Match, CoinTransaction,
+    snapshot_from_field, snapshot_from_gk,
 )
 
+# ===== Local Helpers =====
+from .coins import credit_coins, debit_coins, get_balance
+from .events import emit_purchase_event
+from .snapshots import normalize_snapshot
+from .ids import parse_uuid, canonical_id, canonical_ids
+from .catalog import (
+    catalog_version, load_catalog_snapshots, get_packs_listing, get_pack_contents, get_player_snapshots,
+)
+from .pack_odds import simulate_packs
+from .inventory_query import InventoryQueryError, inventory_page, changes_since, current_seq
+from .team_lineup import SLOT_KEYS, LineupError, apply_lineup, parse_lineup, swap_slots
+from .lineup_solver import OBJECTIVE_OVERALL, OBJECTIVES, best_lineup
+from .ai_lineups import build_random_lineup, build_authentic_lineup, lineup_strength
+from .match_history import MatchHistoryError, history_page, pack_lineups, summarize, unpack_lineups
+
 def _static_path_for_club_logo(player):
     slug = slugify(player.club or "")
     candidate = f"players/{slug}/logo.png"
@@ -69,59 +92,6 @@ def _get_current_user(request):
         return None
 
 
-def _normalize_position(pos):
-    """
-    Normaliza várias formas de posição para as constantes do modelo JogadorCampo.
-    Retorna uma das constantes JogadorCampo.POSITION_* ou None.
-    """
-    if not pos:
-        return None
-    p = str(pos).strip().lower()
-    offs = {"offensivezone","offensive","off","ata","ataque","ata_zone","ataquezone","ataque_zone","offensive_zone"}
-    neuts = {"neutralzone","neutral","mid","midfield","meio","medio","mid_zone","meiozone","neutral_zone"}
-    defs = {"defensivezone","defensive","def","defesa","zdef","def_zone","defensive_zone"}
-
-    # se já é a constante (em lowercase)
-    if p == JogadorCampo.POSITION_OFF.lower():
-        return JogadorCampo.POSITION_OFF
-    if p == JogadorCampo.POSITION_NEU.lower():
-        return JogadorCampo.POSITION_NEU
-    if p == JogadorCampo.POSITION_DEF.lower():
-        return JogadorCampo.POSITION_DEF
-
-    if p in offs:
-        return JogadorCampo.POSITION_OFF
-    if p in neuts:
-        return JogadorCampo.POSITION_NEU
-    if p in defs:
-        return JogadorCampo.POSITION_DEF
-
-    # heurística simples por substring
-    if "off" in p and "def" not in p:
-        return JogadorCampo.POSITION_OFF
-    if "def" in p:
-        return JogadorCampo.POSITION_DEF
-    if "mid" in p or "neu" in p or "meio" in p:
-        return JogadorCampo.POSITION_NEU
-
-    return None
-
-def _infer_position_from_snapshot(snapshot):
-    """
-    Heurística simples para inferir posição se snapshot vier sem 'position'.
-    Usa diferença entre ataque e defesa.
-    """
-    try:
-        atk = int(snapshot.get("attack") or 0)
-        df = int(snapshot.get("defense") or 0)
-        if atk >= df + 5:
-            return JogadorCampo.POSITION_OFF
-        if df >= atk + 5:
-            return JogadorCampo.POSITION_DEF
-    except Exception:
-        pass
-    return JogadorCampo.POSITION_NEU
-
 def register_view(request):
     if request.method == "POST":
         username = (request.POST.get("username") or "").strip()
@@ -179,93 +149,139 @@ def home_view(request):
 
 # ===== Helpers internos =====
 
-def _inv_item_match_by_pid(inv_item, pid):
-    if not inv_item:
-        return False
-    try:
-        if getattr(inv_item, "object_id", None) and str(inv_item.object_id) == str(pid):
-            return True
-    except Exception:
-        pass
-    try:
-        pd = getattr(inv_item, "player_data", None)
-        if isinstance(pd, dict) and str(pd.get("id")) == str(pid):
-            return True
-    except Exception:
-        pass
-    try:
-        co = getattr(inv_item, "content_object", None)
-        if co is not None:
-            if getattr(co, "id", None) and str(co.id) == str(pid):
-                return True
-    except Exception:
-        pass
-    return False
+def _inv_item_for_pid(user, pid):
+    """InventoryItem do usuário para o jogador `pid` (uma busca no índice (user, player_id)) ou None."""
+    key = InventoryItem.compute_player_id(pid, None)
+    if not key:
+        return None
+    return (
+        InventoryItem.objects.filter(user=user, player_id=key)
+        .select_related("field_player", "goalkeeper").first()
+    )
 
-def _inv_item_snapshot(inv_item):
-    """Tenta retornar snapshot (dict) representando o jogador do InventoryItem."""
-    try:
-        pd = getattr(inv_item, "player_data", None)
-        if isinstance(pd, dict) and pd:
-            # garantir position canônica se for jogador de campo
-            snap = dict(pd)
-            if snap.get("type") == "field":
-                pos = snap.get("position") or snap.get("pos")
-                pos_norm = _normalize_position(pos)
-                if not pos_norm:
-                    pos_norm = _infer_position_from_snapshot(snap)
-                snap["position"] = pos_norm
-            return snap
-    except Exception:
-        pass
+def _slot_items(slots):
+    """Pares (slot_key, valor) de team.slots na ordem gk, def_0.., mid_0.., off_0.."""
+    slots = slots or {}
+    out = [("gk", slots.get("gk") or "")]
+    for sec in ("def", "mid", "off"):
+        for i, v in enumerate(slots.get(sec) or []):
+            out.append((f"{sec}_{i}", v))
+    return out
 
-    try:
-        co = getattr(inv_item, "content_object", None)
-        if co:
-            if isinstance(co, JogadorCampo):
-                pos_norm = _normalize_position(getattr(co, "position", None)) or getattr(co, "position", None)
-                return {
-                    "id": str(co.id), "type": "field", "name": co.name, "club": co.club,
-                    "country": co.country, "photo_path": co.photo_path, "overall": co.overall,
-                    "attack": co.attack, "passing": co.passing, "defense": co.defense,
-                    "speed": co.speed, "position": pos_norm,
-                }
-            else:
-                return {
-                    "id": str(co.id), "type": "gk", "name": co.name, "club": co.club,
-                    "country": co.country, "photo_path": co.photo_path, "overall": co.overall,
-                    "handling": co.handling, "positioning": co.positioning, "reflex": co.reflex,
-                    "speed": co.speed,
-                }
-    except Exception:
-        pass
 
+def _slot_values(slots):
+    return [v for _, v in _slot_items(slots) if v]
+
+
+def _wants_json(request):
+    """Ação do my_team pedida via fetch (Accept: application/json) ou com corpo JSON."""
+    return request.content_type == "application/json" or "application/json" in request.headers.get("Accept", "")
+
+
+def _post_data(request):
+    """Corpo JSON (dict) ou request.POST."""
+    if request.content_type != "application/json":
+        return request.POST
     try:
-        ct = getattr(inv_item, "content_type", None)
-        oid = getattr(inv_item, "object_id", None)
-        if ct and oid:
-            model = ct.model_class()
-            p = model.objects.filter(pk=oid).first()
-            if p:
-                if isinstance(p, JogadorCampo):
-                    pos_norm = _normalize_position(getattr(p, "position", None)) or getattr(p, "position", None)
-                    return {
-                        "id": str(p.id), "type": "field", "name": p.name, "club": p.club,
-                        "country": p.country, "photo_path": p.photo_path, "overall": p.overall,
-                        "attack": p.attack, "passing": p.passing, "defense": p.defense,
-                        "speed": p.speed, "position": pos_norm,
-                    }
-                else:
-                    return {
-                        "id": str(p.id), "type": "gk", "name": p.name, "club": p.club,
-                        "country": p.country, "photo_path": p.photo_path, "overall": p.overall,
-                        "handling": p.handling, "positioning": p.positioning, "reflex": p.reflex,
-                        "speed": p.speed,
-                    }
-    except Exception:
-        pass
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
 
-    return None
+
+def _latest(qs, field):
+    return Subquery(qs.filter(user=OuterRef("pk")).order_by("-id").values(field)[:1])
+
+
+def _my_team_version(request, user):
+    """
+    Versão da página my_team: (etag, last_modified) numa única consulta indexada, a partir de
+    Team.updated_at, da última sequência do diário de inventário e do último lançamento de moedas
+    (o saldo aparece na página). None quando há mensagens pendentes (a página precisa exibi-las).
+    """
+    if len(messages.get_messages(request)):
+        return None
+    row = (
+        SistemasUser.objects.filter(pk=user.pk)
+        .annotate(
+            team_updated=Subquery(Team.objects.filter(user=OuterRef("pk")).values("updated_at")[:1]),
+            inv_seq=_latest(InventoryChange.objects, "id"),
+            inv_time=_latest(InventoryChange.objects, "created_at"),
+            coin_seq=_latest(CoinTransaction.objects, "id"),
+            coin_time=_latest(CoinTransaction.objects, "created_at"),
+        )
+        .values_list("team_updated", "inv_seq", "inv_time", "coin_seq", "coin_time")
+        .first()
+    )
+    if row is None:
+        return None
+    team_updated, inv_seq, inv_time, coin_seq, coin_time = row
+    # sessão entra na chave: login troca o token CSRF embutido nos forms
+    raw = f"{user.pk}:{request.session.session_key}:{request.get_full_path()}:{team_updated}:{inv_seq}:{coin_seq}"
+    etag = '"%s"' % hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+    times = [t for t in (team_updated, inv_time, coin_time) if t]
+    last_modified = int(max(times).timestamp()) if times else None
+    return etag, last_modified
+
+
+def _fail(request, msg, status=400):
+    """Erro das ações do my_team: {"error": msg} para fetch/JSON, senão mensagem + redirect para my_team."""
+    if _wants_json(request):
+        return JsonResponse({"error": msg}, status=status)
+    messages.error(request, msg)
+    return redirect("my_team")
+
+
+def _inventory_delta(*items):
+    """Estado atual dos itens alterados: [{player_id, qty, player}], qty 0 = saiu do inventário."""
+    out = {}
+    for inv in items:
+        if inv is not None and inv.player_id:
+            out[inv.player_id] = {"player_id": inv.player_id, "qty": max(inv.qty or 0, 0), "player": inv.player_data}
+    return list(out.values())
+
+
+def _user_lineup_slots(user, team):
+    """
+    Slots do time do usuário como snapshots ({"gk", "def", "mid", "off"}) para simulação/replay.
+    Caminho normal: Team.lineup_slots(), direto do perfil materializado, sem consultas. Slots legados
+    guardados como id: inventário numa consulta (player_id__in) + catálogo em cache.
+    """
+    slots = team.lineup_slots()
+    if slots is not None:
+        return slots
+    raw = team.slots or {}
+    keys = [InventoryItem.compute_player_id(v, None) for v in _slot_values(raw) if not isinstance(v, dict)]
+    inv_snaps = {
+        pid: normalize_snapshot(pd)
+        for pid, pd in InventoryItem.objects.filter(user=user, player_id__in=keys)
+        .exclude(player_data=None).values_list("player_id", "player_data")
+    }
+    catalog_snaps = get_player_snapshots(k for k in keys if k not in inv_snaps)
+
+    def _resolve(value):
+        if not value:
+            return ""
+        if isinstance(value, dict):
+            return value
+        key = InventoryItem.compute_player_id(value, None)
+        return inv_snaps.get(key) or catalog_snaps.get(key) or ""
+
+    return {
+        "gk": _resolve(raw.get("gk")),
+        "def": [_resolve(v) for v in (raw.get("def") or [])],
+        "mid": [_resolve(v) for v in (raw.get("mid") or [])],
+        "off": [_resolve(v) for v in (raw.get("off") or [])],
+    }
+
+
+def _inv_item_snapshot(inv_item):
+    """Snapshot (dict) do jogador do InventoryItem; player_data já vem normalizado do save()."""
+    pd = getattr(inv_item, "player_data", None)
+    if isinstance(pd, dict) and pd:
+        return dict(pd)
+    # linha sem snapshot (legado): montar a partir do jogador referenciado (FK tipada)
+    return normalize_snapshot(inv_item.get_player_snapshot())
 
 # ----------------------
 # Views
@@ -281,6 +297,15 @@ def my_team_view(request):
     if not user:
         return redirect("/login/")
 
+    # GET condicional: página inalterada (time, inventário e moedas) custa só a consulta da versão
+    version = _my_team_version(request, user)
+    if version:
+        etag, last_modified = version
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            patch_cache_control(not_modified, private=True, no_cache=True)
+            return not_modified
+
     team, created = Team.objects.get_or_create(user=user)
     # garantir estrutura mínima
     try:
@@ -298,71 +323,44 @@ def my_team_view(request):
         team.slots = s
         team.save(update_fields=["slots"])
 
-    inv_rows = list(InventoryItem.objects.filter(user=user).select_related("content_type"))
-    inventory_players = []
+    # snapshots normalizados na escrita (InventoryItem.save / migração 0007): leitura direta.
+    # Só os itens escalados (índice user+player_id); o inventário inteiro não é carregado aqui.
+    slot_pids = set()
+    for v in _slot_values(team.slots):
+        raw = str(v.get("id") or "") if isinstance(v, dict) else str(v)
+        if raw:
+            slot_pids.add(canonical_id(raw) or raw)
     inv_map = {}
-
-    for it in inv_rows:
-        snap = _inv_item_snapshot(it)
-        if not snap:
-            continue
-        pid = str(snap.get("id") or it.object_id or "")
-        snap_norm = dict(snap)
-        snap_norm["id"] = pid
-        # inferir tipo se não existir
-        if "type" not in snap_norm:
-            if any(k in snap_norm for k in ("handling", "reflex", "positioning")):
-                snap_norm["type"] = "gk"
-            else:
-                snap_norm["type"] = "field"
-
-        # normaliza posição para jogadores de campo
-        if snap_norm.get("type") == "field":
-            pos_curr = snap_norm.get("position")
-            pos_norm = _normalize_position(pos_curr)
-            if not pos_norm:
-                pos_norm = _infer_position_from_snapshot(snap_norm)
-            snap_norm["position"] = pos_norm
-
-        snap_norm["qty"] = int(getattr(it, "qty", 1) or 1)
-        inventory_players.append(snap_norm)
-        inv_map[pid] = snap_norm
+    if slot_pids:
+        for pid, snap, qty in (
+            InventoryItem.objects.filter(user=user, player_id__in=slot_pids)
+            .exclude(player_data=None).values_list("player_id", "player_data", "qty")
+        ):
+            inv_map[pid] = dict(snap, qty=int(qty or 1))
 
     # montar slots prontos
     slots = {"gk": None, "def": [], "mid": [], "off": []}
 
+    # slots guardados como id (legado) fora do inventário: resolvidos de uma vez pelo cache do catálogo
+    catalog_snaps = get_player_snapshots(
+        v for v in _slot_values(team.slots) if not isinstance(v, dict) and (canonical_id(v) or v) not in inv_map
+    )
+
     def _resolve_slot_value(val):
         if not val:
             return ("", None)
         if isinstance(val, dict):
             pid = str(val.get("id") or "")
             snap = dict(val)
-            snap["qty"] = inv_map.get(pid, {}).get("qty", 0)
-            # garantir posição canônica pra snapshot guardado no time
-            if snap.get("type") == "field":
-                p = snap.get("position")
-                snap["position"] = _normalize_position(p) or snap.get("position")
+            snap["qty"] = inv_map.get(canonical_id(pid) or pid, {}).get("qty", 0)
             return (pid, snap)
         pid = str(val)
-        if pid in inv_map:
-            return (pid, inv_map[pid])
-        pobj_gk = JogadorGoleiro.objects.filter(pk=pid).first()
-        if pobj_gk:
-            return (pid, {
-                "id": pid, "type": "gk", "name": pobj_gk.name, "club": pobj_gk.club,
-                "country": pobj_gk.country, "photo_path": pobj_gk.photo_path, "overall": pobj_gk.overall,
-                "handling": pobj_gk.handling, "positioning": pobj_gk.positioning, "reflex": pobj_gk.reflex,
-                "speed": pobj_gk.speed, "qty": 0
-            })
-        pobj = JogadorCampo.objects.filter(pk=pid).first()
-        if pobj:
-            pos_norm = _normalize_position(getattr(pobj, "position", None)) or getattr(pobj, "position", None)
-            return (pid, {
-                "id": pid, "type": "field", "name": pobj.name, "club": pobj.club,
-                "country": pobj.country, "photo_path": pobj.photo_path, "overall": pobj.overall,
-                "attack": pobj.attack, "passing": pobj.passing, "defense": pobj.defense,
-                "speed": pobj.speed, "position": pos_norm, "qty": 0
-            })
+        key = canonical_id(pid) or pid
+        if key in inv_map:
+            return (pid, inv_map[key])
+        snap = catalog_snaps.get(key)
+        if snap:
+            return (pid, dict(snap, id=pid, qty=0))
         return (pid, None)
 
     raw_gk = (team.slots.get("gk") if getattr(team, "slots", None) else "") or ""
@@ -387,48 +385,74 @@ def my_team_view(request):
         pid, player_detail = _resolve_slot_value(v)
         slots["off"].append({"key": f"off_{i}", "assigned": pid or "", "player": player_detail})
 
-    # eligíveis
+    # eligíveis: página do inventário filtrada por tipo/posição nas colunas indexadas, melhores primeiro
     selected_slot = request.GET.get("select_slot")
     eligible_players = []
+    picker_next_cursor = None
+    picker_filter = None
     if selected_slot:
-        if selected_slot == "gk":
-            eligible_players = [p for p in inventory_players if p.get("type") == "gk" and p.get("qty", 0) > 0]
-        else:
-            sec = selected_slot.split("_")[0]
-            if sec == "def":
-                eligible_players = [p for p in inventory_players if p.get("type") == "field" and p.get("position") == JogadorCampo.POSITION_DEF and p.get("qty", 0) > 0]
-            elif sec == "mid":
-                eligible_players = [p for p in inventory_players if p.get("type") == "field" and p.get("position") == JogadorCampo.POSITION_NEU and p.get("qty", 0) > 0]
-            elif sec == "off":
-                eligible_players = [p for p in inventory_players if p.get("type") == "field" and p.get("position") == JogadorCampo.POSITION_OFF and p.get("qty", 0) > 0]
-
-    logger.debug("my_team_view: user=%s inventory_count=%d team_slots=%s selected_slot=%s eligible=%d",
-                 user.username, len(inventory_players), team.slots, selected_slot, len(eligible_players))
-
-    return render(request, "accounts/my_team.html", {
+        sec = selected_slot.split("_")[0]
+        picker_filter = {
+            "gk": {"type": "gk"},
+            "def": {"position": JogadorCampo.POSITION_DEF},
+            "mid": {"position": JogadorCampo.POSITION_NEU},
+            "off": {"position": JogadorCampo.POSITION_OFF},
+        }.get(sec)
+    if picker_filter:
+        params = dict(picker_filter, sort="-overall", cursor=request.GET.get("cursor") or "")
+        try:
+            page = inventory_page(user, params)
+        except InventoryQueryError:
+            page = inventory_page(user, dict(params, cursor=""))
+        eligible_players = [p for p in page["items"] if p.get("qty", 0) > 0]
+        picker_next_cursor = page["next_cursor"]
+
+    duplicate_players = [
+        dict(snap, qty=qty)
+        for snap, qty in InventoryItem.objects.filter(user=user, qty__gt=1)
+        .exclude(player_data=None).values_list("player_data", "qty")
+    ]
+
+    logger.debug("my_team_view: user=%s team_slots=%s selected_slot=%s eligible=%d",
+                 user.username, team.slots, selected_slot, len(eligible_players))
+
+    response = render(request, "accounts/my_team.html", {
         "user": user,
-        "team": {"name": f"{user.username}'s Team", "level": 1, "coins": user.coins},
+        "team": {"name": f"{user.username}'s Team", "level": 1, "coins": get_balance(user)},
         "team_obj": team,
-        "inventory_players": inventory_players,
-        "inv_map": inv_map,
+        "duplicate_players": duplicate_players,
+        "slot_keys": SLOT_KEYS,
         "slots": slots,
         "selected_slot": selected_slot,
         "eligible_players": eligible_players,
+        "picker_next_cursor": picker_next_cursor,
     })
+    if version and not created:
+        response["ETag"] = etag
+        if last_modified:
+            response["Last-Modified"] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 
 @require_POST
 @transaction.atomic
 def set_team_slot_view(request):
+    """
+    Coloca um jogador do inventário num slot. Form: mensagem + redirect para my_team.
+    Via fetch (JSON): só o slot alterado e os itens do inventário que mudaram.
+    """
+    wants_json = _wants_json(request)
+
     user = _get_current_user(request)
     if not user:
-        return redirect("/login/")
+        return _fail(request, "Não autenticado.", status=401) if wants_json else redirect("/login/")
 
-    slot_key = request.POST.get("slot_key")
-    player_id = request.POST.get("player_id")
-    if not slot_key or not player_id:
-        messages.error(request, "Slot ou jogador inválido.")
-        return redirect("my_team")
+    data = _post_data(request)
+    slot_key = data.get("slot_key")
+    player_id = data.get("player_id")
+    if slot_key not in SLOT_KEYS or not player_id:
+        return _fail(request, "Slot ou jogador inválido.")
 
     user = SistemasUser.objects.select_for_update().get(pk=user.pk)
     team, _ = Team.objects.get_or_create(user=user)
@@ -439,21 +463,14 @@ def set_team_slot_view(request):
             team.slots = {"gk": "", "def": ["","","",""], "mid": ["","",""], "off": ["","",""]}
             team.save(update_fields=["slots"])
 
-    inv_items = list(InventoryItem.objects.filter(user=user).select_related("content_type"))
-    inv_new = None
-    for it in inv_items:
-        if _inv_item_match_by_pid(it, player_id):
-            inv_new = it
-            break
+    inv_new = _inv_item_for_pid(user, player_id)
 
     if not inv_new:
-        messages.error(request, "Você não possui esse jogador no inventário.")
-        return redirect("my_team")
+        return _fail(request, "Você não possui esse jogador no inventário.")
 
     snapshot = _inv_item_snapshot(inv_new)
     if not snapshot:
-        messages.error(request, "Não foi possível obter os dados do jogador.")
-        return redirect("my_team")
+        return _fail(request, "Não foi possível obter os dados do jogador.")
 
     # tipo do jogador
     p_type = snapshot.get("type")
@@ -461,25 +478,20 @@ def set_team_slot_view(request):
     # validação por slot
     if slot_key == "gk":
         if p_type != "gk":
-            messages.error(request, "Somente goleiros podem ser colocados neste slot.")
-            return redirect("my_team")
+            return _fail(request, "Somente goleiros podem ser colocados neste slot.")
     else:
         sec = slot_key.split("_")[0]
 
         if p_type != "field":
-            messages.error(request, "Apenas jogadores de linha podem ocupar este slot.")
-            return redirect("my_team")
+            return _fail(request, "Apenas jogadores de linha podem ocupar este slot.")
 
-        pos_norm = _normalize_position(snapshot.get("position"))
+        pos_norm = snapshot.get("position")  # já canônica (normalizada na escrita)
         if sec == "def" and pos_norm != JogadorCampo.POSITION_DEF:
-            messages.error(request, "Jogador não é defensor.")
-            return redirect("my_team")
+            return _fail(request, "Jogador não é defensor.")
         if sec == "mid" and pos_norm != JogadorCampo.POSITION_NEU:
-            messages.error(request, "Jogador não é meio-campista.")
-            return redirect("my_team")
+            return _fail(request, "Jogador não é meio-campista.")
         if sec == "off" and pos_norm != JogadorCampo.POSITION_OFF:
-            messages.error(request, "Jogador não é atacante.")
-            return redirect("my_team")
+            return _fail(request, "Jogador não é atacante.")
 
     # ------------------------------------------
     # --- duplicate-name check (NOVO)
@@ -489,38 +501,18 @@ def set_team_slot_view(request):
         existing_names = set()
 
         raw_slots = team.slots or {}
-
-        # gk
-        gk = raw_slots.get("gk")
-        if gk and not (slot_key == "gk"):  # não checar o slot que está sendo trocado
-            if isinstance(gk, dict):
-                nm = gk.get("name")
+        others = [v for key, v in _slot_items(raw_slots) if v and key != slot_key]  # pular o slot atual
+        by_id = get_player_snapshots(v for v in others if not isinstance(v, dict))
+        for v in others:
+            if isinstance(v, dict):
+                nm = v.get("name")
             else:
-                pobj = JogadorGoleiro.objects.filter(pk=str(gk)).first()
-                nm = pobj.name if pobj else None
+                nm = (by_id.get(canonical_id(v) or "") or {}).get("name")
             if nm:
                 existing_names.add(nm.strip().lower())
 
-        # def/mid/off
-        for zone in ("def", "mid", "off"):
-            zone_list = raw_slots.get(zone) or []
-            for i, z in enumerate(zone_list):
-                # pular o slot atual
-                if zone + "_" + str(i) == slot_key:
-                    continue
-                if not z:
-                    continue
-                if isinstance(z, dict):
-                    nm = z.get("name")
-                else:
-                    pobj = JogadorCampo.objects.filter(pk=str(z)).first()
-                    nm = pobj.name if pobj else None
-                if nm:
-                    existing_names.add(nm.strip().lower())
-
         if new_name in existing_names:
-            messages.error(request, "Já existe este jogador no time!")
-            return redirect("my_team")
+            return _fail(request, "Já existe este jogador no time!", status=409)
     except Exception:
         pass
     # ------------------------------------------
@@ -536,17 +528,18 @@ def set_team_slot_view(request):
 
     # devolver jogador antigo ao inventário
     old_pid = ""
+    old_item = None
     if isinstance(old_val, dict):
         old_pid = str(old_val.get("id"))
     else:
         old_pid = str(old_val)
 
     if old_pid:
-        old_item = None
-        for it in inv_items:
-            if _inv_item_match_by_pid(it, old_pid):
-                old_item = it
-                break
+        # mesmo jogador no slot: reaproveita a instância (senão os dois save() se sobrescrevem)
+        if InventoryItem.compute_player_id(old_pid, None) == inv_new.player_id:
+            old_item = inv_new
+        else:
+            old_item = _inv_item_for_pid(user, old_pid)
         if old_item:
             old_item.qty += 1
             old_item.save()
@@ -561,10 +554,168 @@ def set_team_slot_view(request):
     # salvar novo jogador no time
     team.set_slot(slot_key, snapshot)
 
+    if wants_json:
+        return JsonResponse({
+            "message": "Jogador colocado no slot!",
+            "slots": {slot_key: snapshot},
+            "inventory": _inventory_delta(old_item, inv_new),
+        })
     messages.success(request, "Jogador colocado no slot!")
     return redirect("my_team")
 
 
+@require_POST
+@transaction.atomic
+def swap_team_slots_view(request):
+    """
+    Troca dois slots do time (ou move para um slot vazio) sem passar pelo inventário.
+    POST from_slot, to_slot (form ou JSON). Uma única gravação de Team.slots.
+    """
+    wants_json = _wants_json(request)
+    user = _get_current_user(request)
+    if not user:
+        return _fail(request, "Não autenticado.", status=401) if wants_json else redirect("/login/")
+
+    data = _post_data(request)
+    try:
+        team = Team.objects.select_for_update().get_or_create(user=user)[0]
+        swap_slots(team, data.get("from_slot") or "", data.get("to_slot") or "")
+    except LineupError as e:
+        return _fail(request, str(e))
+
+    if wants_json:
+        return JsonResponse({"slots": team.slots})
+    messages.success(request, "Slots trocados!")
+    return redirect("my_team")
+
+
+@require_http_methods(["GET"])
+def team_profile_view(request):
+    """Perfil de força materializado do time (JSON), lido de Team.profile sem resolver slots."""
+    user = _get_current_user(request)
+    if not user:
+        return JsonResponse({"error": "Não autenticado."}, status=401)
+    team, _ = Team.objects.get_or_create(user=user)
+    return JsonResponse({"profile": team.current_profile()})
+
+
+@require_POST
+@transaction.atomic
+def submit_lineup_view(request):
+    """
+    Escalação inteira (1-4-3-3) em um POST, em vez de um set-slot por jogador.
+    Corpo JSON {"gk": id, "def": [4 ids], "mid": [3], "off": [3]} (ou {"slots": {...}}) ou form com
+    gk, def_0..def_3, mid_0..mid_2, off_0..off_2. Slots ausentes ficam como estão; "" esvazia.
+    Tudo ou nada (ver sistemas/team_lineup.py).
+    """
+    wants_json = _wants_json(request)
+
+    user = _get_current_user(request)
+    if not user:
+        return _fail(request, "Não autenticado.", status=401) if wants_json else redirect("/login/")
+
+    try:
+        data = _post_data(request)
+        if isinstance(data.get("slots"), dict):
+            data = data["slots"]
+        target = parse_lineup(data)
+
+        user = SistemasUser.objects.select_for_update().get(pk=user.pk)
+        team, _ = Team.objects.get_or_create(user=user)
+        changed = apply_lineup(user, team, target)
+    except LineupError as e:
+        return _fail(request, str(e))
+
+    if wants_json:
+        return JsonResponse({"changed": changed, "slots": team.slots})
+    messages.success(request, f"Escalação salva ({changed} slot(s) alterado(s)).")
+    return redirect("my_team")
+
+
+@require_POST
+@transaction.atomic
+def auto_lineup_view(request):
+    """
+    Escala automaticamente o melhor 1-4-3-3 com as cartas do usuário (inventário + time atual),
+    sem nomes repetidos. POST objective=overall|sim (default settings.AUTO_LINEUP_OBJECTIVE).
+    Solver em sistemas/lineup_solver.py; a gravação é a mesma do submit de escalação.
+    """
+    wants_json = _wants_json(request)
+    user = _get_current_user(request)
+    if not user:
+        return _fail(request, "Não autenticado.", status=401) if wants_json else redirect("/login/")
+
+    objective = _post_data(request).get("objective") or getattr(settings, "AUTO_LINEUP_OBJECTIVE", OBJECTIVE_OVERALL)
+    if objective not in OBJECTIVES:
+        return _fail(request, "Objetivo de escalação inválido.")
+
+    user = SistemasUser.objects.select_for_update().get(pk=user.pk)
+    team, _ = Team.objects.get_or_create(user=user)
+    team.ensure_structure()
+    cards = list(
+        InventoryItem.objects.filter(user=user).exclude(player_type="").values_list("player_data", flat=True)
+    )
+    cards.extend(v for _, v in _slot_items(team.slots) if isinstance(v, dict))
+    lineup, total = best_lineup(cards, objective)
+    target = {key: (snap.get("id") if snap else "") for key, snap in lineup.items()}
+
+    try:
+        changed = apply_lineup(user, team, parse_lineup(target))
+    except LineupError as e:
+        return _fail(request, str(e))
+
+    filled = sum(1 for snap in lineup.values() if snap)
+    if wants_json:
+        return JsonResponse({"objective": objective, "score": total, "filled": filled,
+                             "changed": changed, "slots": team.slots})
+    messages.success(request, f"Time escalado automaticamente: {filled}/11 jogadores, {changed} slot(s) alterado(s).")
+    return redirect("my_team")
+
+
+@require_http_methods(["GET"])
+def inventory_api_view(request):
+    """
+    Inventário do usuário em JSON, paginado por keyset.
+    GET /inventory/api/?type=field|gk&position=...&club=...&min_overall=N&max_overall=N
+        &sort=-overall|overall|-obtained_at|obtained_at&limit=N&cursor=<next_cursor>
+    """
+    user = _get_current_user(request)
+    if not user:
+        return JsonResponse({"error": "Não autenticado."}, status=401)
+    # GET condicional: a página só muda com o diário do inventário (seq) e com a query string
+    raw = f"{user.pk}:{current_seq(user)}:{request.get_full_path()}"
+    etag = '"%s"' % hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        patch_cache_control(not_modified, private=True, no_cache=True)
+        return not_modified
+    try:
+        page = inventory_page(user, request.GET)
+    except InventoryQueryError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    response = JsonResponse(page)
+    response["ETag"] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+@require_http_methods(["GET"])
+def inventory_changes_view(request):
+    """
+    Mudanças do inventário desde uma sequência (sincronização incremental).
+    GET /inventory/changes/?since=<seq>&limit=N — `seq` da resposta é o próximo `since`;
+    a API de inventário também devolve `seq` para começar a sincronizar a partir de uma listagem.
+    """
+    user = _get_current_user(request)
+    if not user:
+        return JsonResponse({"error": "Não autenticado."}, status=401)
+    try:
+        page = changes_since(user, request.GET)
+    except InventoryQueryError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    return JsonResponse(page)
+
+
 # ---------- NOVA VIEW: vender item do inventário ----------
 @require_POST
 @transaction.atomic
@@ -574,71 +725,182 @@ def sell_inventory_item_view(request):
     - Procura um InventoryItem do usuário que corresponda ao player_id.
     - Credita 100 moedas ao usuário (fixo).
     - Decrementa qty ou deleta o InventoryItem.
+    Via fetch (JSON): item alterado + saldo, sem recarregar a página.
     """
+    wants_json = _wants_json(request)
+
     user = _get_current_user(request)
     if not user:
-        return redirect("/login/")
+        return _fail(request, "Não autenticado.", status=401) if wants_json else redirect("/login/")
 
-    player_id = request.POST.get("player_id")
+    player_id = _post_data(request).get("player_id")
     if not player_id:
-        messages.error(request, "Jogador inválido para venda.")
-        return redirect("my_team")
-
-    # lock user and work inside transaction
-    try:
-        user_locked = SistemasUser.objects.select_for_update().get(pk=user.pk)
-    except SistemasUser.DoesNotExist:
-        return redirect("my_team")
+        return _fail(request, "Jogador inválido para venda.")
 
     # localizar InventoryItem correspondente (tolerante)
-    inv_items = list(InventoryItem.objects.filter(user=user_locked).select_related("content_type"))
-    found_item = None
-    for it in inv_items:
-        if _inv_item_match_by_pid(it, player_id):
-            found_item = it
-            break
+    found_item = _inv_item_for_pid(user, player_id)
 
     if not found_item:
-        messages.error(request, "Carta não encontrada no inventário.")
-        return redirect("my_team")
+        return _fail(request, "Carta não encontrada no inventário.")
+
+    SALE_PRICE = InventoryItem.SALE_PRICE  # preço fixo por sua solicitação
 
-    SALE_PRICE = 100  # preço fixo por sua solicitação
+    # decrementar ou deletar InventoryItem com UPDATE/DELETE condicionais (sem lock):
+    # só credita quem de fato removeu a carta — duas vendas simultâneas da última cópia não pagam duas vezes
+    removed = InventoryItem.objects.filter(pk=found_item.pk, qty__gt=1).update(qty=F("qty") - 1)
+    if removed:
+        found_item.qty = InventoryItem.objects.filter(pk=found_item.pk).values_list("qty", flat=True).first() or 0
+        InventoryChange.record([(found_item, InventoryChange.OP_UPDATED)])
+    else:
+        removed, _ = InventoryItem.objects.filter(pk=found_item.pk, qty__lte=1).delete()
+        if removed:
+            found_item.qty = 0
+            InventoryChange.record([(found_item, InventoryChange.OP_REMOVED)])
+    if not removed:
+        return _fail(request, "Carta não encontrada no inventário.", status=409)
 
     # creditar moedas
-    user_locked.coins = (user_locked.coins or 0) + SALE_PRICE
-    user_locked.save(update_fields=["coins"])
+    credit_coins(user.pk, SALE_PRICE, kind=CoinTransaction.KIND_CARD_SALE, ref=found_item.object_id or found_item.pk)
+
+    if wants_json:
+        return JsonResponse({
+            "message": f"Carta vendida por {SALE_PRICE} moedas.",
+            "inventory": _inventory_delta(found_item),
+            "balance": get_balance(user),
+        })
+    messages.success(request, f"Carta vendida por {SALE_PRICE} moedas.")
+    return redirect("my_team")
+# ---------- fim da nova view ----------
+
+MAX_SELL_BATCH = 500  # pares (player_id, qty) por venda em lote
+
+
+def _parse_sell_batch(request):
+    """
+    Pares (player_id canônico, qty) da venda em lote, somando ids repetidos.
+    Aceita JSON {"items": [{"player_id": ..., "qty": N}, ...]} ou form com listas player_id/qty.
+    Lança ValueError com a mensagem para o usuário.
+    """
+    if request.content_type == "application/json":
+        try:
+            raw = _post_data(request).get("items") or []
+            pairs = [(it.get("player_id"), it.get("qty", 1)) for it in raw]
+        except (TypeError, AttributeError):
+            raise ValueError("JSON inválido.")
+    else:
+        pids = request.POST.getlist("player_id")
+        qtys = request.POST.getlist("qty") or ["1"] * len(pids)
+        if len(qtys) != len(pids):
+            raise ValueError("Listas player_id/qty de tamanhos diferentes.")
+        pairs = list(zip(pids, qtys))
+    if not pairs:
+        raise ValueError("Nenhuma carta selecionada para venda.")
+    if len(pairs) > MAX_SELL_BATCH:
+        raise ValueError(f"No máximo {MAX_SELL_BATCH} cartas diferentes por venda.")
+
+    wanted = {}
+    for pid, qty in pairs:
+        key = InventoryItem.compute_player_id(pid, None)
+        try:
+            qty = int(qty)
+        except (TypeError, ValueError):
+            qty = 0
+        if not key or qty < 1:
+            raise ValueError("Jogador ou quantidade inválidos para venda.")
+        wanted[key] = wanted.get(key, 0) + qty
+    return wanted
+
+
+@require_POST
+@transaction.atomic
+def sell_inventory_batch_view(request):
+    """
+    Vende várias cartas de uma vez: lista de (player_id, qty).
+    Tudo ou nada: se faltar alguma carta/quantidade nada é vendido. Decrementos num bulk_update e linhas
+    zeradas num único DELETE, ambos condicionados à qty lida (select_for_update não trava no sqlite): se
+    uma venda concorrente mudou alguma linha, a contagem não fecha, a transação é desfeita (409) e nada
+    é creditado. O total vai num só lançamento.
+    Requisição JSON (ou Accept: application/json) recebe JSON; form recebe mensagem + redirect para my_team.
+    """
+    wants_json = _wants_json(request)
+
+    user = _get_current_user(request)
+    if not user:
+        return _fail(request, "Não autenticado.", status=401) if wants_json else redirect("/login/")
 
-    # decrementar ou deletar InventoryItem
     try:
-        current_qty = int(getattr(found_item, "qty", 1) or 1)
-        if current_qty > 1:
-            found_item.qty = current_qty - 1
-            found_item.save(update_fields=["qty"])
+        wanted = _parse_sell_batch(request)
+    except ValueError as e:
+        return _fail(request, str(e))
+
+    items = {
+        inv.player_id: inv
+        for inv in InventoryItem.objects.select_for_update().filter(user=user, player_id__in=list(wanted))
+    }
+    missing = [pid for pid, qty in wanted.items() if pid not in items or items[pid].qty < qty]
+    if missing:
+        return _fail(request, f"{len(missing)} carta(s) não encontrada(s) no inventário na quantidade pedida.", status=409)
+
+    to_update = []
+    to_delete = []
+    for pid, qty in wanted.items():
+        inv = items[pid]
+        if inv.qty > qty:
+            inv.qty -= qty
+            to_update.append(inv)
         else:
-            # qty == 1 -> remove registro
-            found_item.delete()
-    except Exception:
-        # fallback: tenta deletar
-        try:
-            found_item.delete()
-        except Exception:
-            logger.exception("Erro ao remover InventoryItem durante venda (ignorado).")
+            to_delete.append(inv)
+    # condições agrupadas por qty (poucos termos mesmo com muitas linhas)
+    read_qty = {}
+    for inv in to_update:
+        read_qty.setdefault(inv.qty + wanted[inv.player_id], []).append(inv.pk)
+    sold_qty = {}
+    for inv in to_delete:
+        sold_qty.setdefault(wanted[inv.player_id], []).append(inv.pk)
+    updated = deleted = 0
+    if to_update:
+        unchanged = Q()
+        for qty, pks in read_qty.items():
+            unchanged |= Q(pk__in=pks, qty=qty)
+        updated = InventoryItem.objects.filter(unchanged).bulk_update(to_update, ["qty"])
+    if to_delete:
+        sellable = Q()
+        for qty, pks in sold_qty.items():
+            sellable |= Q(pk__in=pks, qty__lte=qty)
+        _, per_model = InventoryItem.objects.filter(sellable).delete()
+        deleted = per_model.get(InventoryItem._meta.label, 0)
+    if updated != len(to_update) or deleted != len(to_delete):
+        transaction.set_rollback(True)
+        return _fail(request, "O inventário mudou durante a venda. Nada foi vendido; tente novamente.", status=409)
+    InventoryChange.record(
+        [(inv, InventoryChange.OP_UPDATED) for inv in to_update]
+        + [(inv, InventoryChange.OP_REMOVED) for inv in to_delete]
+    )
 
-    messages.success(request, f"Carta vendida por {SALE_PRICE} moedas.")
+    sold = sum(wanted.values())
+    total = sold * InventoryItem.SALE_PRICE
+    credit_coins(user.pk, total, kind=CoinTransaction.KIND_CARD_SALE, ref=f"batch:{len(wanted)}")
+
+    if wants_json:
+        return JsonResponse({"sold": sold, "credited": total, "balance": get_balance(user)})
+    messages.success(request, f"{sold} carta(s) vendida(s) por {total} moedas.")
     return redirect("my_team")
-# ---------- fim da nova view ----------
 
 @require_POST
 @transaction.atomic
 def clear_team_slot_view(request):
+    """
+    Esvazia um slot e devolve o jogador ao inventário. Form: redirect para my_team.
+    Via fetch (JSON): slot esvaziado + item do inventário alterado.
+    """
+    wants_json = _wants_json(request)
     user = _get_current_user(request)
     if not user:
-        return redirect("/login/")
+        return _fail(request, "Não autenticado.", status=401) if wants_json else redirect("/login/")
 
-    slot_key = request.POST.get("slot_key")
-    if not slot_key:
-        #messages.error(request, "Slot inválido.")
-        return redirect("my_team")
+    slot_key = _post_data(request).get("slot_key")
+    if slot_key not in SLOT_KEYS:
+        return _fail(request, "Slot inválido.")
 
     user = SistemasUser.objects.select_for_update().get(pk=user.pk)
     team, _ = Team.objects.get_or_create(user=user)
@@ -659,9 +921,10 @@ def clear_team_slot_view(request):
 
     if not old_val:
         #messages.info(request, "Slot já está vazio.")
+        if wants_json:
+            return JsonResponse({"slots": {slot_key: None}, "inventory": []})
         return redirect("my_team")
 
-    inv_items = list(InventoryItem.objects.filter(user=user).select_related("content_type"))
     old_pid = ""
     old_snapshot = None
     if isinstance(old_val, dict):
@@ -670,11 +933,7 @@ def clear_team_slot_view(request):
     else:
         old_pid = str(old_val or "")
 
-    found_old = None
-    for it in inv_items:
-        if _inv_item_match_by_pid(it, old_pid):
-            found_old = it
-            break
+    found_old = _inv_item_for_pid(user, old_pid)
 
     if found_old:
         found_old.qty = (found_old.qty or 0) + 1
@@ -683,9 +942,9 @@ def clear_team_slot_view(request):
         try:
             if old_snapshot:
                 ct = ContentType.objects.get_for_model(JogadorCampo) if old_snapshot.get("type") == "field" else ContentType.objects.get_for_model(JogadorGoleiro)
-                InventoryItem.objects.create(user=user, content_type=ct, object_id=str(old_snapshot.get("id") or ""), player_data=old_snapshot, qty=1)
+                found_old = InventoryItem.objects.create(user=user, content_type=ct, object_id=str(old_snapshot.get("id") or ""), player_data=old_snapshot, qty=1)
             else:
-                InventoryItem.objects.create(user=user, content_type=None, object_id=str(old_pid), player_data=None, qty=1)
+                found_old = InventoryItem.objects.create(user=user, content_type=None, object_id=str(old_pid), player_data=None, qty=1)
         except Exception:
             pass
 
@@ -703,10 +962,17 @@ def clear_team_slot_view(request):
             team.slots = s
             team.save(update_fields=["slots", "updated_at"])
     except Exception as e:
-        #messages.error(request, f"Erro ao limpar slot: {e}")
-        return redirect("my_team")
+        # desfaz a devolução ao inventário: o slot não foi limpo
+        transaction.set_rollback(True)
+        return _fail(request, f"Erro ao limpar slot: {e}", status=500)
 
     #messages.success(request, "Slot liberado e inventário atualizado.")
+    if wants_json:
+        return JsonResponse({
+            "message": "Slot liberado e inventário atualizado.",
+            "slots": {slot_key: None},
+            "inventory": _inventory_delta(found_old),
+        })
     return redirect("my_team")
 
 def store_view(request):
@@ -716,10 +982,18 @@ def store_view(request):
     return render(request, "accounts/store.html", {"user": user})
 
 def jogos_view(request):
+    """Página de jogos + histórico de partidas do usuário (paginado por cursor: ?cursor=...)."""
     user = _get_current_user(request)
     if not user:
         return redirect("login")
-    return render(request, "accounts/matches.html", {"user": user,})
+    team = Team.objects.filter(user=user).first()
+    history = {"items": [], "next_cursor": None}
+    if team:
+        try:
+            history = history_page(team, request.GET)
+        except MatchHistoryError:
+            history = history_page(team, {})  # cursor/limit inválido: volta para a primeira página
+    return render(request, "accounts/matches.html", {"user": user, "history": history})
 
 def support_view(request):
     user = _get_current_user(request)
@@ -752,232 +1026,239 @@ def packs_list_view(request):
     if not user:
         return redirect("/login/")
 
-    open_pack_id = request.GET.get("open")
-    packs_qs = Pack.objects.all().order_by("-created_at")
+    open_pack_id = canonical_id(request.GET.get("open"))
     packs = []
 
-    def _ensure_list(v):
-        if v is None:
-            return []
-        if isinstance(v, list):
-            return v
-        if isinstance(v, str):
-            try:
-                return json.loads(v)
-            except Exception:
-                return []
-        return []
-
-    for p in packs_qs:
-        pack_dict = {
-            "id": str(p.id),
-            "name": p.name,
-            "price": p.price,
-            "description": p.description,
-            "image_path": p.image_path,
-            "field_players": [],
-            "gk_players": [],
-        }
-
-        if open_pack_id and str(p.id) == str(open_pack_id):
-            raw_field = getattr(p, "field_players", None)
-            raw_gk = getattr(p, "gk_players", None)
-            field_entries = _ensure_list(raw_field)
-            gk_entries = _ensure_list(raw_gk)
-
-            field_ids = [str(e.get("id")) for e in field_entries if e.get("id")]
-            gk_ids = [str(e.get("id")) for e in gk_entries if e.get("id")]
-
-            field_map = {}
-            if field_ids:
-                qs_field = JogadorCampo.objects.filter(id__in=field_ids).values("id", "name", "photo_path")
-                for r in qs_field:
-                    field_map[str(r["id"])] = {"id": str(r["id"]), "name": r["name"], "photo_path": r["photo_path"]}
-
-            gk_map = {}
-            if gk_ids:
-                qs_gk = JogadorGoleiro.objects.filter(id__in=gk_ids).values("id", "name", "photo_path")
-                for r in qs_gk:
-                    gk_map[str(r["id"])] = {"id": str(r["id"]), "name": r["name"], "photo_path": r["photo_path"]}
-
-            final_field = []
-            for e in field_entries:
-                pid = str(e.get("id", ""))
-                src = field_map.get(pid)
-                if src:
-                    final_field.append({"id": pid, "name": src.get("name"), "photo_path": src.get("photo_path")})
-                else:
-                    final_field.append({"id": pid, "name": e.get("name") or pid, "photo_path": e.get("photo_path") or ""})
-
-            final_gk = []
-            for e in gk_entries:
-                pid = str(e.get("id", ""))
-                src = gk_map.get(pid)
-                if src:
-                    final_gk.append({"id": pid, "name": src.get("name"), "photo_path": src.get("photo_path")})
-                else:
-                    final_gk.append({"id": pid, "name": e.get("name") or pid, "photo_path": e.get("photo_path") or ""})
-
-            pack_dict["field_players"] = final_field
-            pack_dict["gk_players"] = final_gk
-
+    # listagem e conteúdo vêm do cache versionado (ver sistemas/catalog.py)
+    for p in get_packs_listing():
+        pack_dict = dict(p, field_players=[], gk_players=[])
+        if open_pack_id and p["id"] == open_pack_id:
+            pack_dict.update(get_pack_contents(p))
         packs.append(pack_dict)
 
     last_win = request.session.pop("last_win", None)
     return render(request, "accounts/packs_list.html", {"packs": packs, "user": user, "last_win": last_win})
 
+MAX_PACKS_PER_PURCHASE = 50
+
 @require_POST
 @transaction.atomic
 def buy_pack_view(request, pack_id):
     """
-    Compra de pack via POST /packs/<pack_id>/buy/
+    Compra de pack via POST /packs/<pack_id>/buy/ (opcional ?count=N para abrir N packs de uma vez).
     Agora armazena snapshot (player_data) no InventoryItem para evitar problemas ao exibir inventário.
+    N sorteios de uma vez, duplicatas agrupadas em memória; inventário gravado com um bulk_create
+    e um bulk_update, e as moedas debitadas com um único UPDATE F(), tudo na mesma transação.
+    As quantidades são somadas no banco (qty = qty + n, um UPDATE com CASE por pk), sem lock de linha:
+    uma venda concorrente não é sobrescrita; se ela apagou a linha, a compra é desfeita.
     """
     user = _get_current_user(request)
     if not user:
         return redirect("/login/")
 
-    try:
-        print("DBGBUY: attempt buy, raw pack_id:", repr(pack_id), "type:", type(pack_id))
-    except Exception:
-        pass
-
-    pid_str = str(pack_id)
-
-    pack = Pack.objects.filter(id=pid_str).first()
-    if not pack:
-        pid_nodash = pid_str.replace("-", "")
-        pack = Pack.objects.filter(id__in=[pid_str, pid_nodash]).first()
-    if not pack:
-        for p in Pack.objects.all():
-            try:
-                if str(p.id) == pid_str or str(p.id).replace("-", "") == pid_str.replace("-", ""):
-                    pack = p
-                    break
-            except Exception:
-                continue
+    started = time.perf_counter()
 
+    # lookup único por pk (id canônico); id inválido não gera query
+    pack_uuid = parse_uuid(pack_id)
+    pack = Pack.objects.filter(pk=pack_uuid).first() if pack_uuid else None
     if not pack:
-        sample = list(Pack.objects.values_list("id", flat=True)[:20])
-        print("DBGBUY: pack NOT FOUND. pid_str:", pid_str)
-        print("DBGBUY: sample existing pack ids (first 20):", sample)
+        emit_purchase_event("pack_not_found", user_id=str(user.id), pack_id=str(pack_id))
         messages.error(request, "Pack não encontrado (buy endpoint).")
         return redirect("/packs/")
 
-    print("DBGBUY: using pack:", str(pack.id), pack.name)
-
-    user = SistemasUser.objects.select_for_update().get(pk=user.pk)
-    if getattr(user, "coins", 0) < pack.price:
-        messages.error(request, "Moedas insuficientes.")
-        print("DBGBUY: insufficient coins:", user.coins, "price:", pack.price)
+    # quantidade de packs abertos de uma vez (?count=N, padrão 1)
+    try:
+        count = int(request.GET.get("count") or request.POST.get("count") or 1)
+    except (TypeError, ValueError):
+        count = 0
+    if count < 1 or count > MAX_PACKS_PER_PURCHASE:
+        emit_purchase_event("invalid_count", user_id=str(user.id), pack_id=str(pack.id), count=count)
+        messages.error(request, f"Quantidade inválida (1 a {MAX_PACKS_PER_PURCHASE} packs por compra).")
         return redirect("/packs/")
+    total_price = pack.price * count
 
     try:
-        chosen = pack.pick_random_entry()
+        drawn = pack.pick_random_entries(count)
     except Exception as e:
-        print("DBGBUY: pick_random_entry error:", e)
-        chosen = None
+        logger.exception("Erro ao sortear entradas do pack %s: %s", pack.id, e)
+        drawn = []
 
-    if not chosen:
+    if not drawn:
         messages.error(request, "Pack vazio ou sem entradas ponderadas.")
-        print("DBGBUY: no chosen entry.")
+        emit_purchase_event("empty_pack", user_id=str(user.id), pack_id=str(pack.id))
         return redirect("/packs/")
 
-    chosen_id = str(chosen.get("id"))
-    chosen_type = chosen.get("type")
-    print("DBGBUY: chosen entry:", chosen)
-
-    if chosen_type == "field":
-        player_model = JogadorCampo
-        p_type = "field"
-    elif chosen_type == "gk":
-        player_model = JogadorGoleiro
-        p_type = "gk"
-    else:
-        messages.error(request, "Entrada inválida no pack.")
-        print("DBGBUY: invalid chosen_type:", chosen_type)
+    player_models = {"field": JogadorCampo, "gk": JogadorGoleiro}
+
+    # agrupar duplicatas em memória: (type, id) -> {"entry", "qty"}
+    wins = {}
+    for chosen in drawn:
+        chosen_type = chosen.get("type")
+        if chosen_type not in player_models:
+            messages.error(request, "Entrada inválida no pack.")
+            emit_purchase_event("invalid_entry", pack_id=str(pack.id), entry_type=chosen_type,
+                                entry_id=str(chosen.get("id")))
+            return redirect("/packs/")
+        key = (chosen_type, canonical_id(chosen.get("id")) or str(chosen.get("id")))
+        if key not in wins:
+            wins[key] = {"entry": chosen, "qty": 0}
+        wins[key]["qty"] += 1
+
+    # debitar coins: UPDATE condicional (coins >= total), sem lock; 0 linhas = saldo insuficiente.
+    # Falhas depois daqui desfazem o débito junto com a transação da view.
+    if not debit_coins(user.pk, total_price, kind=CoinTransaction.KIND_PACK_PURCHASE, ref=pack.pk):
+        messages.error(request, "Moedas insuficientes.")
+        emit_purchase_event("insufficient_coins", user_id=str(user.id), pack_id=str(pack.id),
+                            count=count, total_price=total_price)
         return redirect("/packs/")
 
-    # buscar player no DB (preferência)
-    player_obj = player_model.objects.filter(id=chosen_id).first()
-    if not player_obj:
-        for ex in player_model.objects.values_list("id", flat=True)[:2000]:
-            try:
-                if str(ex) == chosen_id or str(ex).replace("-", "") == chosen_id.replace("-", ""):
-                    player_obj = player_model.objects.filter(pk=ex).first()
-                    if player_obj:
-                        print("DBGBUY: matched player by fallback id:", ex)
-                        break
-            except Exception:
-                continue
-
-    # montar snapshot (prefer dados do DB, senão a entry JSON)
-    snapshot = {}
-    if player_obj:
-        if isinstance(player_obj, JogadorCampo):
-            snapshot = {
-                "id": str(player_obj.id), "type": "field", "name": player_obj.name, "club": player_obj.club,
-                "country": player_obj.country, "photo_path": player_obj.photo_path, "overall": player_obj.overall,
-                "attack": player_obj.attack, "passing": player_obj.passing, "defense": player_obj.defense,
-                "speed": player_obj.speed, "position": player_obj.position,
-            }
+    # buscar players no DB (preferência): uma query por tipo
+    players = {}
+    for p_type, player_model in player_models.items():
+        ids = [pid for (t, pid) in wins if t == p_type]
+        if not ids:
+            continue
+        for obj in player_model.objects.filter(id__in=canonical_ids(ids)):
+            players[(p_type, str(obj.id))] = obj
+
+    # montar snapshots (prefer dados do DB, senão a entry)
+    for (p_type, chosen_id), win in wins.items():
+        player_obj = players.get((p_type, chosen_id))
+        if player_obj:
+            snapshot = snapshot_from_field(player_obj) if p_type == "field" else snapshot_from_gk(player_obj)
         else:
-            snapshot = {
-                "id": str(player_obj.id), "type": "gk", "name": player_obj.name, "club": player_obj.club,
-                "country": player_obj.country, "photo_path": player_obj.photo_path, "overall": player_obj.overall,
-                "handling": player_obj.handling, "positioning": player_obj.positioning,
-                "reflex": player_obj.reflex, "speed": player_obj.speed,
-            }
-    else:
-        # use chosen JSON (entry) as fallback
-        snapshot = dict(chosen)
-        snapshot["id"] = chosen_id
-        snapshot.setdefault("type", chosen_type)
-
-    # localizar InventoryItem existente (tolerante)
-    ct = ContentType.objects.get_for_model(player_model)
-    inv = InventoryItem.objects.filter(user=user).filter(
-        Q(content_type=ct, object_id=chosen_id) | Q(player_data__id=chosen_id)
-    ).first()
-
-    if inv:
-        inv.qty = (inv.qty or 0) + 1
-        # garantir que snapshot esteja salvo no registro
-        if not inv.player_data or not isinstance(inv.player_data, dict):
-            inv.player_data = snapshot
-        inv.content_type = ct
-        inv.object_id = chosen_id
-        inv.save()
-    else:
-        # criar com snapshot completo
-        InventoryItem.objects.create(
-            user=user,
-            content_type=ct,
-            object_id=chosen_id,
-            player_data=snapshot,
-            qty=1
+            snapshot = dict(win["entry"])
+            snapshot["id"] = chosen_id
+            snapshot.setdefault("type", p_type)
+        # bulk_create/bulk_update não passam pelo save(): normalizar aqui
+        win["snapshot"] = normalize_snapshot(snapshot, p_type)
+
+    # localizar InventoryItems existentes de uma vez (índice (user, player_id))
+    all_ids = [pid for (_, pid) in wins]
+    inv_by_pid = {}
+    for inv in InventoryItem.objects.filter(user=user, player_id__in=all_ids):
+        inv_by_pid.setdefault(inv.player_id, inv)
+
+    to_update = []
+    to_create = []
+    increments = {}  # pk -> cartas somadas
+    for (p_type, chosen_id), win in wins.items():
+        ct = ContentType.objects.get_for_model(player_models[p_type])
+        inv = inv_by_pid.get(chosen_id)
+        if inv:
+            increments[inv.pk] = win["qty"]
+            # garantir que snapshot esteja salvo no registro
+            if not inv.player_data or not isinstance(inv.player_data, dict):
+                inv.player_data = win["snapshot"]
+            inv.content_type = ct
+            inv.object_id = chosen_id
+            inv.sync_snapshot_columns()  # bulk_update não passa pelo save()
+            to_update.append(inv)
+        else:
+            # criar com snapshot completo
+            inv = InventoryItem(
+                user=user,
+                content_type=ct,
+                object_id=chosen_id,
+                player_data=win["snapshot"],
+                qty=win["qty"],
+            )
+            inv.sync_snapshot_columns()
+            to_create.append(inv)
+
+    if to_update:
+        InventoryItem.objects.bulk_update(
+            to_update, ["player_data", "content_type", "object_id", *InventoryItem.SNAPSHOT_COLUMNS]
         )
+        bumped = InventoryItem.objects.filter(pk__in=list(increments)).update(
+            qty=Case(*[When(pk=pk, then=F("qty") + n) for pk, n in increments.items()], default=F("qty"))
+        )
+        if bumped != len(increments):
+            # carta vendida (linha apagada) entre a leitura e a escrita: desfaz a compra inteira, débito incluso
+            transaction.set_rollback(True)
+            emit_purchase_event("inventory_conflict", user_id=str(user.id), pack_id=str(pack.id), count=count)
+            messages.error(request, "Seu inventário mudou durante a compra. Nada foi cobrado; tente novamente.")
+            return redirect("/packs/")
+        new_qty = dict(InventoryItem.objects.filter(pk__in=list(increments)).values_list("pk", "qty"))
+        for inv in to_update:
+            inv.qty = new_qty[inv.pk]
+    if to_create:
+        InventoryItem.objects.bulk_create(to_create)
+    InventoryChange.record(
+        [(inv, InventoryChange.OP_UPDATED) for inv in to_update]
+        + [(inv, InventoryChange.OP_ADDED) for inv in to_create]
+    )
 
-    # debitar coins
-    user.coins -= pack.price
-    user.save()
-    print("DBGBUY: purchase completed. new coins:", user.coins)
-
-    photo_path = snapshot.get("photo_path", "")
-    player_name = snapshot.get("name", chosen_id)
-    overall = snapshot.get("overall", "")
+    # resumo para o modal: melhor carta em destaque + lista do que saiu
+    items = []
+    for (p_type, chosen_id), win in wins.items():
+        snap = win["snapshot"]
+        items.append({
+            "id": chosen_id,
+            "name": snap.get("name") or chosen_id,
+            "type": p_type,
+            "photo_path": snap.get("photo_path") or "",
+            "overall": snap.get("overall", ""),
+            "qty": win["qty"],
+        })
+    items.sort(key=lambda it: int(it["overall"] or 0), reverse=True)
+    best = items[0]
+
+    # só registra compras efetivadas (após o commit da transação)
+    purchase_event = dict(
+        user_id=str(user.id),
+        pack_id=str(pack.id),
+        pack_name=pack.name,
+        price=pack.price,
+        count=count,
+        total_price=total_price,
+        items=[{"id": it["id"], "type": it["type"], "overall": it["overall"], "qty": it["qty"]} for it in items],
+        duration_ms=round((time.perf_counter() - started) * 1000, 2),
+    )
+    transaction.on_commit(lambda: emit_purchase_event("purchase", **purchase_event))
 
     request.session["last_win"] = {
-        "id": chosen_id,
-        "name": player_name or chosen_id,
-        "type": p_type,
-        "photo_path": photo_path or "",
-        "overall": overall,
+        "id": best["id"],
+        "name": best["name"],
+        "type": best["type"],
+        "photo_path": best["photo_path"],
+        "overall": best["overall"],
         "pack_name": pack.name,
+        "count": count,
+        "items": items,
     }
 
     return redirect("/packs/#result")
 
+
+ODDS_ENDPOINT_DEFAULT_SAMPLES = 200_000
+ODDS_ENDPOINT_MAX_SAMPLES = 2_000_000
+
+@staff_member_required
+@require_http_methods(["GET"])
+def pack_odds_view(request, pack_id=None):
+    """
+    Relatório de odds/valor esperado dos packs (JSON), só para staff (login do /admin/).
+    GET /packs/odds/ (todos) ou /packs/<pack_id>/odds/; ?samples=N&seed=S&top=K.
+    Mesmo cálculo do comando `simulate_pack_odds`.
+    """
+    try:
+        samples = int(request.GET.get("samples") or ODDS_ENDPOINT_DEFAULT_SAMPLES)
+        seed = int(request.GET["seed"]) if request.GET.get("seed") else None
+        top = int(request.GET.get("top") or 10)
+    except ValueError:
+        return JsonResponse({"error": "Parâmetros inválidos."}, status=400)
+    samples = max(1, min(samples, ODDS_ENDPOINT_MAX_SAMPLES))
+
+    packs = Pack.objects.order_by("-created_at")
+    if pack_id is not None:
+        packs = packs.filter(pk=pack_id)
+        if not packs.exists():
+            return JsonResponse({"error": "Pack não encontrado."}, status=404)
+
+    reports = simulate_packs(list(packs), samples=samples, seed=seed, top=top)
+    return JsonResponse({"samples": samples, "sale_price": InventoryItem.SALE_PRICE, "packs": reports})
+
 #Modo de jogo random
 
 def _sample_random_players_for_ai():
@@ -987,135 +1268,8 @@ def _sample_random_players_for_ai():
     Se não houver jogadores distintos suficientes para preencher todas as posições,
     lança RuntimeError.
     """
-    # buscar pools
-    field_players = list(JogadorCampo.objects.all())
-    goalkeepers = list(JogadorGoleiro.objects.all())
-
-    if not goalkeepers:
-        raise RuntimeError("Não há goleiros no banco de dados para gerar o time AI.")
-    if len(field_players) < 3:
-        raise RuntimeError("Não há jogadores de campo suficientes no banco para gerar o time AI.")
-
-    random.shuffle(goalkeepers)
-    random.shuffle(field_players)
-
-    # preparar pools por posição
-    defenders_pool = [p for p in field_players if p.position == JogadorCampo.POSITION_DEF]
-    mids_pool = [p for p in field_players if p.position == JogadorCampo.POSITION_NEU]
-    offs_pool = [p for p in field_players if p.position == JogadorCampo.POSITION_OFF]
-
-    # helper para escolher N jogadores de uma pool garantindo nomes únicos (lowercase)
-    def _take_unique(pool, needed, chosen_names, chosen_ids):
-        chosen = []
-        ppool = list(pool)
-        random.shuffle(ppool)
-        for p in ppool:
-            if len(chosen) >= needed:
-                break
-            name_norm = (p.name or "").strip().lower()
-            if not name_norm:
-                continue
-            if name_norm in chosen_names:
-                continue
-            if str(p.id) in chosen_ids:
-                continue
-            chosen.append(p)
-            chosen_names.add(name_norm)
-            chosen_ids.add(str(p.id))
-        return chosen
-
-    chosen_names = set()
-    chosen_ids = set()
-
-    # escolher goleiro (tentar garantir nome único)
-    gk_obj = None
-    for g in goalkeepers:
-        name_norm = (g.name or "").strip().lower()
-        if name_norm and name_norm not in chosen_names:
-            gk_obj = g
-            chosen_names.add(name_norm)
-            chosen_ids.add(str(g.id))
-            break
-    if not gk_obj:
-        # fallback se todos os goleiros tiverem nomes duplicados (muito raro)
-        gk_obj = goalkeepers[0]
-        chosen_names.add((gk_obj.name or "").strip().lower())
-        chosen_ids.add(str(gk_obj.id))
-
-    # tentar escolher defenders, mids e offs garantindo nomes únicos
-    def_list = _take_unique(defenders_pool, 4, chosen_names, chosen_ids)
-    mid_list = _take_unique(mids_pool, 3, chosen_names, chosen_ids)
-    off_list = _take_unique(offs_pool, 3, chosen_names, chosen_ids)
-
-    # Se alguma posição não foi completamente preenchida, tentar preencher a partir de field_players
-    def _fill_from_field(needed, current_list):
-        if len(current_list) >= needed:
-            return current_list
-        extras = list(field_players)
-        random.shuffle(extras)
-        for p in extras:
-            if len(current_list) >= needed:
-                break
-            pid = str(p.id)
-            name_norm = (p.name or "").strip().lower()
-            if not name_norm:
-                continue
-            if name_norm in chosen_names:
-                continue
-            if pid in chosen_ids:
-                continue
-            current_list.append(p)
-            chosen_names.add(name_norm)
-            chosen_ids.add(pid)
-        return current_list
-
-    def_list = _fill_from_field(4, def_list)
-    mid_list = _fill_from_field(3, mid_list)
-    off_list = _fill_from_field(3, off_list)
-
-    # se ainda faltar itens, significa que não há jogadores distintos suficientes
-    if len(def_list) < 4 or len(mid_list) < 3 or len(off_list) < 3:
-        raise RuntimeError("Não há jogadores distintos suficientes no banco para gerar um time AI sem repetições por nome.")
-
-    # construir snapshots (mesma forma anterior)
-    def snap_from_field(p):
-        return {
-            "id": str(p.id),
-            "type": "field",
-            "name": p.name,
-            "club": p.club,
-            "country": p.country,
-            "photo_path": p.photo_path,
-            "overall": p.overall,
-            "attack": p.attack,
-            "passing": p.passing,
-            "defense": p.defense,
-            "speed": p.speed,
-            "position": p.position,
-        }
-
-    def snap_from_gk(g):
-        return {
-            "id": str(g.id),
-            "type": "gk",
-            "name": g.name,
-            "club": g.club,
-            "country": g.country,
-            "photo_path": g.photo_path,
-            "overall": g.overall,
-            "handling": g.handling,
-            "positioning": g.positioning,
-            "reflex": g.reflex,
-            "speed": g.speed,
-        }
-
-    ai_slots = {
-        "gk": snap_from_gk(gk_obj),
-        "def": [snap_from_field(p) for p in def_list],
-        "mid": [snap_from_field(p) for p in mid_list],
-        "off": [snap_from_field(p) for p in off_list],
-    }
-    return ai_slots
+    field_snaps, gk_snaps = load_catalog_snapshots()
+    return build_random_lineup(field_snaps, gk_snaps)
 
 #Modo de jogo autentico
 
@@ -1132,102 +1286,27 @@ def _sample_authentic_players_for_ai(club_name):
     if not club_query:
         return None
 
-    # buscar jogadores EXATOS (case-insensitive)
-    gk_qs = list(JogadorGoleiro.objects.filter(club__iexact=club_query))
-    field_qs = list(JogadorCampo.objects.filter(club__iexact=club_query))
+    field_snaps, gk_snaps = load_catalog_snapshots(club=club_query)
+    return build_authentic_lineup(field_snaps, gk_snaps)
 
-    # precisamos de ao menos 1 goleiro e 10 jogadores de campo
-    if not gk_qs or len(field_qs) < 10:
-        return None
-
-    # separar por posição dentro do mesmo clube
-    defenders_pool = [p for p in field_qs if p.position == JogadorCampo.POSITION_DEF]
-    mids_pool = [p for p in field_qs if p.position == JogadorCampo.POSITION_NEU]
-    offs_pool = [p for p in field_qs if p.position == JogadorCampo.POSITION_OFF]
-
-    # se houver pools suficientes conforme posição, vamos usá-las.
-    # caso alguma pool seja menor que o necessário, tentamos preencher a partir de field_qs sem repetir.
-    def pick_unique_from_pool(pool, needed, taken_ids):
-        chosen = []
-        random.shuffle(pool)
-        for p in pool:
-            if len(chosen) >= needed:
-                break
-            pid = str(p.id)
-            if pid in taken_ids:
-                continue
-            chosen.append(p)
-            taken_ids.add(pid)
-        return chosen
-
-    taken_ids = set()
-    random.shuffle(gk_qs)
-    gk_obj = gk_qs[0]
-    taken_ids.add(str(gk_obj.id))
-
-    def_list = pick_unique_from_pool(defenders_pool, 4, taken_ids)
-    mid_list = pick_unique_from_pool(mids_pool, 3, taken_ids)
-    off_list = pick_unique_from_pool(offs_pool, 3, taken_ids)
-
-    # preencher a partir de todos os field_qs (mesmo clube) se alguma posição ficou faltando
-    def fill_from_all(current_list, needed):
-        if len(current_list) >= needed:
-            return current_list
-        candidates = [p for p in field_qs if str(p.id) not in taken_ids]
-        random.shuffle(candidates)
-        for p in candidates:
-            if len(current_list) >= needed:
-                break
-            current_list.append(p)
-            taken_ids.add(str(p.id))
-        return current_list
-
-    def_list = fill_from_all(def_list, 4)
-    mid_list = fill_from_all(mid_list, 3)
-    off_list = fill_from_all(off_list, 3)
-
-    # após tentativas, se ainda faltar jogadores (por posições) -> falha (None)
-    if len(def_list) < 4 or len(mid_list) < 3 or len(off_list) < 3:
-        return None
-
-    # snapshots (simples)
-    def snap_from_field(p):
-        return {
-            "id": str(p.id),
-            "type": "field",
-            "name": p.name,
-            "club": p.club,
-            "country": p.country,
-            "photo_path": p.photo_path,
-            "overall": p.overall,
-            "attack": p.attack,
-            "passing": p.passing,
-            "defense": p.defense,
-            "speed": p.speed,
-            "position": p.position,
-        }
-    def snap_from_gk(g):
-        return {
-            "id": str(g.id),
-            "type": "gk",
-            "name": g.name,
-            "club": g.club,
-            "country": g.country,
-            "photo_path": g.photo_path,
-            "overall": g.overall,
-            "handling": g.handling,
-            "positioning": g.positioning,
-            "reflex": g.reflex,
-            "speed": g.speed,
-        }
-
-    ai_slots = {
-        "gk": snap_from_gk(gk_obj),
-        "def": [snap_from_field(p) for p in def_list[:4]],
-        "mid": [snap_from_field(p) for p in mid_list[:3]],
-        "off": [snap_from_field(p) for p in off_list[:3]],
-    }
-    return ai_slots
+def _claim_pooled_ai_team(kind):
+    """
+    Tenta consumir um AITeam pré-gerado (manage.py prewarm_ai_teams) da versão atual do catálogo.
+    O claim é um UPDATE condicional (pooled=True -> False): duas requisições nunca pegam o mesmo time.
+    Retorna o AITeam ou None se o pool estiver vazio.
+    """
+    version = catalog_version()
+    for _ in range(3):
+        candidate = (AITeam.objects
+                     .filter(pooled=True, kind=kind, catalog_version=version)
+                     .order_by("created_at")
+                     .values_list("pk", flat=True)
+                     .first())
+        if candidate is None:
+            return None
+        if AITeam.objects.filter(pk=candidate, pooled=True).update(pooled=False):
+            return AITeam.objects.get(pk=candidate)
+    return None
 
 def _pick_random_club_with_enough_players(min_field_players=10, min_goalkeepers=1):
     """
@@ -1292,72 +1371,59 @@ def start_authentic_match_view(request):
     except Exception:
         pass
 
-    # montar snapshot do time do usuário (igual aos outros modos, usado só como referência)
-    def _slot_to_snapshot(value):
-        if not value:
-            return ""
-        if isinstance(value, dict):
-            if value.get("type") == "field":
-                value["position"] = _normalize_position(value.get("position")) or value.get("position")
-            return value
-        pid = str(value)
-        inv = InventoryItem.objects.filter(user=user).filter(Q(object_id=pid) | Q(player_data__id=pid)).first()
-        if inv:
-            snap = _inv_item_snapshot(inv)
-            if snap and snap.get("type") == "field":
-                snap["position"] = _normalize_position(snap.get("position")) or snap.get("position")
-            return snap or ""
-        g = JogadorGoleiro.objects.filter(pk=pid).first()
-        if g:
-            return {
-                "id": str(g.id), "type": "gk", "name": g.name, "club": g.club,
-                "country": g.country, "photo_path": g.photo_path, "overall": g.overall,
-                "handling": g.handling, "positioning": g.positioning, "reflex": g.reflex, "speed": g.speed
-            }
-        f = JogadorCampo.objects.filter(pk=pid).first()
-        if f:
-            return {
-                "id": str(f.id), "type": "field", "name": f.name, "club": f.club,
-                "country": f.country, "photo_path": f.photo_path, "overall": f.overall,
-                "attack": f.attack, "passing": f.passing, "defense": f.defense, "speed": f.speed,
-                "position": f.position
-            }
-        return ""
-
-    user_slots = {
-        "gk": _slot_to_snapshot(team_obj.slots.get("gk")),
-        "def": [_slot_to_snapshot(v) for v in (team_obj.slots.get("def") or [])],
-        "mid": [_slot_to_snapshot(v) for v in (team_obj.slots.get("mid") or [])],
-        "off": [_slot_to_snapshot(v) for v in (team_obj.slots.get("off") or [])],
-    }
-
-    # escolher um clube aleatório do banco com jogadores suficientes
-    chosen_club = _pick_random_club_with_enough_players(min_field_players=10, min_goalkeepers=1)
-    if not chosen_club:
-        messages.error(request, "Não há clubes suficientes no banco para formar um 'Authentic Team' (é preciso pelo menos 1 GK + 10 jogadores de campo num mesmo clube).")
-        return redirect("matches")
+    # snapshots do time do usuário (perfil materializado: sem consultas extras)
+    user_slots = _user_lineup_slots(user, team_obj)
 
-    # gerar slots exclusivamente do clube escolhido
-    ai_slots = _sample_authentic_players_for_ai(chosen_club)
-    if not ai_slots:
-        messages.error(request, f"Falha ao montar time autêntico para o clube '{chosen_club}'.")
-        return redirect("matches")
+    # preferir um time pré-gerado do pool; senão gerar na hora
+    ai_team = _claim_pooled_ai_team(AITeam.KIND_AUTHENTIC)
+    if ai_team:
+        ai_slots = ai_team.slots
+    else:
+        # escolher um clube aleatório do banco com jogadores suficientes
+        chosen_club = _pick_random_club_with_enough_players(min_field_players=10, min_goalkeepers=1)
+        if not chosen_club:
+            messages.error(request, "Não há clubes suficientes no banco para formar um 'Authentic Team' (é preciso pelo menos 1 GK + 10 jogadores de campo num mesmo clube).")
+            return redirect("matches")
+
+        # gerar slots exclusivamente do clube escolhido
+        ai_slots = _sample_authentic_players_for_ai(chosen_club)
+        if not ai_slots:
+            messages.error(request, f"Falha ao montar time autêntico para o clube '{chosen_club}'.")
+            return redirect("matches")
+
+        # criar AITeam, simular e criar Match (mesma lógica do random)
+        ai_team = AITeam.objects.create(
+            name=f"AUTH {chosen_club[:12]} {uuid.uuid4().hex[:6]}",
+            slots=ai_slots,
+            kind=AITeam.KIND_AUTHENTIC,
+            club=chosen_club,
+            catalog_version=catalog_version(),
+            strength=lineup_strength(ai_slots),
+        )
+    match = _create_match(team_obj, ai_team, user_slots, ai_slots)
 
-    # criar AITeam, simular e criar Match (mesma lógica do random)
-    ai_team = AITeam.objects.create(name=f"AUTH {chosen_club[:12]} {uuid.uuid4().hex[:6]}", slots=ai_slots)
-    sim = _simulate_match(user_slots, ai_slots)
+    return redirect("match_play", match_id=str(match.id))
 
+def _create_match(team_obj, ai_team, user_slots, ai_slots):
+    """
+    Simula e grava a partida no formato compacto do histórico: seed, escalações comprimidas, placar e
+    resumo (os eventos são regenerados no replay). O AITeam já está copiado no blob e é apagado.
+    """
+    seed = uuid.uuid4().hex
+    sim = _simulate_match(user_slots, ai_slots, seed=seed)
     match = Match.objects.create(
         user_team=team_obj,
-        ai_team=ai_team,
         home_is_user=sim["meta"]["home_is_user"],
-        events=sim["events"],
         score_home=sim["score_home"],
         score_away=sim["score_away"],
-        meta=sim["meta"]
+        meta=sim["meta"],
+        seed=seed,
+        lineups=pack_lineups(user_slots, ai_slots),
+        opponent_name=ai_team.name,
+        stats=summarize(sim["events"]),
     )
-
-    return redirect("match_play", match_id=str(match.id))
+    ai_team.delete()
+    return match
 
 ##sistema de gameplay
 def _simulate_match(user_team_slots, ai_team_slots, seed=None):
@@ -1829,65 +1895,27 @@ def start_random_match_view(request):
     team_obj, _ = Team.objects.get_or_create(user=user)
     team_obj.ensure_structure()
 
-    # montar snapshot do team do usuário (prefer snapshots se já tiverem dicts)
-    def _slot_to_snapshot(value):
-        if not value:
-            return ""
-        if isinstance(value, dict):
-            return value
-        # caso seja id string, tentar resolver em InventoryItem ou DB
-        pid = str(value)
-        inv = InventoryItem.objects.filter(user=user).filter(Q(object_id=pid) | Q(player_data__id=pid)).first()
-        if inv:
-            snap = inv.get_player_snapshot()
-            if snap:
-                # normalize position for field players
-                if snap.get("type") == "field":
-                    snap["position"] = _normalize_position(snap.get("position")) or snap.get("position")
-                return snap
-        # tentar buscar no DB
-        g = JogadorGoleiro.objects.filter(pk=pid).first()
-        if g:
-            return {
-                "id": str(g.id), "type": "gk", "name": g.name, "club": g.club,
-                "country": g.country, "photo_path": g.photo_path, "overall": g.overall,
-                "handling": g.handling, "positioning": g.positioning, "reflex": g.reflex, "speed": g.speed
-            }
-        f = JogadorCampo.objects.filter(pk=pid).first()
-        if f:
-            return {
-                "id": str(f.id), "type": "field", "name": f.name, "club": f.club,
-                "country": f.country, "photo_path": f.photo_path, "overall": f.overall,
-                "attack": f.attack, "passing": f.passing, "defense": f.defense, "speed": f.speed,
-                "position": f.position
-            }
-        return ""
-
-    user_slots = {
-        "gk": _slot_to_snapshot(team_obj.slots.get("gk")),
-        "def": [ _slot_to_snapshot(v) for v in (team_obj.slots.get("def") or []) ],
-        "mid": [ _slot_to_snapshot(v) for v in (team_obj.slots.get("mid") or []) ],
-        "off": [ _slot_to_snapshot(v) for v in (team_obj.slots.get("off") or []) ],
-    }
-
-    # gerar AI team slots
-    ai_slots = _sample_random_players_for_ai()
-
-    # criar registro AITeam
-    ai_team = AITeam.objects.create(name=f"AI Team {uuid.uuid4().hex[:6]}", slots=ai_slots)
-    # simular partida
-    sim = _simulate_match(user_slots, ai_slots)
+    # snapshots do time do usuário (perfil materializado: sem consultas extras)
+    user_slots = _user_lineup_slots(user, team_obj)
 
-    # criar Match
-    match = Match.objects.create(
-        user_team=team_obj,
-        ai_team=ai_team,
-        home_is_user=sim["meta"]["home_is_user"],
-        events=sim["events"],
-        score_home=sim["score_home"],
-        score_away=sim["score_away"],
-        meta=sim["meta"]
-    )
+    # preferir um time pré-gerado do pool; senão gerar na hora
+    ai_team = _claim_pooled_ai_team(AITeam.KIND_RANDOM)
+    if ai_team:
+        ai_slots = ai_team.slots
+    else:
+        # gerar AI team slots
+        ai_slots = _sample_random_players_for_ai()
+
+        # criar registro AITeam
+        ai_team = AITeam.objects.create(
+            name=f"AI Team {uuid.uuid4().hex[:6]}",
+            slots=ai_slots,
+            kind=AITeam.KIND_RANDOM,
+            catalog_version=catalog_version(),
+            strength=lineup_strength(ai_slots),
+        )
+    # simular partida e gravar Match (histórico)
+    match = _create_match(team_obj, ai_team, user_slots, ai_slots)
 
     return redirect("match_play", match_id=str(match.id))
 
@@ -1897,8 +1925,8 @@ def match_play_view(request, match_id):
     Prepara a página de reprodução da partida:
      - carrega Match, copia os events, placar e escalações;
      - garante que cada snapshot tenha pos_x/pos_y e id coerentes para o cliente;
-     - confere o resultado e credita moedas (vitória +100, empate +50);
-     - deleta registros temporários (Match e AITeam) em transação.
+     - confere o resultado e credita moedas (vitória +100, empate +50) uma única vez;
+     - a partida fica no histórico: recarregar a página repete o replay sem novo prêmio.
     Retorna render com context contendo:
      - events_json, user_lineup (lista), ai_lineup (lista), home_is_user, score_home, score_away, coins_awarded
     """
@@ -1907,63 +1935,28 @@ def match_play_view(request, match_id):
     if not user:
         return redirect("/login/")
 
-    match = get_object_or_404(Match, pk=match_id)
+    match = get_object_or_404(Match.objects.select_related("user_team", "ai_team"), pk=match_id)
+    if match.user_team and match.user_team.user_id != user.pk:
+        raise Http404("Partida não encontrada.")
 
-    # copiar dados antes de qualquer exclusão
-    events = list(match.events or [])
     score_home = int(getattr(match, "score_home", 0) or 0)
     score_away = int(getattr(match, "score_away", 0) or 0)
     home_is_user = bool(getattr(match, "home_is_user", True))
     ai_team = match.ai_team
     user_team = match.user_team
 
-    # função interna para resolver uma slot entry (pode ser snapshot dict, id string ou "")
-    def _resolve_slot_snapshot_for_team(slot_value, user_context=None):
-        if not slot_value:
-            return ""
-        if isinstance(slot_value, dict):
-            return slot_value
-        pid = str(slot_value)
-        # tentar InventoryItem se usuário conhecido
-        if user_context:
-            inv = InventoryItem.objects.filter(user=user_context).filter(Q(object_id=pid) | Q(player_data__id=pid)).first()
-            if inv:
-                snap = inv.get_player_snapshot()
-                if snap:
-                    if snap.get("type") == "field":
-                        snap["position"] = snap.get("position")
-                    return snap
-        # fallback DB
-        g = JogadorGoleiro.objects.filter(pk=pid).first()
-        if g:
-            return {
-                "id": str(g.id), "type": "gk", "name": g.name, "club": g.club,
-                "country": g.country, "photo_path": g.photo_path, "overall": g.overall,
-                "handling": g.handling, "positioning": g.positioning, "reflex": g.reflex, "speed": g.speed
-            }
-        f = JogadorCampo.objects.filter(pk=pid).first()
-        if f:
-            return {
-                "id": str(f.id), "type": "field", "name": f.name, "club": f.club,
-                "country": f.country, "photo_path": f.photo_path, "overall": f.overall,
-                "attack": f.attack, "passing": f.passing, "defense": f.defense, "speed": f.speed,
-                "position": f.position
-            }
-        return ""
-
-    # montar slots como no seu código original
-    if user_team:
-        raw_user_slots = user_team.slots or {}
-        user_slots_resolved = {
-            "gk": _resolve_slot_snapshot_for_team(raw_user_slots.get("gk"), user),
-            "def": [_resolve_slot_snapshot_for_team(v, user) for v in (raw_user_slots.get("def") or [])],
-            "mid": [_resolve_slot_snapshot_for_team(v, user) for v in (raw_user_slots.get("mid") or [])],
-            "off": [_resolve_slot_snapshot_for_team(v, user) for v in (raw_user_slots.get("off") or [])],
-        }
+    # escalações gravadas na partida; partidas antigas usam o time atual do usuário e o AITeam
+    stored_user_slots, stored_ai_slots = unpack_lineups(match.lineups)
+    if stored_user_slots is not None:
+        user_slots_resolved = stored_user_slots
+    elif user_team:
+        user_slots_resolved = _user_lineup_slots(user, user_team)
     else:
         user_slots_resolved = {"gk": "", "def": [], "mid": [], "off": []}
 
-    if ai_team:
+    if stored_ai_slots is not None:
+        ai_slots_resolved = stored_ai_slots
+    elif ai_team:
         raw_ai_slots = ai_team.slots or {}
         ai_slots_resolved = {
             "gk": raw_ai_slots.get("gk") or "",
@@ -1989,6 +1982,12 @@ def match_play_view(request, match_id):
         if p:
             user_lineup.append({"pos": f"ATA{idx+1}", "player": p})
 
+    # eventos: regenerados pela simulação (determinística pela seed) ou, em partidas antigas, gravados
+    if match.seed and stored_user_slots is not None:
+        events = _simulate_match(stored_user_slots, stored_ai_slots, seed=match.seed)["events"]
+    else:
+        events = list(match.events or [])
+
     ai_lineup = []
     if ai_slots_resolved.get("gk"):
         ai_lineup.append({"pos": "GOL", "player": ai_slots_resolved["gk"]})
@@ -2047,33 +2046,39 @@ def match_play_view(request, match_id):
         user_goal = score_away
         opp_goal = score_home
 
+    prize = 0
+    if user_goal > opp_goal:
+        prize = 100
+    elif user_goal == opp_goal:
+        prize = 50
+
     coins_awarded = 0
     try:
         with transaction.atomic():
-            user_locked = SistemasUser.objects.select_for_update().get(pk=user.pk)
-            if user_goal > opp_goal:
-                user_locked.coins = (user_locked.coins or 0) + 100
-                user_locked.save(update_fields=["coins"])
-                coins_awarded = 100
-            elif user_goal == opp_goal:
-                user_locked.coins = (user_locked.coins or 0) + 50
-                user_locked.save(update_fields=["coins"])
-                coins_awarded = 50
-            else:
-                coins_awarded = 0
-
-            # deletar ai_team e match (dentro da transação)
-            try:
-                if ai_team:
-                    ai_team.delete()
-            except Exception:
-                logger.exception("Erro ao deletar ai_team (ignorado)")
-            try:
-                match.delete()
-            except Exception:
-                logger.exception("Erro ao deletar match (ignorado)")
+            # UPDATE condicional em rewarded funciona como "claim": só a requisição que virou a flag credita
+            # (duas abas ou um refresh não recebem o prêmio duas vezes)
+            claim = {"rewarded": True, "coins_awarded": prize}
+            if stored_user_slots is None:
+                # partida antiga: grava escalações/resumo para o histórico e libera o AITeam
+                claim.update(
+                    lineups=pack_lineups(user_slots_resolved, ai_slots_resolved),
+                    opponent_name=ai_team.name if ai_team else "",
+                    stats=summarize(events),
+                )
+            claimed = Match.objects.filter(pk=match.pk, rewarded=False).update(**claim)
+            if claimed:
+                coins_awarded = prize
+                if coins_awarded:
+                    credit_coins(user.pk, coins_awarded, kind=CoinTransaction.KIND_MATCH_REWARD, ref=match.pk)
+
+                # deletar ai_team (dentro da transação)
+                try:
+                    if ai_team:
+                        ai_team.delete()
+                except Exception:
+                    logger.exception("Erro ao deletar ai_team (ignorado)")
     except Exception:
-        logger.exception("Erro durante transação de final de partida (award + delete)")
+        logger.exception("Erro durante transação de final de partida (prêmio)")
 
     # inserir evento inicial com escalações (minute = 0)
     def lineup_text_builder(user_lineup_local, ai_lineup_local):